@@ -0,0 +1,143 @@
+"""
+Benchmark: admission webhook latency.
+
+Starts the admission server on localhost (plain HTTP, no TLS handshake cost)
+in a separate process, as in the operator, where it does not share its event
+loop with the clients, and sends AdmissionReview requests for a valid and an invalid spec over a
+keep-alive connection, reporting client-observed p50/p99/max latency, once
+with the decision cache disabled and once with it enabled (``*_cached``, every
+request after the first is a hit). External checks stay disabled, as in the
+default configuration. ``server_mean_ms`` is the server's own review time
+(``appmetadata_admission_duration_seconds``); the rest of the client-observed
+latency is HTTP and scheduling, which dominate on a machine with few cores.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_admission.py [--requests 2000] [--concurrency 1] [--json]
+"""
+import argparse
+import asyncio
+import copy
+import json
+import multiprocessing
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import aiohttp
+import yaml
+
+from controller.config import WebhookConfig
+from controller.metrics import ADMISSION_DURATION
+from controller.webhook import AdmissionServer
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "application-metadata-example.yaml"
+
+
+def admission_review(spec: Dict[str, Any], uid: str) -> Dict[str, Any]:
+    return {
+        "apiVersion": "admission.k8s.io/v1",
+        "kind": "AdmissionReview",
+        "request": {
+            "uid": uid,
+            "operation": "CREATE",
+            "object": {"apiVersion": "apps.company.io/v1", "kind": "ApplicationMetadata", "spec": spec},
+        },
+    }
+
+
+def specs() -> Dict[str, Dict[str, Any]]:
+    valid = yaml.safe_load(EXAMPLE.read_text())["spec"]
+    invalid = copy.deepcopy(valid)
+    invalid["version"] = "not-a-version"
+    invalid["composition"][0].setdefault("dependencies", []).append("missing-component")
+    return {"valid": valid, "invalid": invalid}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure(url: str, spec: Dict[str, Any], expect_allowed: bool,
+                  requests: int, concurrency: int) -> Dict[str, float]:
+    payload = json.dumps(admission_review(spec, "bench")).encode()
+    headers = {"Content-Type": "application/json"}
+    latencies: List[float] = []
+
+    async with aiohttp.ClientSession() as session:
+        async def one() -> None:
+            started = time.perf_counter()
+            async with session.post(url, data=payload, headers=headers) as response:
+                body = await response.json()
+            latencies.append(time.perf_counter() - started)
+            assert body["response"]["allowed"] is expect_allowed, body
+
+        for _ in range(50):  # warm up connections and lazy model builds
+            await one()
+        latencies.clear()
+        for _ in range(requests // concurrency):
+            await asyncio.gather(*(one() for _ in range(concurrency)))
+
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+    }
+
+
+def serve(config: WebhookConfig, ready, stop, results) -> None:
+    """Run the admission server until ``stop`` is set; report its review time."""
+    async def main() -> None:
+        server = AdmissionServer(config)
+        await server.start(host="127.0.0.1", tls=False)
+        ready.set()
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        await server.stop()
+
+    asyncio.run(main())
+    samples = {s.name: s.value for s in ADMISSION_DURATION.collect()[0].samples}
+    results.put((samples["appmetadata_admission_duration_seconds_sum"],
+                 samples["appmetadata_admission_duration_seconds_count"]))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    for suffix, cache_size in (("", 0), ("_cached", WebhookConfig().decision_cache_size)):
+        config = WebhookConfig(port=args.port, decision_cache_size=cache_size)
+        url = f"http://127.0.0.1:{config.port}{config.path}"
+        for name, spec in specs().items():
+            ready, stop, server_time = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Queue()
+            server = multiprocessing.Process(target=serve, args=(config, ready, stop, server_time))
+            server.start()
+            try:
+                ready.wait(30)
+                result = await measure(url, spec, name == "valid", args.requests, args.concurrency)
+            finally:
+                stop.set()
+            total, count = server_time.get(timeout=30)
+            server.join()
+            result["server_mean_ms"] = round(total / count * 1000, 3)
+            results[name + suffix] = result
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--port", type=int, default=18443)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results))
+        return
+    for name, value in results.items():
+        print(f"{name:15} {value}")
+
+
+if __name__ == "__main__":
+    main()
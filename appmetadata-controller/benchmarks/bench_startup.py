@@ -0,0 +1,91 @@
+"""
+Cold-start benchmark for the ApplicationMetadata controller.
+
+Measures, in fresh interpreters, how long it takes to import the CLI entry
+point and the full handler set. With ``--live`` it also starts the controller
+with ``--profile-startup`` against the current kube context and reads the
+time-to-first-reconcile from the startup profile line.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_startup.py [--runs 10] [--live] [--json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+MODULES = ["controller.__main__", "controller.handlers"]
+
+PROFILE_RE = re.compile(r"Startup profile: (\{.*\})")
+
+
+def time_import(module: str) -> float:
+    """Import a module in a fresh interpreter and return the import time."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - t)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True, env=os.environ
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def live_profile(timeout: float) -> Optional[Dict[str, float]]:
+    """Run the controller until it logs its startup profile."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "controller", "--profile-startup"],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=os.environ,
+    )
+    deadline = time.monotonic() + timeout
+    try:
+        for line in process.stdout:
+            match = PROFILE_RE.search(line)
+            if match:
+                return json.loads(match.group(1))
+            if time.monotonic() > deadline:
+                break
+    finally:
+        process.terminate()
+        process.wait()
+    return None
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "min": round(samples[0], 4),
+        "median": round(statistics.median(samples), 4),
+        "p90": round(samples[int(0.9 * (len(samples) - 1))], 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--live", action="store_true", help="also measure time-to-first-reconcile")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    results: Dict[str, object] = {
+        f"import:{module}": summarize([time_import(module) for _ in range(args.runs)])
+        for module in MODULES
+    }
+    if args.live:
+        results["live"] = live_profile(args.timeout)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    for name, value in results.items():
+        print(f"{name:32} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,106 @@
 """
 Main entry point for ApplicationMetadata controller.
 """
-import asyncio
+from controller import startup  # First, so that startup timings include every import
+
 import logging
 import os
 import signal
 import sys
+from typing import List, Optional
 
-import kopf
-from prometheus_client import start_http_server
+import click
 
-from controller.config import load_config
-from controller import handlers  # This imports and registers all kopf handlers
+from controller import logs
+from controller.config import ControllerConfig, get_config
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 
-def main():
+def resolve_namespace_patterns(
+    config: ControllerConfig,
+    namespaces: Optional[List[str]] = None
+) -> List[str]:
+    """Namespaces to watch: CLI, then KOPF_NAMESPACE (comma-separated), then config."""
+    if namespaces:
+        return list(namespaces)
+    env = os.getenv("KOPF_NAMESPACE")
+    if env:
+        return [ns.strip() for ns in env.split(",") if ns.strip()]
+    return list(config.workers.namespaces)
+
+def run_operator(namespaces: List[str]) -> None:
+    """Run the kopf operator in the current process."""
+    # Heavy imports are deferred until an operator actually runs in this process
+    with startup.stage("import_kopf"):
+        import kopf
+    with startup.stage("import_handlers"):
+        from controller import handlers  # This imports and registers all kopf handlers
+
+    from controller.server import ready_flag
+
+    # Run Kopf operator (no 'peering' arg for this Kopf version)
+    if namespaces:
+        kopf.run(standalone=True, namespaces=namespaces, ready_flag=ready_flag)
+    else:
+        # Watch cluster-wide
+        kopf.run(standalone=True, clusterwide=True, ready_flag=ready_flag)
+
+@click.command()
+@click.option("--workers", type=int, default=None,
+              help="Number of worker processes (overrides workers.processes).")
+@click.option("--namespace", "namespaces", multiple=True,
+              help="Namespace or glob to watch; repeatable.")
+@click.option("--profile-startup", is_flag=True,
+              help="Log import time and time-to-first-reconcile as JSON.")
+def main(workers: Optional[int], namespaces: List[str], profile_startup: bool):
     """Main entry point."""
+    if profile_startup:
+        startup.enabled = True
+        os.environ["APPMETADATA_PROFILE_STARTUP"] = "1"
+
     # Load configuration
-    config = load_config()
-    
-    # Configure logging
-    log_level = getattr(logging, config.logging.level.upper())
-    logging.basicConfig(
-        level=log_level,
-        format=config.logging.format
-    )
-    
-    # Start metrics server if enabled
-    if config.metrics.enabled:
-        try:
-            start_http_server(config.metrics.port)
-            logger.info(f"📊 Started metrics server on port {config.metrics.port}")
-        except Exception as e:
-            logger.error(f"❌ Failed to start metrics server: {e}")
-            sys.exit(1)
-    
+    config = get_config()
+    if workers is not None:
+        config.workers.processes = workers
+    patterns = resolve_namespace_patterns(config, namespaces)
+
+    # Configure logging (queued; console and file I/O run on a background thread)
+    logs.setup(config.logging)
+
+    # Hand over to the supervisor in multi-process mode; it serves the metrics
+    if config.workers.processes > 1:
+        from controller.supervisor import Supervisor
+        logger.info(f"🚀 Starting ApplicationMetadata Controller with {config.workers.processes} workers")
+        Supervisor(config, patterns).run()
+        return
+
+    # Start the metrics and probe server (/metrics, /healthz, /readyz)
+    from controller import server
+    try:
+        if config.metrics.enabled:
+            from controller.metrics import register_inventory_collector
+            register_inventory_collector()
+        server.serve_operator(config)
+        logger.info(f"📊 Started metrics and probe server on port {config.metrics.port}")
+    except Exception as e:
+        logger.error(f"❌ Failed to start metrics server: {e}")
+        sys.exit(1)
+
     # Log startup
     logger.info("🚀 Starting ApplicationMetadata Controller")
     logger.info(f"⚙️  Configuration loaded: {config.dict()}")
-    
-    # Configure file logging for readiness checks
-    file_handler = logging.FileHandler('/tmp/controller.log')
-    file_handler.setFormatter(logging.Formatter(config.logging.format))
-    logging.getLogger().addHandler(file_handler)
-    
+
     # Register signal handlers
     def signal_handler(sig, frame):
         logger.info("📥 Shutting down gracefully...")
         sys.exit(0)
-    
+
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    
+
     # Start kopf
-    # Run Kopf operator (no 'peering' arg for this Kopf version)
-    ns = os.getenv("KOPF_NAMESPACE")
-    if ns:
-        kopf.run(standalone=True, namespace=ns)
-    else:
-        # Watch cluster-wide
-        kopf.run(standalone=True)
+    run_operator(patterns)
 
 if __name__ == "__main__":
     main()
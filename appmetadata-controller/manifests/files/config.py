@@ -2,7 +2,7 @@
 Configuration management for the ApplicationMetadata controller.
 """
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 import yaml
 from pydantic import BaseModel, Field
@@ -13,6 +13,8 @@ class MetricsConfig(BaseModel):
     enabled: bool = True
     port: int = 9090
     path: str = "/metrics"
+    max_label_values: int = 50  # per inventory gauge; the rest is reported as "other"
+    mirror_interval: int = 15  # seconds; copies inventory gauges in multi-process mode
 
 
 class WebhookConfig(BaseModel):
@@ -21,6 +23,11 @@ class WebhookConfig(BaseModel):
     port: int = 8443
     cert_file: str = "/etc/webhook/certs/tls.crt"
     key_file: str = "/etc/webhook/certs/tls.key"
+    path: str = "/validate"
+    cert_reload_interval: int = 30  # seconds between certificate mtime checks
+    latency_budget_ms: int = 50  # external checks still pending after this are skipped
+    external_checks: bool = False  # verify git repositories at admission time
+    decision_cache_size: int = 1024  # cached admission decisions; 0 disables
 
 
 class LoggingConfig(BaseModel):
@@ -28,6 +35,12 @@ class LoggingConfig(BaseModel):
     level: str = "INFO"
     format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     use_json: bool = False
+    file: Optional[str] = "/tmp/controller.log"  # rotating file sink; empty disables
+    file_max_bytes: int = 10 * 1024 * 1024
+    file_backup_count: int = 3
+    queue_size: int = 10000  # records beyond this are dropped, never block the loop
+    info_rate_limit: float = 5.0  # INFO records/second per call site; 0 disables
+    info_burst: int = 20
 
 
 class ValidationConfig(BaseModel):
@@ -36,6 +49,56 @@ class ValidationConfig(BaseModel):
     verify_git_repos: bool = True
     verify_jira_tickets: bool = False
     auto_status_updates: bool = True
+    repository_cache_ttl: int = 300  # seconds to cache repository checks; 0 disables
+
+
+class ShardingConfig(BaseModel):
+    """Horizontal sharding configuration."""
+    enabled: bool = False
+    lease_namespace: str = "appmetadata-system"
+    lease_prefix: str = "appmetadata-controller-shard"
+    lease_duration: int = 30  # seconds
+    renew_interval: int = 10  # seconds
+    virtual_nodes: int = 128
+    key: str = Field("name", pattern=r"^(name|uid)$")  # hash namespace/name or metadata.uid
+
+
+class WorkersConfig(BaseModel):
+    """Multi-process worker configuration."""
+    processes: int = Field(1, ge=1)
+    namespaces: List[str] = Field(default_factory=list)  # names or globs; empty = all
+    multiproc_dir: str = "/tmp/prometheus-multiproc"
+    restart_backoff: int = 5  # seconds, doubled per consecutive crash up to 60
+    resync_interval: int = 300  # seconds between namespace glob re-resolution
+
+
+class HealthConfig(BaseModel):
+    """Component health engine configuration."""
+    enabled: bool = False  # watch workloads and judge component health; needs a restart
+    component_label: str = "app.kubernetes.io/component"  # value = component name
+    app_label: str = "app.kubernetes.io/part-of"  # value = ApplicationMetadata spec.name
+    require_workloads: bool = False  # a component without workloads is unhealthy
+
+
+class ProbesConfig(BaseModel):
+    """Health and readiness probe configuration (served on the metrics port)."""
+    max_loop_lag: float = 5.0  # seconds; /healthz fails above this
+    initial_sync_grace: int = 30  # seconds after startup to wait for a first watch event
+
+
+class LoopMonitorConfig(BaseModel):
+    """Event loop lag, busy time and slow callback monitoring."""
+    heartbeat_interval: float = 1.0  # seconds between lag measurements
+    slow_callback_threshold: float = 0.25  # seconds; 0 disables the watchdog
+    watchdog_interval: float = 0.05  # seconds between watchdog checks
+
+
+class DebugConfig(BaseModel):
+    """On-demand profiling endpoints (/debug/profile, /debug/heap) on the metrics port."""
+    enabled: bool = False  # needs a restart
+    token: str = ""  # bearer token; falls back to APPMETADATA_DEBUG_TOKEN
+    max_seconds: float = 60.0
+    sample_interval: float = 0.005  # seconds between stack samples
 
 
 class ControllerConfig(BaseModel):
@@ -46,7 +109,16 @@ class ControllerConfig(BaseModel):
     webhook: WebhookConfig = Field(default_factory=WebhookConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     validation: ValidationConfig = Field(default_factory=ValidationConfig)
-    reconcile_interval: int = 300  # seconds
+    sharding: ShardingConfig = Field(default_factory=ShardingConfig)
+    workers: WorkersConfig = Field(default_factory=WorkersConfig)
+    health: HealthConfig = Field(default_factory=HealthConfig)
+    probes: ProbesConfig = Field(default_factory=ProbesConfig)
+    loop_monitor: LoopMonitorConfig = Field(default_factory=LoopMonitorConfig)
+    debug: DebugConfig = Field(default_factory=DebugConfig)
+    reconcile_interval: int = 300  # seconds; applied live at reconcile_tick granularity
+    reconcile_tick: int = 60  # seconds; timer wake-up period, needs a restart
+    max_concurrent_reconciles: int = 0  # 0 = unlimited
+    config_reload_interval: int = 10  # seconds between config file checks; 0 disables
     version: str = "1.0.0"  # Controller version
 
 
@@ -64,4 +136,22 @@ def load_config() -> ControllerConfig:
             if file_config:
                 config = ControllerConfig(**file_config)
     
-    return config
\ No newline at end of file
+    return config
+
+
+# Process-wide configuration, loaded on first use
+_config: Optional[ControllerConfig] = None
+
+
+def get_config() -> ControllerConfig:
+    """Return the process-wide configuration, loading it on first use."""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+
+def set_config(config: ControllerConfig) -> None:
+    """Replace the process-wide configuration (see controller.reloader)."""
+    global _config
+    _config = config
@@ -2,32 +2,65 @@
 Core handlers for ApplicationMetadata controller.
 """
 import asyncio
+import functools
 import logging
+import os
+import random
+import time
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
 import kopf
-import httpx
-import json
-from kubernetes import client
 
-from controller.config import ControllerConfig, load_config
+from controller.config import ControllerConfig, get_config
 from controller.models import (
-    ApplicationMetadata,
     ApplicationMetadataSpec,
-    ApplicationMetadataStatus,
     Phase,
     ConditionType,
     ConditionStatus,
-    Condition,
 )
-from controller.metrics import update_app_metrics
+from controller import status as status_builder
+from controller.metrics import forget_app, mirror_inventory, update_app_metrics
+from controller.concurrency import ResizableLimiter
+from controller import health as health_engine
+from controller import loopmon, reloader, server, sharding, startup
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 
-# Global configuration
-config: ControllerConfig = load_config()
+# Handlers take a snapshot with get_config() so that a reload never changes
+# the configuration half-way through a reconcile.
+
+# Limits concurrent create/update/reconcile work; resized on config reload
+_reconcile_limiter = ResizableLimiter(get_config().max_concurrent_reconciles)
+
+# Repository check results: url -> (expires_at, ok, message)
+_repository_cache: Dict[str, Tuple[float, bool, str]] = {}
+
+_config_watcher_task: Optional[asyncio.Task] = None
+
+_admission_server = None  # controller.webhook.AdmissionServer when serving
+
+_metrics_mirror_task: Optional[asyncio.Task] = None
+
+_loop_monitor_task: Optional[asyncio.Task] = None
+
+def limited(fn):
+    """Run a handler under the reconcile concurrency limit."""
+    @functools.wraps(fn)
+    async def wrapper(**kwargs):
+        async with _reconcile_limiter:
+            return await fn(**kwargs)
+    return wrapper
+
+async def _apply_config(old: ControllerConfig, new: ControllerConfig) -> None:
+    """Apply the live-tunable settings of a reloaded configuration."""
+    if new.max_concurrent_reconciles != old.max_concurrent_reconciles:
+        await _reconcile_limiter.resize(new.max_concurrent_reconciles)
+    if new.validation.repository_cache_ttl < old.validation.repository_cache_ttl:
+        _repository_cache.clear()
+
+reloader.subscribe(_apply_config)
 
 def create_condition(
     condition_type: ConditionType,
@@ -36,22 +69,31 @@ def create_condition(
     message: str
 ) -> Dict[str, Any]:
     """Create a status condition."""
-    return {
-        "type": condition_type.value,
-        "status": status.value,
-        "lastTransitionTime": datetime.now(timezone.utc).isoformat(),
-        "reason": reason,
-        "message": message,
-    }
+    return status_builder.condition(
+        condition_type, status, reason,
+        status_builder.timestamp(datetime.now(timezone.utc)), message
+    )
 
 async def verify_git_repository(url: str) -> tuple[bool, str]:
     """Verify that a Git repository exists and is accessible."""
+    ttl = get_config().validation.repository_cache_ttl
+    now = time.monotonic()
+    cached = _repository_cache.get(url)
+    if ttl > 0 and cached and cached[0] > now:
+        return cached[1], cached[2]
+
+    import httpx  # Deferred: only needed when repository checks are enabled
+
     try:
         async with httpx.AsyncClient() as client:
             response = await client.head(url, follow_redirects=True)
-            return response.status_code == 200, "Repository verified"
+            result = response.status_code == 200, "Repository verified"
     except Exception as e:
-        return False, f"Failed to verify repository: {str(e)}"
+        result = False, f"Failed to verify repository: {str(e)}"
+
+    if ttl > 0:
+        _repository_cache[url] = (now + ttl, *result)
+    return result
 
 async def verify_dependencies(
     components: List[Dict[str, Any]]
@@ -71,194 +113,277 @@ async def verify_dependencies(
     return len(errors) == 0, errors
 
 async def check_component_health(
-    component: Dict[str, Any]
+    component: Dict[str, Any], namespace: str, app: str
 ) -> tuple[bool, str]:
     """Check health of a component."""
-    # This is a simplified health check
-    # In production, you would:
-    # 1. Check actual component health (e.g., database connectivity)
-    # 2. Check associated resources (pods, services, etc.)
-    # 3. Run component-specific health checks
+    if health_engine.cache is not None:
+        # Judged from the watched Deployments/StatefulSets/Pods of the component
+        return health_engine.cache.check(namespace, app, component["name"])
+    # Health engine disabled: components are assumed healthy
     return True, f"Component '{component['name']}' is healthy"
 
+async def _unhealthy_components(spec: Dict[str, Any], namespace: str) -> List[Tuple[str, str]]:
+    """Return (name, message) for every unhealthy component of a validated spec."""
+    unhealthy_components = []
+    for component in spec.get("composition", []):
+        is_healthy, message = await check_component_health(component, namespace, spec["name"])
+        if not is_healthy:
+            unhealthy_components.append((component["name"], message))
+    return unhealthy_components
+
 @kopf.on.startup()
 def configure(settings: kopf.OperatorSettings, **_):
     """Configure the operator."""
     settings.posting.level = logging.INFO
     settings.watching.connect_timeout = 60
     settings.watching.server_timeout = 600
-    
-    # Set up logging
-    log_level = getattr(logging, config.logging.level.upper())
-    logging.basicConfig(
-        level=log_level,
-        format=config.logging.format
-    )
+    config = get_config()
     
     logger.info(f"🚀 Starting ApplicationMetadata controller v{config.version}")
     logger.info(f"⚙️ Configuration loaded: {config.dict()}")
+    startup.mark("operator_ready")
+
+@kopf.on.startup()
+async def start_config_watcher(**_):
+    """Watch the config file and apply changes without a restart."""
+    global _config_watcher_task
+    interval = get_config().config_reload_interval
+    if interval > 0:
+        _config_watcher_task = asyncio.create_task(reloader.ConfigWatcher(interval).run())
+
+@kopf.on.cleanup()
+async def stop_config_watcher(**_):
+    """Stop watching the config file."""
+    if _config_watcher_task is not None:
+        _config_watcher_task.cancel()
+
+@kopf.on.startup()
+async def start_sharding(settings: kopf.OperatorSettings, **_):
+    """Join the shard group when horizontal sharding is enabled."""
+    config = get_config()
+    if not config.sharding.enabled:
+        return
+
+    from kubernetes import config as kube_config
+    try:
+        kube_config.load_incluster_config()
+    except kube_config.ConfigException:
+        kube_config.load_kube_config()
+
+    sharding.manager = sharding.ShardManager(config.sharding)
+    # Before the watches start: kopf's state must never be shared between replicas
+    sharding.manager.configure_storage(settings)
+    await sharding.manager.start()
+
+@kopf.on.cleanup()
+async def stop_sharding(**_):
+    """Release the shard lease so the remaining replicas rebalance immediately."""
+    if sharding.manager is not None:
+        await sharding.manager.stop()
+        sharding.manager = None
+
+@kopf.on.startup()
+async def start_webhook(**_):
+    """Serve the validating admission webhook when certificates are mounted."""
+    global _admission_server
+    config = get_config().webhook
+    if not config.enabled:
+        return
+
+    from controller.webhook import AdmissionServer  # Deferred: imports aiohttp.web
+
+    server = AdmissionServer(config)
+    if not server.certificates_present():
+        logger.warning(f"⚠️ Webhook enabled but no certificate at {config.cert_file}; not serving admission reviews")
+        return
+    await server.start()
+    _admission_server = server
+
+@kopf.on.cleanup()
+async def stop_webhook(**_):
+    """Stop the admission webhook server."""
+    if _admission_server is not None:
+        await _admission_server.stop()
+
+@kopf.on.startup()
+async def start_loop_monitor(**_):
+    """Measure event loop lag, busy time and stalls (also used by the probes)."""
+    global _loop_monitor_task
+    _loop_monitor_task = loopmon.start(get_config().loop_monitor)
+
+@kopf.on.cleanup()
+async def stop_loop_monitor(**_):
+    """Stop the loop monitor."""
+    if _loop_monitor_task is not None:
+        _loop_monitor_task.cancel()
+    loopmon.stop()
+
+@kopf.on.event("apps.company.io", "v1", "applicationmetadata")
+def watch_event_seen(**_):
+    """Readiness: the watch stream delivers events (initial listing included)."""
+    server.mark_event()
 
-@kopf.on.create("apps.company.io", "v1", "applicationmetadata")
+@kopf.on.startup()
+async def start_metrics_mirror(**_):
+    """Copy inventory gauges to the shared metric files when running as a worker."""
+    global _metrics_mirror_task
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return  # Single process: the inventory collector is scraped directly
+
+    async def mirror() -> None:
+        while True:
+            mirror_inventory()
+            await asyncio.sleep(get_config().metrics.mirror_interval)
+
+    _metrics_mirror_task = asyncio.create_task(mirror())
+
+@kopf.on.cleanup()
+async def stop_metrics_mirror(**_):
+    """Stop copying inventory gauges."""
+    if _metrics_mirror_task is not None:
+        _metrics_mirror_task.cancel()
+
+@kopf.on.create("apps.company.io", "v1", "applicationmetadata", when=sharding.owns_object)
+@limited
+@loopmon.timed
 async def create_fn(spec: Dict[str, Any], meta: Dict[str, Any], status: kopf.Status, patch: kopf.Patch, logger: logging.Logger, **kwargs):
     """Handle creation of ApplicationMetadata resources."""
+    startup.first_reconcile()
+    config = get_config()
     name = meta["name"]
     namespace = meta["namespace"]
+    if sharding.manager is not None and status.get("observedGeneration") == meta.get("generation"):
+        # Handled before by another replica; this one has no diff-base of its own yet
+        await _reconcile(spec, meta, patch, logger, config)
+        return
     logger.info(f"📦 Creating ApplicationMetadata: {namespace}/{name}")
     
     try:
         # Validate using Pydantic model
         app_spec = ApplicationMetadataSpec(**spec)
-        now = datetime.now(timezone.utc)
+        now = status_builder.timestamp(datetime.now(timezone.utc))
         
         # Initialize status
-        new_status = ApplicationMetadataStatus(
-            phase=Phase.PENDING,
-            conditions=[
-                Condition(
-                    type=ConditionType.READY,
-                    status=ConditionStatus.UNKNOWN,
-                    lastTransitionTime=now,
-                    reason="Initializing",
-                    message=f"Initializing application {name}"
-                )
-            ],
-            lastUpdated=now,
-            observedVersion=spec["version"],
-            observedGeneration=meta.get("generation", 1)
-        )
+        phase = Phase.PENDING
+        conditions = [
+            status_builder.condition(
+                ConditionType.READY, ConditionStatus.UNKNOWN, "Initializing", now,
+                f"Initializing application {name}"
+            )
+        ]
         
         # Verify Git repositories if enabled
         if config.validation.verify_git_repos and app_spec.tracking.repository:
             repo_ok, repo_msg = await verify_git_repository(str(app_spec.tracking.repository))
             if not repo_ok:
-                new_status.phase = Phase.ERROR
-                new_status.conditions.append(
-                    Condition(
-                        type=ConditionType.READY,
-                        status=ConditionStatus.FALSE,
-                        lastTransitionTime=now,
-                        reason="RepositoryNotAccessible",
-                        message=repo_msg
-                    )
-                )
+                phase = Phase.ERROR
+                conditions.append(status_builder.condition(
+                    ConditionType.READY, ConditionStatus.FALSE, "RepositoryNotAccessible", now,
+                    repo_msg
+                ))
         
         # Verify dependencies if enabled
         if config.validation.strict_dependency_checks:
             deps_ok, errors = await verify_dependencies(spec.get("composition", []))
             if not deps_ok:
-                new_status.phase = Phase.ERROR
-                new_status.conditions.append(
-                    Condition(
-                        type=ConditionType.READY,
-                        status=ConditionStatus.FALSE,
-                        lastTransitionTime=now,
-                        reason="DependencyValidationFailed",
-                        message="; ".join(errors)
-                    )
-                )
+                phase = Phase.ERROR
+                conditions.append(status_builder.condition(
+                    ConditionType.READY, ConditionStatus.FALSE, "DependencyValidationFailed", now,
+                    "; ".join(errors)
+                ))
         
-        if new_status.phase != Phase.ERROR:
-            new_status.conditions.append(
-                Condition(
-                    type=ConditionType.READY,
-                    status=ConditionStatus.TRUE,
-                    lastTransitionTime=now,
-                    reason="ValidationPassed",
-                    message="Application validated successfully"
-                )
-            )
+        if phase != Phase.ERROR:
+            conditions.append(status_builder.condition(
+                ConditionType.READY, ConditionStatus.TRUE, "ValidationPassed", now
+            ))
+        
+        new_status = status_builder.build_status(
+            phase, conditions, now, spec["version"], meta.get("generation", 1)
+        )
         
         # Update metrics
-        update_app_metrics(name, namespace, new_status)
+        update_app_metrics(name, namespace, spec, new_status)
         
         # Update status via patch (assign per-field for Kopf v1)
-        status_payload = json.loads(new_status.json())
-        for k, v in status_payload.items():
-            patch.status[k] = v
+        status_builder.apply_status(patch, new_status)
         
     except Exception as e:
         logger.error(f"❌ Failed to create ApplicationMetadata {namespace}/{name}: {e}")
         raise kopf.PermanentError(f"Failed to create resource: {e}")
 
-@kopf.on.update("apps.company.io", "v1", "applicationmetadata")
+@kopf.on.update("apps.company.io", "v1", "applicationmetadata", when=sharding.owns_object)
+@limited
+@loopmon.timed
 async def update_fn(spec: Dict[str, Any], meta: Dict[str, Any], status: kopf.Status, patch: kopf.Patch, logger: logging.Logger, **kwargs):
     """Handle updates to ApplicationMetadata resources."""
+    startup.first_reconcile()
     name = meta["name"]
     namespace = meta["namespace"]
     logger.info(f"📝 Updating ApplicationMetadata: {namespace}/{name}")
     
     try:
         # Re-validate using Pydantic model
-        app_spec = ApplicationMetadataSpec(**spec)
-        now = datetime.now(timezone.utc)
+        ApplicationMetadataSpec(**spec)
+        now = status_builder.timestamp(datetime.now(timezone.utc))
         
         # Check health of components
-        healthy_components = []
-        unhealthy_components = []
-        
-        for component in app_spec.composition:
-            is_healthy, message = await check_component_health(component.dict())
-            if is_healthy:
-                healthy_components.append(component.name)
-            else:
-                unhealthy_components.append((component.name, message))
+        unhealthy_components = await _unhealthy_components(spec, namespace)
         
         # Determine overall health
         all_healthy = len(unhealthy_components) == 0
-        health_status = ConditionStatus.TRUE if all_healthy else ConditionStatus.FALSE
-        health_reason = "AllComponentsHealthy" if all_healthy else "UnhealthyComponents"
-        health_message = (
-            "All components are healthy"
-            if all_healthy
-            else f"Unhealthy components: {', '.join(c[0] for c in unhealthy_components)}"
-        )
+        if all_healthy:
+            health = status_builder.condition(
+                ConditionType.HEALTHY, ConditionStatus.TRUE, "AllComponentsHealthy", now
+            )
+        else:
+            health = status_builder.condition(
+                ConditionType.HEALTHY, ConditionStatus.FALSE, "UnhealthyComponents", now,
+                f"Unhealthy components: {', '.join(c[0] for c in unhealthy_components)}"
+            )
         
         # Update status
-        new_status = ApplicationMetadataStatus(
-            phase=Phase.ACTIVE if all_healthy else Phase.PENDING,
-            conditions=[
-                Condition(
-                    type=ConditionType.HEALTHY,
-                    status=health_status,
-                    lastTransitionTime=now,
-                    reason=health_reason,
-                    message=health_message
+        new_status = status_builder.build_status(
+            Phase.ACTIVE if all_healthy else Phase.PENDING,
+            [
+                health,
+                status_builder.condition(
+                    ConditionType.READY, ConditionStatus.TRUE, "ValidationPassed", now
                 ),
-                Condition(
-                    type=ConditionType.READY,
-                    status=ConditionStatus.TRUE,
-                    lastTransitionTime=now,
-                    reason="ValidationPassed",
-                    message="Application validated successfully"
-                )
             ],
-            lastUpdated=now,
-            observedVersion=spec["version"],
-            observedGeneration=meta.get("generation", 1)
+            now, spec["version"], meta.get("generation", 1)
         )
         
         # Update metrics
-        update_app_metrics(name, namespace, new_status)
+        update_app_metrics(name, namespace, spec, new_status)
         
         # Update status via patch (assign per-field for Kopf v1)
-        status_payload = json.loads(new_status.json())
-        for k, v in status_payload.items():
-            patch.status[k] = v
+        status_builder.apply_status(patch, new_status)
         
     except Exception as e:
         logger.error(f"❌ Failed to update ApplicationMetadata {namespace}/{name}: {e}")
         raise kopf.PermanentError(f"Failed to update resource: {e}")
 
 @kopf.on.delete("apps.company.io", "v1", "applicationmetadata")
+@loopmon.timed
 async def delete_fn(spec: Dict[str, Any], meta: Dict[str, Any], status: kopf.Status, logger: logging.Logger, **kwargs):
     """Handle deletion of ApplicationMetadata resources."""
     name = meta["name"]
     namespace = meta["namespace"]
+    # Not filtered with when=: kopf would drop the finalizer for a skipped
+    # handler, so during a rebalance the cleanup could run nowhere. A
+    # non-owner keeps the finalizer and retries until the owner has run it;
+    # its retry state is in its own annotations and never delays the owner.
+    if not sharding.owns_object(meta):
+        raise kopf.TemporaryError(f"{namespace}/{name} is owned by another shard",
+                                  delay=get_config().sharding.renew_interval)
     logger.info(f"🗑️ Deleting ApplicationMetadata: {namespace}/{name}")
     
     try:
+        if sharding.manager is not None:
+            sharding.manager.forget(meta)
+        
         # Update metrics (remove)
-        update_app_metrics(name, namespace, None, deleted=True)
+        update_app_metrics(name, namespace, spec, None, deleted=True)
         
         logger.info(f"✅ Successfully deleted ApplicationMetadata {namespace}/{name}")
         
@@ -267,9 +392,41 @@ async def delete_fn(spec: Dict[str, Any], meta: Dict[str, Any], status: kopf.Sta
         raise kopf.PermanentError(f"Failed to delete resource: {e}")
 
 @kopf.timer("apps.company.io", "v1", "applicationmetadata",
-            interval=config.reconcile_interval)
-async def reconcile_fn(spec: Dict[str, Any], meta: Dict[str, Any], status: kopf.Status, patch: kopf.Patch, logger: logging.Logger, **kwargs):
+            interval=get_config().reconcile_tick)
+@loopmon.timed
+async def reconcile_fn(spec: Dict[str, Any], meta: Dict[str, Any], status: kopf.Status, patch: kopf.Patch, memo: kopf.Memo, logger: logging.Logger, **kwargs):
     """Periodically reconcile ApplicationMetadata resources."""
+    # Timers run on every replica so that moved objects are picked up without
+    # waiting for a watch event; only the owning shard does the work.
+    if not sharding.owns_object(meta):
+        forget_app(meta["name"], meta["namespace"])
+        return
+    if sharding.manager is not None:
+        # Drop the kopf state of replicas that left the group
+        for key in sharding.manager.stale_storage_keys(meta.get("annotations", {})):
+            patch.metadata.annotations[key] = None
+
+    # The timer ticks every reconcile_tick; reconcile_interval can change at
+    # runtime. The first due time is jittered so a restart does not reconcile
+    # every object at once.
+    config = get_config()
+    now_mono = time.monotonic()
+    if "last_reconciled" not in memo:
+        memo.last_reconciled = now_mono - random.uniform(0, config.reconcile_interval)
+    if sharding.manager is not None and sharding.manager.take_handoff(meta):
+        # Moved here at a rebalance: its changes were skipped as a non-owner
+        memo.last_reconciled = now_mono - config.reconcile_interval
+    if now_mono - memo.last_reconciled < config.reconcile_interval:
+        return
+    memo.last_reconciled = now_mono
+
+    async with _reconcile_limiter:
+        await _reconcile(spec, meta, patch, logger, config)
+
+async def _reconcile(spec: Dict[str, Any], meta: Dict[str, Any], patch: kopf.Patch, logger: logging.Logger, config: ControllerConfig):
+    """Re-validate an ApplicationMetadata resource and refresh its status."""
+    startup.first_reconcile()
+
     name = meta["name"]
     namespace = meta["namespace"]
     logger.debug(f"🔄 Reconciling ApplicationMetadata: {namespace}/{name}")
@@ -277,92 +434,66 @@ async def reconcile_fn(spec: Dict[str, Any], meta: Dict[str, Any], status: kopf.
     try:
         # Re-validate and check health
         app_spec = ApplicationMetadataSpec(**spec)
-        now = datetime.now(timezone.utc)
+        now = status_builder.timestamp(datetime.now(timezone.utc))
         
         # Build fresh status
-        new_status = ApplicationMetadataStatus(
-            phase=Phase.PENDING,
-            conditions=[],
-            lastUpdated=now,
-            observedVersion=spec["version"],
-            observedGeneration=meta.get("generation", 1)
-        )
+        phase = Phase.PENDING
+        conditions: List[Dict[str, Any]] = []
         
         # Check Git repositories
         repo_ok = True
         if config.validation.verify_git_repos and app_spec.tracking.repository:
             repo_ok, _ = await verify_git_repository(str(app_spec.tracking.repository))
             if not repo_ok:
-                new_status.phase = Phase.ERROR
-                new_status.conditions.append(
-                    Condition(
-                        type=ConditionType.READY,
-                        status=ConditionStatus.FALSE,
-                        lastTransitionTime=now,
-                        reason="RepositoryNotAccessible",
-                        message=f"Repository {app_spec.tracking.repository} is not accessible"
-                    )
-                )
+                phase = Phase.ERROR
+                conditions.append(status_builder.condition(
+                    ConditionType.READY, ConditionStatus.FALSE, "RepositoryNotAccessible", now,
+                    f"Repository {app_spec.tracking.repository} is not accessible"
+                ))
         
         if repo_ok:
             # Check component health
-            healthy_components = []
-            unhealthy_components = []
-            
-            for component in app_spec.composition:
-                is_healthy, message = await check_component_health(component.dict())
-                if is_healthy:
-                    healthy_components.append(component.name)
-                else:
-                    unhealthy_components.append((component.name, message))
+            unhealthy_components = await _unhealthy_components(spec, namespace)
             
             # Update status based on health
             all_healthy = len(unhealthy_components) == 0
             if all_healthy:
-                new_status.phase = Phase.ACTIVE
-                new_status.conditions.extend([
-                    Condition(
-                        type=ConditionType.HEALTHY,
-                        status=ConditionStatus.TRUE,
-                        lastTransitionTime=now,
-                        reason="AllComponentsHealthy",
-                        message="All components are healthy"
+                phase = Phase.ACTIVE
+                conditions.extend([
+                    status_builder.condition(
+                        ConditionType.HEALTHY, ConditionStatus.TRUE, "AllComponentsHealthy", now
+                    ),
+                    status_builder.condition(
+                        ConditionType.READY, ConditionStatus.TRUE, "ValidationPassed", now
                     ),
-                    Condition(
-                        type=ConditionType.READY,
-                        status=ConditionStatus.TRUE,
-                        lastTransitionTime=now,
-                        reason="ValidationPassed",
-                        message="Application validated successfully"
-                    )
                 ])
             else:
-                new_status.phase = Phase.PENDING
-                new_status.conditions.extend([
-                    Condition(
-                        type=ConditionType.HEALTHY,
-                        status=ConditionStatus.FALSE,
-                        lastTransitionTime=now,
-                        reason="UnhealthyComponents",
-                        message=f"Unhealthy components: {', '.join(c[0] for c in unhealthy_components)}"
+                phase = Phase.PENDING
+                conditions.extend([
+                    status_builder.condition(
+                        ConditionType.HEALTHY, ConditionStatus.FALSE, "UnhealthyComponents", now,
+                        f"Unhealthy components: {', '.join(c[0] for c in unhealthy_components)}"
+                    ),
+                    status_builder.condition(
+                        ConditionType.READY, ConditionStatus.TRUE, "ValidationPassed", now,
+                        "Application is valid but not all components are healthy"
                     ),
-                    Condition(
-                        type=ConditionType.READY,
-                        status=ConditionStatus.TRUE,
-                        lastTransitionTime=now,
-                        reason="ValidationPassed",
-                        message="Application is valid but not all components are healthy"
-                    )
                 ])
         
+        new_status = status_builder.build_status(
+            phase, conditions, now, spec["version"], meta.get("generation", 1)
+        )
+        
         # Update metrics
-        update_app_metrics(name, namespace, new_status)
+        update_app_metrics(name, namespace, spec, new_status)
         
         # Update status via patch (assign per-field for Kopf v1)
-        status_payload = json.loads(new_status.json())
-        for k, v in status_payload.items():
-            patch.status[k] = v
+        status_builder.apply_status(patch, new_status)
         
     except Exception as e:
         logger.error(f"❌ Failed to reconcile ApplicationMetadata {namespace}/{name}: {e}")
         # Don't raise error - let it retry next reconciliation
+
+# Workload watches for the health engine are only registered when enabled
+if get_config().health.enabled:
+    health_engine.register(get_config().health)
@@ -1,40 +1,17 @@
 """
 Prometheus metrics for ApplicationMetadata controller.
 """
+import collections
 import logging
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
-from prometheus_client import Counter, Gauge, Histogram
-from controller.models import ApplicationMetadataStatus, Phase
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
 # Metrics definitions
-APPS_TOTAL = Gauge(
-    "appmetadata_applications_total",
-    "Total number of applications by phase",
-    ["phase"]
-)
-
-APPS_BY_ENVIRONMENT = Gauge(
-    "appmetadata_applications_by_environment",
-    "Number of applications by environment",
-    ["environment"]
-)
-
-APPS_BY_BUSINESS_UNIT = Gauge(
-    "appmetadata_applications_by_business_unit",
-    "Number of applications by business unit",
-    ["business_unit"]
-)
-
-COMPONENT_COUNT = Gauge(
-    "appmetadata_components_total",
-    "Total number of components by type",
-    ["type"]
-)
-
 STATUS_CHANGES = Counter(
     "appmetadata_status_changes_total",
     "Number of application status changes",
@@ -53,8 +30,150 @@ VALIDATION_ERRORS = Counter(
     ["error_type"]
 )
 
-# Cache for tracking application phases
-_app_phases: Dict[str, str] = {}
+SHARD_OBJECTS = Gauge(
+    "appmetadata_shard_objects",
+    "Number of applications owned by this shard",
+    ["shard"],
+    multiprocess_mode="livesum"
+)
+
+SHARD_MEMBERS = Gauge(
+    "appmetadata_shard_members",
+    "Number of live replicas in the shard group",
+    multiprocess_mode="livesum"
+)
+
+SHARD_HANDOFF_LATENCY = Histogram(
+    "appmetadata_shard_handoff_seconds",
+    "Time from a membership change to the new owner first handling a moved application",
+    buckets=[0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0]
+)
+
+STARTUP_SECONDS = Gauge(
+    "appmetadata_startup_seconds",
+    "Startup timings: import stages and time from process start to first reconcile",
+    ["stage"],
+    multiprocess_mode="max"
+)
+
+CONFIG_GENERATION = Gauge(
+    "appmetadata_config_generation",
+    "Generation of the configuration currently applied (1 = loaded at startup)",
+    multiprocess_mode="max"
+)
+
+CONFIG_RELOAD_ERRORS = Counter(
+    "appmetadata_config_reload_errors_total",
+    "Number of configuration reloads rejected because the new file was invalid"
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "appmetadata_log_records_dropped_total",
+    "Log records dropped by the logging pipeline",
+    ["reason"]
+)
+
+HEALTH_CACHE_OBJECTS = Gauge(
+    "appmetadata_health_cache_objects",
+    "Workloads held in the health engine cache by kind",
+    ["kind"],
+    multiprocess_mode="livesum"
+)
+
+HEALTH_CACHE_BYTES = Gauge(
+    "appmetadata_health_cache_bytes",
+    "Estimated memory used by the health engine cache index",
+    multiprocess_mode="livesum"
+)
+
+HEALTH_CACHE_EVENT_LAG = Histogram(
+    "appmetadata_health_cache_event_lag_seconds",
+    "Time from a workload's last write to its watch event reaching the health cache",
+    ["kind"],
+    buckets=[0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
+)
+
+ADMISSION_DURATION = Histogram(
+    "appmetadata_admission_duration_seconds",
+    "Time spent reviewing admission requests",
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5]
+)
+
+ADMISSION_REVIEWS = Counter(
+    "appmetadata_admission_reviews_total",
+    "Admission reviews by result",
+    ["result"]
+)
+
+ADMISSION_EXTERNAL_SKIPPED = Counter(
+    "appmetadata_admission_external_checks_skipped_total",
+    "External admission checks still pending when the latency budget ran out"
+)
+
+ADMISSION_CACHE_LOOKUPS = Counter(
+    "appmetadata_admission_cache_lookups_total",
+    "Admission decision cache lookups by result",
+    ["result"]
+)
+
+ADMISSION_CACHE_ENTRIES = Gauge(
+    "appmetadata_admission_cache_entries",
+    "Admission decisions held in the cache",
+    multiprocess_mode="livesum"
+)
+
+EVENT_LOOP_LAG = Gauge(
+    "appmetadata_event_loop_lag_seconds",
+    "How late the event loop heartbeat last woke up",
+    multiprocess_mode="max"
+)
+
+EVENT_LOOP_BUSY_SECONDS = Counter(
+    "appmetadata_event_loop_busy_seconds_total",
+    "Time the event loop spent running callbacks"
+)
+
+EVENT_LOOP_IDLE_SECONDS = Counter(
+    "appmetadata_event_loop_idle_seconds_total",
+    "Time the event loop spent waiting for I/O or timers"
+)
+
+SLOW_CALLBACKS = Counter(
+    "appmetadata_event_loop_slow_callbacks_total",
+    "Event loop iterations longer than the slow callback threshold"
+)
+
+HANDLER_LOOP_SECONDS = Counter(
+    "appmetadata_handler_loop_seconds_total",
+    "Time handlers spent running on the event loop, excluding awaits",
+    ["handler"]
+)
+
+# Application inventory, turned into gauges at scrape time by InventoryCollector.
+# Handlers only write here; nothing is incremented or decremented per event.
+class AppRecord(NamedTuple):
+    phase: str
+    environment: str
+    business_unit: str
+    component_types: Tuple[str, ...]
+
+
+_apps: Dict[str, AppRecord] = {}
+
+OTHER_LABEL = "other"
+
+# (metric name, documentation, label, AppRecord -> label values)
+INVENTORY_GAUGES: List[Tuple[str, str, str, Callable[[AppRecord], Iterable[str]]]] = [
+    ("appmetadata_applications_total", "Total number of applications by phase",
+     "phase", lambda app: (app.phase,)),
+    ("appmetadata_applications_by_environment", "Number of applications by environment",
+     "environment", lambda app: (app.environment,)),
+    ("appmetadata_applications_by_business_unit", "Number of applications by business unit",
+     "business_unit", lambda app: (app.business_unit,)),
+    ("appmetadata_components_total", "Total number of components by type",
+     "type", lambda app: app.component_types),
+]
+
 
 def _get_app_key(name: str, namespace: str) -> str:
     """Generate a unique key for an application."""
@@ -63,44 +182,94 @@ def _get_app_key(name: str, namespace: str) -> str:
 def update_app_metrics(
     name: str,
     namespace: str,
-    status: Optional[ApplicationMetadataStatus],
+    spec: Optional[Dict[str, Any]],
+    status: Optional[Dict[str, Any]],
     deleted: bool = False
 ) -> None:
-    """Update metrics for an application."""
-    try:
-        app_key = _get_app_key(name, namespace)
-        
-        if deleted:
-            # Decrease counters if app is deleted
-            if app_key in _app_phases:
-                old_phase = _app_phases[app_key]
-                APPS_TOTAL.labels(phase=old_phase).dec()
-                del _app_phases[app_key]
-            return
-        
-        if not status:
-            return
-            
-        # Update phase metrics
-        new_phase = status.phase
-        if app_key in _app_phases:
-            old_phase = _app_phases[app_key]
-            if old_phase != new_phase:
-                # Phase changed
-                APPS_TOTAL.labels(phase=old_phase).dec()
-                APPS_TOTAL.labels(phase=new_phase).inc()
-                STATUS_CHANGES.labels(
-                    from_phase=old_phase,
-                    to_phase=new_phase
-                ).inc()
-        else:
-            # New application
-            APPS_TOTAL.labels(phase=new_phase).inc()
-        
-        _app_phases[app_key] = new_phase
-        
-    except Exception as e:
-        logger.error(f"Failed to update metrics for {namespace}/{name}: {e}")
+    """Record an application's current state for the inventory gauges."""
+    app_key = _get_app_key(name, namespace)
+    if deleted:
+        _apps.pop(app_key, None)
+        return
+    if not status:
+        return
+
+    new_phase = status["phase"]
+    old = _apps.get(app_key)
+    if old is not None and old.phase != new_phase:
+        STATUS_CHANGES.labels(from_phase=old.phase, to_phase=new_phase).inc()
+    _apps[app_key] = AppRecord(
+        new_phase,
+        spec.get("environment", ""),
+        spec.get("businessUnit", ""),
+        tuple(component.get("type", "") for component in spec.get("composition") or []),
+    )
+
+def forget_app(name: str, namespace: str) -> None:
+    """Stop reporting an application this process no longer handles."""
+    _apps.pop(_get_app_key(name, namespace), None)
+
+def _cap(counts: "collections.Counter[str]", limit: int) -> Dict[str, int]:
+    """Keep the ``limit - 1`` largest label values and fold the rest into "other"."""
+    if limit <= 0 or len(counts) <= limit:
+        return dict(counts)
+    capped = dict(counts.most_common(limit - 1))
+    capped[OTHER_LABEL] = capped.get(OTHER_LABEL, 0) + sum(counts.values()) - sum(capped.values())
+    return capped
+
+def inventory() -> Dict[str, Dict[str, int]]:
+    """Compute label value -> count for every inventory gauge."""
+    from controller.config import get_config
+    limit = get_config().metrics.max_label_values
+    apps = list(_apps.values())  # snapshot; scrapes run on the metrics server thread
+    result = {}
+    for metric, _, _, values in INVENTORY_GAUGES:
+        counts: "collections.Counter[str]" = collections.Counter()
+        for app in apps:
+            counts.update(values(app))
+        result[metric] = _cap(counts, limit)
+    return result
+
+
+class InventoryCollector:
+    """Custom collector producing the inventory gauges from ``_apps`` per scrape."""
+
+    def describe(self) -> List[GaugeMetricFamily]:
+        return [GaugeMetricFamily(metric, doc, labels=[label])
+                for metric, doc, label, _ in INVENTORY_GAUGES]
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        counts = inventory()
+        for metric, doc, label, _ in INVENTORY_GAUGES:
+            family = GaugeMetricFamily(metric, doc, labels=[label])
+            for value, count in counts[metric].items():
+                family.add_metric([value], count)
+            yield family
+
+
+def register_inventory_collector(registry: CollectorRegistry = REGISTRY) -> None:
+    """Serve the inventory gauges from the in-process registry."""
+    registry.register(InventoryCollector())
+
+
+# Multiprocess mode only aggregates values written to the shared files, and a
+# custom collector in a worker is never scraped. Workers therefore copy the
+# computed inventory into these livesum gauges periodically instead.
+_MIRROR_GAUGES = {
+    metric: Gauge(metric, doc, [label], multiprocess_mode="livesum", registry=None)
+    for metric, doc, label, _ in INVENTORY_GAUGES
+}
+_mirrored: Dict[str, Set[str]] = {metric: set() for metric in _MIRROR_GAUGES}
+
+def mirror_inventory() -> None:
+    """Copy the current inventory into the multiprocess gauges."""
+    for metric, counts in inventory().items():
+        gauge = _MIRROR_GAUGES[metric]
+        for value in _mirrored[metric] - counts.keys():
+            gauge.labels(value).set(0)
+        for value, count in counts.items():
+            gauge.labels(value).set(count)
+        _mirrored[metric] = set(counts)
 
 def record_validation_error(error_type: str) -> None:
     """Record a validation error."""
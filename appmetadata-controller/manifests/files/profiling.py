@@ -0,0 +1,130 @@
+"""
+On-demand profiling endpoints for the metrics port.
+
+- ``/debug/profile?seconds=N``: samples the event loop thread's stack with
+  ``sys._current_frames()`` for N seconds and returns collapsed stacks
+  (``frame;frame;frame count`` per line), the input format of flamegraph.pl,
+  speedscope and inferno. The sampler needs the GIL, so callbacks shorter than
+  the interpreter switch interval (5 ms) are under-represented; the slow ones
+  that cause latency spikes are captured.
+- ``/debug/heap?seconds=N&top=M``: traces allocations with ``tracemalloc`` for
+  N seconds and returns the M largest allocation sites still alive.
+
+Both require ``Authorization: Bearer <debug token>``. Nothing runs until a
+request arrives: no sampler thread, and tracemalloc only traces during a heap
+request. When ``debug.enabled`` is off the routes are not mounted at all.
+"""
+import hmac
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import parse_qs
+
+from controller.config import DebugConfig
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+TOKEN_ENV = "APPMETADATA_DEBUG_TOKEN"
+
+# One profile or heap trace at a time; they are expensive while they run
+_busy = threading.Lock()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float) -> Dict[str, int]:
+    """Sample one thread's stack every ``interval`` seconds; return collapsed counts."""
+    counts: Dict[str, int] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            break
+        stack = []
+        while frame is not None:
+            stack.append(_frame_name(frame))
+            frame = frame.f_back
+        counts[";".join(reversed(stack))] += 1
+        del frame, stack
+        time.sleep(interval)
+    return counts
+
+
+def heap_top(seconds: float, top: int) -> str:
+    """Trace allocations for ``seconds`` and report the ``top`` largest sites."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        time.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    stats = snapshot.statistics("lineno")
+    lines = [f"# {len(stats)} allocation sites, top {top} by size"]
+    lines.extend(str(stat) for stat in stats[:top])
+    return "\n".join(lines) + "\n"
+
+
+def _token(config: DebugConfig) -> str:
+    return config.token or os.environ.get(TOKEN_ENV, "")
+
+
+def make_app(config: DebugConfig, loop_thread: Callable[[], Optional[int]]):
+    """WSGI app for ``/debug/*``; ``loop_thread`` returns the event loop's thread id."""
+
+    def respond(start_response, status: str, body: str) -> Iterable[bytes]:
+        start_response(status, [("Content-Type", "text/plain; charset=utf-8")])
+        return [body.encode()]
+
+    def param(query: Dict, name: str, default: float, upper: float) -> float:
+        value = float(query.get(name, [default])[0])
+        if not math.isfinite(value):  # nan would pass the clamp below
+            raise ValueError(f"{name} must be a finite number")
+        return min(max(value, 0.0), upper)
+
+    def app(environ, start_response) -> Iterable[bytes]:
+        token = _token(config)
+        header = environ.get("HTTP_AUTHORIZATION", "")
+        if not token or not hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+            return respond(start_response, "401 Unauthorized", "Unauthorized\n")
+
+        path = environ.get("PATH_INFO", "")
+        try:
+            query = parse_qs(environ.get("QUERY_STRING", ""))
+            seconds = param(query, "seconds", 10, config.max_seconds)
+            top = int(param(query, "top", 25, 1000))
+        except ValueError as e:
+            return respond(start_response, "400 Bad Request", f"{e}\n")
+
+        if path not in ("/debug/profile", "/debug/heap"):
+            return respond(start_response, "404 Not Found", "Not Found\n")
+        if not _busy.acquire(blocking=False):
+            return respond(start_response, "409 Conflict", "Another profile is running\n")
+        try:
+            logger.info(f"🔬 Debug {path} for {seconds}s requested")
+            if path == "/debug/heap":
+                return respond(start_response, "200 OK", heap_top(seconds, top))
+
+            thread_id = loop_thread()
+            if thread_id is None:
+                return respond(start_response, "503 Service Unavailable", "Event loop not running\n")
+            counts = sample_stacks(thread_id, seconds, config.sample_interval)
+            body = "".join(f"{stack} {count}\n" for stack, count in counts.items())
+            return respond(start_response, "200 OK", body)
+        finally:
+            _busy.release()
+
+    return app
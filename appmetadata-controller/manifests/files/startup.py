@@ -0,0 +1,60 @@
+"""
+Startup-time profiling for the ApplicationMetadata controller.
+
+Records how long the heavy imports take and how long it takes from process
+start to the first reconcile. Timings are exported as a gauge and, with
+``--profile-startup``, logged once as a JSON line.
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# Reference point: the first import of this module (done first thing by __main__)
+STARTED = time.perf_counter()
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Log the report at the first reconcile (--profile-startup; inherited by workers)
+enabled = os.getenv("APPMETADATA_PROFILE_STARTUP") == "1"
+
+_timings: Dict[str, float] = {}
+_first_reconcile_seen = False
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a startup stage, e.g. ``with stage("import_kopf"): import kopf``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings[name] = time.perf_counter() - start
+
+
+def mark(name: str) -> None:
+    """Record the time elapsed since process start."""
+    _timings[name] = time.perf_counter() - STARTED
+
+
+def first_reconcile() -> None:
+    """Called from every handler; only the first call does any work."""
+    global _first_reconcile_seen
+    if _first_reconcile_seen:
+        return
+    _first_reconcile_seen = True
+    mark("time_to_first_reconcile")
+
+    from controller.metrics import STARTUP_SECONDS
+    for name, seconds in _timings.items():
+        STARTUP_SECONDS.labels(stage=name).set(seconds)
+    if enabled:
+        logger.info(f"⏱️ Startup profile: {json.dumps(report())}")
+
+
+def report() -> Dict[str, float]:
+    """Return the recorded timings in seconds."""
+    return {name: round(seconds, 4) for name, seconds in _timings.items()}
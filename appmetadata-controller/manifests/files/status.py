@@ -0,0 +1,75 @@
+"""
+Status payloads for ApplicationMetadata resources.
+
+Handlers used to build ``ApplicationMetadataStatus``/``Condition`` models and
+round-trip them through JSON to get a dict for the patch. Here conditions are
+copied from templates keyed by ``(type, status, reason)`` and only the dynamic
+fields are filled in, producing the same plain dicts directly.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from controller.models import ConditionStatus, ConditionType, Phase
+
+TemplateKey = Tuple[ConditionType, ConditionStatus, str]
+
+_templates: Dict[TemplateKey, Dict[str, Any]] = {}
+
+
+def _template(condition_type: ConditionType, status: ConditionStatus, reason: str,
+              message: Optional[str] = None) -> Dict[str, Any]:
+    key = (condition_type, status, reason)
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = {
+            "type": condition_type.value,
+            "status": status.value,
+            "lastTransitionTime": None,
+            "reason": reason,
+            "message": message,
+        }
+    return template
+
+
+def condition(condition_type: ConditionType, status: ConditionStatus, reason: str,
+              timestamp: str, message: Optional[str] = None) -> Dict[str, Any]:
+    """Return a condition dict; ``message`` overrides the template's default."""
+    result = _template(condition_type, status, reason).copy()
+    result["lastTransitionTime"] = timestamp
+    if message is not None:
+        result["message"] = message
+    return result
+
+
+def timestamp(now: datetime) -> str:
+    """Format a timestamp once per reconcile for all conditions of a status."""
+    return now.isoformat()
+
+
+def build_status(phase: Phase, conditions: List[Dict[str, Any]], now: str,
+                 observed_version: str, observed_generation: int) -> Dict[str, Any]:
+    """Return the status payload to write into ``patch.status``."""
+    return {
+        "phase": phase.value,
+        "conditions": conditions,
+        "lastUpdated": now,
+        "observedVersion": observed_version,
+        "observedGeneration": observed_generation,
+    }
+
+
+def apply_status(patch, payload: Dict[str, Any]) -> None:
+    """Assign the payload per field, leaving other status keys (e.g. kopf's) alone."""
+    for key, value in payload.items():
+        patch.status[key] = value
+
+
+# Conditions with a fixed message, precomputed at import
+_template(ConditionType.READY, ConditionStatus.TRUE, "ValidationPassed",
+          "Application validated successfully")
+_template(ConditionType.HEALTHY, ConditionStatus.TRUE, "AllComponentsHealthy",
+          "All components are healthy")
+_template(ConditionType.READY, ConditionStatus.UNKNOWN, "Initializing")
+_template(ConditionType.READY, ConditionStatus.FALSE, "RepositoryNotAccessible")
+_template(ConditionType.READY, ConditionStatus.FALSE, "DependencyValidationFailed")
+_template(ConditionType.HEALTHY, ConditionStatus.FALSE, "UnhealthyComponents")
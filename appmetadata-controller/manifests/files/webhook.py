@@ -0,0 +1,246 @@
+"""
+Validating admission webhook for ApplicationMetadata resources.
+
+Serves ``AdmissionReview`` (admission.k8s.io/v1) requests over HTTPS on the
+operator's event loop. A spec is admitted only if it passes the ``models.py``
+validation and the component dependency checks. Updates that leave the spec
+unchanged, or touch an object being deleted, are allowed without validation.
+External checks (git repositories) are optional and bounded by a latency
+budget: a check that has not finished in time is skipped for this request but
+keeps running, so its cached result is available to the next one.
+
+Decisions are kept in a bounded LRU keyed by a hash of the canonical spec JSON
+and the configuration generation, so objects that GitOps tools re-apply
+unchanged are answered without validating them again.
+
+The certificate and key are reloaded in place when their files change, so a
+rotated Secret is picked up without a restart.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import ssl
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+from pydantic import ValidationError
+
+from controller import reloader
+from controller.config import ControllerConfig, WebhookConfig, get_config
+from controller.handlers import verify_dependencies, verify_git_repository
+from controller.metrics import (
+    ADMISSION_CACHE_ENTRIES,
+    ADMISSION_CACHE_LOOKUPS,
+    ADMISSION_DURATION,
+    ADMISSION_EXTERNAL_SKIPPED,
+    ADMISSION_REVIEWS,
+)
+from controller.models import ApplicationMetadataSpec
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [
+        f"spec.{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    ]
+
+
+class DecisionCache:
+    """Bounded LRU of admission decisions (the response without its uid)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        # key -> (expires_at, decision)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def key(spec: Dict[str, Any]) -> str:
+        canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(canonical.encode()).hexdigest()
+        return f"{reloader.generation()}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        ADMISSION_CACHE_LOOKUPS.labels(result="miss" if entry is None else "hit").inc()
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, decision: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store a decision; ``ttl`` bounds decisions that depend on external checks."""
+        expires = float("inf") if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expires, decision)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        ADMISSION_CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self, old: ControllerConfig = None, new: ControllerConfig = None) -> None:
+        """Drop all decisions; subscribed to config reloads."""
+        self._entries.clear()
+        ADMISSION_CACHE_ENTRIES.set(0)
+
+
+class AdmissionServer:
+    """aiohttp server answering validating admission reviews."""
+
+    def __init__(self, config: WebhookConfig):
+        self.config = config
+        self._runner: Optional[web.AppRunner] = None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self._cert_mtimes: Tuple[float, float] = (0.0, 0.0)
+        self._cert_task: Optional[asyncio.Task] = None
+        # External checks that outlived their request's budget
+        self._background: Set[asyncio.Task] = set()
+        self._decisions: Optional[DecisionCache] = None
+        if config.decision_cache_size > 0:
+            self._decisions = DecisionCache(config.decision_cache_size)
+            reloader.subscribe(self._decisions.clear)
+
+    def certificates_present(self) -> bool:
+        return os.path.isfile(self.config.cert_file) and os.path.isfile(self.config.key_file)
+
+    def _stat_certificates(self) -> Tuple[float, float]:
+        return (os.stat(self.config.cert_file).st_mtime, os.stat(self.config.key_file).st_mtime)
+
+    def _load_certificates(self) -> None:
+        mtimes = self._stat_certificates()
+        # Reloading into the same context applies to all later handshakes
+        self._ssl_context.load_cert_chain(self.config.cert_file, self.config.key_file)
+        self._cert_mtimes = mtimes
+
+    async def _watch_certificates(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.cert_reload_interval)
+            try:
+                if self._stat_certificates() != self._cert_mtimes:
+                    self._load_certificates()
+                    logger.info("🔐 Webhook certificate reloaded")
+            except (OSError, ssl.SSLError) as e:
+                logger.warning(f"⚠️ Failed to reload webhook certificate, keeping the current one: {e}")
+
+    async def _external_errors(self, spec: ApplicationMetadataSpec, budget: float) -> Tuple[List[str], List[str]]:
+        """Run external checks within ``budget`` seconds; return (errors, warnings)."""
+        if not (get_config().validation.verify_git_repos and spec.tracking.repository):
+            return [], []
+        url = str(spec.tracking.repository)
+        task = asyncio.ensure_future(verify_git_repository(url))
+        done, _ = await asyncio.wait({task}, timeout=max(budget, 0))
+        if not done:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            ADMISSION_EXTERNAL_SKIPPED.inc()
+            return [], [f"Repository check for {url} skipped: latency budget exceeded"]
+        ok, message = task.result()
+        return ([] if ok else [f"Repository {url} is not accessible: {message}"]), []
+
+    async def review(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the ``response`` part of an AdmissionReview for ``request``."""
+        started = time.monotonic()
+        response: Dict[str, Any] = {"uid": request.get("uid", ""), "allowed": True}
+        obj = request.get("object")
+        if request.get("operation") not in ("CREATE", "UPDATE") or not obj:
+            return response
+
+        spec = obj.get("spec") or {}
+        if not isinstance(spec, dict):
+            response["allowed"] = False
+            response["status"] = {"code": 422, "reason": "Invalid", "message": "spec: must be an object"}
+            return response
+        if request.get("operation") == "UPDATE":
+            old = request.get("oldObject") or {}
+            # Metadata-only changes (finalizers, annotations) and anything on an
+            # object being deleted are allowed, so that an object that was
+            # invalid before the webhook existed can still be cleaned up
+            if (obj.get("metadata") or {}).get("deletionTimestamp") or old.get("spec") == obj.get("spec"):
+                return response
+
+        cache_key = None
+        if self._decisions is not None:
+            cache_key = DecisionCache.key(spec)
+            decision = self._decisions.get(cache_key)
+            if decision is not None:
+                response.update(decision)
+                return response
+
+        errors: List[str] = []
+        warnings: List[str] = []
+        external = False
+        try:
+            app_spec = ApplicationMetadataSpec(**spec)
+        except ValidationError as e:
+            errors = _validation_messages(e)
+        else:
+            _, errors = await verify_dependencies(spec["composition"])
+            if not errors and self.config.external_checks:
+                external = True
+                budget = self.config.latency_budget_ms / 1000 - (time.monotonic() - started)
+                errors, warnings = await self._external_errors(app_spec, budget)
+
+        if errors:
+            response["allowed"] = False
+            response["status"] = {"code": 422, "reason": "Invalid", "message": "; ".join(errors)}
+        if warnings:
+            # Incomplete: a skipped external check must run again next time
+            response["warnings"] = warnings
+        elif cache_key is not None:
+            # Repository results may change; keep them no longer than the repository cache
+            ttl = get_config().validation.repository_cache_ttl if external else None
+            if ttl != 0:
+                self._decisions.put(cache_key, {k: v for k, v in response.items() if k != "uid"}, ttl)
+        return response
+
+    async def handle(self, request: web.Request) -> web.Response:
+        started = time.monotonic()
+        try:
+            body = json.loads(await request.read())
+            response = await self.review(body.get("request") or {})
+        except (ValueError, AttributeError) as e:
+            ADMISSION_REVIEWS.labels(result="error").inc()
+            return web.Response(status=400, text=f"Invalid AdmissionReview: {e}")
+
+        ADMISSION_REVIEWS.labels(result="allowed" if response["allowed"] else "denied").inc()
+        ADMISSION_DURATION.observe(time.monotonic() - started)
+        review = {
+            "apiVersion": body.get("apiVersion", "admission.k8s.io/v1"),
+            "kind": "AdmissionReview",
+            "response": response,
+        }
+        return web.Response(body=json.dumps(review).encode(), content_type="application/json")
+
+    async def start(self, host: str = "0.0.0.0", tls: bool = True) -> None:
+        """Start serving; ``tls=False`` is for local benchmarks only."""
+        app = web.Application()
+        app.router.add_post(self.config.path, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        if tls:
+            self._ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self._load_certificates()
+            self._cert_task = asyncio.create_task(self._watch_certificates())
+
+        # reuse_port lets every worker process of the supervisor serve the same port
+        site = web.TCPSite(self._runner, host, self.config.port,
+                           ssl_context=self._ssl_context, reuse_port=True)
+        await site.start()
+        logger.info(f"🛡️ Admission webhook listening on :{self.config.port}{self.config.path}")
+
+    async def stop(self) -> None:
+        if self._cert_task is not None:
+            self._cert_task.cancel()
+        for task in list(self._background):
+            task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -39,6 +39,18 @@ configMapGenerator:
   - files/models.py
   - files/metrics.py
   - files/handlers.py
+  - files/sharding.py
+  - files/supervisor.py
+  - files/startup.py
+  - files/reloader.py
+  - files/concurrency.py
+  - files/logs.py
+  - files/status.py
+  - files/health.py
+  - files/webhook.py
+  - files/server.py
+  - files/profiling.py
+  - files/loopmon.py
   options:
     disableNameSuffixHash: true
 
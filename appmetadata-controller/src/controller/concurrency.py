@@ -0,0 +1,58 @@
+"""
+Concurrency limiting for reconcile work.
+"""
+import asyncio
+
+
+class ResizableLimiter:
+    """An async semaphore whose limit can change at runtime.
+
+    A limit of 0 or less means unlimited; in that case entering and leaving
+    the limiter does not touch any lock.
+    """
+
+    def __init__(self, limit: int = 0):
+        self._limit = limit
+        self._active = 0
+        self._waiting = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _has_room(self) -> bool:
+        return self._limit <= 0 or self._active < self._limit
+
+    async def __aenter__(self) -> "ResizableLimiter":
+        if self._waiting == 0 and self._has_room():
+            self._active += 1
+            return self
+        async with self._condition:
+            self._waiting += 1
+            try:
+                await self._condition.wait_for(self._has_room)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._active -= 1
+        if self._waiting:
+            async with self._condition:
+                self._condition.notify()
+
+    async def resize(self, limit: int) -> None:
+        """Change the limit; waiters are admitted at once if it grew."""
+        self._limit = limit
+        async with self._condition:
+            self._condition.notify_all()
@@ -0,0 +1,175 @@
+"""
+Component health backed by shared watch caches.
+
+When ``health.enabled`` is set, kopf watches Deployments, StatefulSets, Pods
+and Services that carry the component label. Each event updates a small
+per-object record and a per-component aggregate, so judging a component's
+health is a dictionary lookup instead of an API request per reconcile.
+
+Workloads are matched to a ``Component`` by namespace, the app label (equal to
+the ApplicationMetadata ``spec.name``) and the component label (equal to the
+component ``name``).
+"""
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import kopf
+
+from controller.config import HealthConfig
+from controller.metrics import HEALTH_CACHE_BYTES, HEALTH_CACHE_EVENT_LAG, HEALTH_CACHE_OBJECTS
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# (namespace, app, component)
+ComponentKey = Tuple[str, str, str]
+
+WATCHED_KINDS = {
+    "Deployment": ("apps", "v1", "deployments"),
+    "StatefulSet": ("apps", "v1", "statefulsets"),
+    "Pod": ("", "v1", "pods"),
+    "Service": ("", "v1", "services"),
+}
+
+# Watch events caused by a recent write. Listings (initial and after a watch
+# restart) have no event type and carry objects of any age.
+LIVE_EVENTS = {"ADDED", "MODIFIED", "DELETED"}
+
+
+class ComponentHealth:
+    """Aggregate of the cached workloads of one component."""
+    __slots__ = ("workloads", "unhealthy", "services")
+
+    def __init__(self):
+        self.workloads = 0
+        self.unhealthy = 0
+        self.services = 0
+
+
+def _workload_healthy(kind: str, body: Dict[str, Any]) -> bool:
+    spec = body.get("spec") or {}
+    status = body.get("status") or {}
+    if kind == "Deployment":
+        desired = spec.get("replicas", 1)
+        current = status.get("observedGeneration", 0) >= body["metadata"].get("generation", 0)
+        return current and status.get("availableReplicas", 0) >= desired
+    if kind == "StatefulSet":
+        return status.get("readyReplicas", 0) >= spec.get("replicas", 1)
+    if kind == "Pod":
+        if status.get("phase") == "Succeeded":
+            return True
+        return any(
+            c.get("type") == "Ready" and c.get("status") == "True"
+            for c in status.get("conditions") or []
+        )
+    return True
+
+
+def _event_lag(meta: Dict[str, Any]) -> Optional[float]:
+    """Seconds since the object's last recorded write (second precision)."""
+    times = [f.get("time") for f in meta.get("managedFields") or [] if f.get("time")]
+    if not times:
+        return None
+    last = datetime.fromisoformat(max(times).replace("Z", "+00:00"))
+    return max(0.0, (datetime.now(timezone.utc) - last).total_seconds())
+
+
+class WorkloadCache:
+    """Per-object health records and per-component aggregates."""
+
+    def __init__(self, config: HealthConfig):
+        self.config = config
+        # (kind, namespace, name) -> (component key, healthy)
+        self._objects: Dict[Tuple[str, str, str], Tuple[ComponentKey, bool]] = {}
+        self._components: Dict[ComponentKey, ComponentHealth] = {}
+        self._counts: Dict[str, int] = {kind: 0 for kind in WATCHED_KINDS}
+        self._bytes = 0
+
+    @staticmethod
+    def _entry_size(key, value) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value) + sys.getsizeof(value[0])
+
+    def _remove(self, key) -> None:
+        entry = self._objects.pop(key, None)
+        if entry is None:
+            return
+        component_key, healthy = entry
+        self._counts[key[0]] -= 1
+        self._bytes -= self._entry_size(key, entry)
+        aggregate = self._components[component_key]
+        if key[0] == "Service":
+            aggregate.services -= 1
+        else:
+            aggregate.workloads -= 1
+            aggregate.unhealthy -= not healthy
+        if not (aggregate.workloads or aggregate.services):
+            del self._components[component_key]
+
+    def _add(self, key, component_key: ComponentKey, healthy: bool) -> None:
+        entry = (component_key, healthy)
+        self._objects[key] = entry
+        self._counts[key[0]] += 1
+        self._bytes += self._entry_size(key, entry)
+        aggregate = self._components.get(component_key)
+        if aggregate is None:
+            aggregate = self._components[component_key] = ComponentHealth()
+        if key[0] == "Service":
+            aggregate.services += 1
+        else:
+            aggregate.workloads += 1
+            aggregate.unhealthy += not healthy
+
+    def observe(self, kind: str, event_type: Optional[str], body: Dict[str, Any]) -> None:
+        """Apply one watch event."""
+        meta = body.get("metadata") or {}
+        key = (kind, meta.get("namespace", ""), meta.get("name", ""))
+        self._remove(key)
+
+        labels = meta.get("labels") or {}
+        component = labels.get(self.config.component_label)
+        if event_type != "DELETED" and component:
+            app = labels.get(self.config.app_label, "")
+            self._add(key, (key[1], app, component), _workload_healthy(kind, body))
+
+        HEALTH_CACHE_OBJECTS.labels(kind=kind).set(self._counts[kind])
+        HEALTH_CACHE_BYTES.set(self._bytes)
+        lag = _event_lag(meta) if event_type in LIVE_EVENTS else None
+        if lag is not None:
+            HEALTH_CACHE_EVENT_LAG.labels(kind=kind).observe(lag)
+
+    def check(self, namespace: str, app: str, component: str) -> Tuple[bool, str]:
+        """Judge a component's health from the cache."""
+        aggregate = self._components.get((namespace, app, component))
+        if aggregate is None or not aggregate.workloads:
+            if self.config.require_workloads:
+                return False, f"Component '{component}' has no workloads"
+            return True, f"Component '{component}' has no tracked workloads"
+        if aggregate.unhealthy:
+            return False, (
+                f"Component '{component}': {aggregate.unhealthy} of "
+                f"{aggregate.workloads} workloads unhealthy"
+            )
+        return True, f"Component '{component}' is healthy ({aggregate.workloads} workloads)"
+
+
+# Active cache, set by register() when the health engine is enabled
+cache: Optional[WorkloadCache] = None
+
+
+def register(config: HealthConfig) -> None:
+    """Create the cache and register the kopf watch handlers that feed it."""
+    global cache
+    cache = WorkloadCache(config)
+
+    for kind, (group, version, plural) in WATCHED_KINDS.items():
+        def on_event(type: Optional[str], body: kopf.Body, _kind: str = kind, **_) -> None:
+            cache.observe(_kind, type, body)
+
+        kopf.on.event(
+            group, version, plural,
+            id=f"health-cache-{plural}",
+            labels={config.component_label: kopf.PRESENT},
+        )(on_event)
+    logger.info(f"🩺 Health engine watching {', '.join(WATCHED_KINDS)} by '{config.component_label}'")
@@ -0,0 +1,125 @@
+"""
+Non-blocking logging pipeline for the ApplicationMetadata controller.
+
+Records are put on a bounded queue by a ``QueueHandler`` on the root logger and
+written by a ``QueueListener`` thread, so console and file I/O never run on the
+event loop. The file sink rotates by size and both sinks can emit JSON.
+Repetitive INFO lines are rate-limited per call site before they are queued.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
+
+from controller.config import LoggingConfig
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _count_dropped(reason: str) -> None:
+    # Imported lazily: logging is configured before the metrics are needed
+    from controller.metrics import LOG_RECORDS_DROPPED
+    LOG_RECORDS_DROPPED.labels(reason=reason).inc()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _count_dropped("queue_full")
+
+
+class CallSiteRateLimitFilter(logging.Filter):
+    """Token bucket per call site for records at INFO level and below.
+
+    Warnings and errors always pass. When a call site is allowed again, the
+    number of suppressed records is appended to the message.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # (pathname, lineno) -> [tokens, last_refill, suppressed]
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > logging.INFO:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now, 0]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            bucket[2] += 1
+            _count_dropped("rate_limited")
+            return False
+
+        bucket[0] -= 1
+        if bucket[2] and isinstance(record.msg, str):
+            record.msg = f"{record.msg} ({int(bucket[2])} similar suppressed)"
+            bucket[2] = 0
+        return True
+
+
+def _formatter(config: LoggingConfig) -> logging.Formatter:
+    if config.use_json:
+        try:
+            from pythonjsonlogger.json import JsonFormatter
+        except ImportError:  # python-json-logger < 3
+            from pythonjsonlogger.jsonlogger import JsonFormatter
+        return JsonFormatter(config.format)
+    return logging.Formatter(config.format)
+
+
+def setup(config: LoggingConfig, file_suffix: str = "") -> None:
+    """Route all logging through the queue; safe to call once per process."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = _formatter(config)
+    sinks: List[logging.Handler] = [logging.StreamHandler()]
+    if config.file:
+        path = config.file
+        if file_suffix:
+            root, dot, ext = path.rpartition(".")
+            path = f"{root}-{file_suffix}.{ext}" if dot else f"{path}-{file_suffix}"
+        sinks.append(logging.handlers.RotatingFileHandler(
+            path, maxBytes=config.file_max_bytes, backupCount=config.file_backup_count
+        ))
+    for sink in sinks:
+        sink.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=config.queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(CallSiteRateLimitFilter(config.info_rate_limit, config.info_burst))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, config.level.upper()))
+
+    _listener = logging.handlers.QueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Flush the queue and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,200 @@
+"""
+Event loop instrumentation.
+
+Every handler shares one asyncio loop, so a synchronous stall anywhere delays
+all reconciles. This module measures:
+
+- loop lag: how late a periodic heartbeat wakes up (``appmetadata_event_loop_lag_seconds``);
+- busy vs idle time: the loop's selector is wrapped, so time blocked in
+  ``select()`` is idle and the time between two selects is busy;
+- slow callbacks: a watchdog thread notices a loop iteration running longer
+  than ``loop_monitor.slow_callback_threshold`` and logs the running task with
+  a stack sample of the loop thread, while it is still stalled;
+- handler time: time each handler's coroutine actually runs on the loop,
+  excluding the time it spends awaiting.
+"""
+import asyncio
+import functools
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Optional
+
+from controller.config import LoopMonitorConfig
+from controller.metrics import (
+    EVENT_LOOP_BUSY_SECONDS,
+    EVENT_LOOP_IDLE_SECONDS,
+    EVENT_LOOP_LAG,
+    HANDLER_LOOP_SECONDS,
+    SLOW_CALLBACKS,
+)
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Stack frames included in a slow callback report
+STACK_DEPTH = 15
+
+_config = LoopMonitorConfig()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+loop_thread: Optional[int] = None  # thread id running the event loop
+last_tick: Optional[float] = None  # monotonic time of the last heartbeat
+_lag = 0.0
+_selector: Optional["TimedSelector"] = None
+_watchdog: Optional["Watchdog"] = None
+
+
+class TimedSelector:
+    """Selector proxy that accounts time in ``select()`` as idle, the rest as busy."""
+
+    def __init__(self, selector):
+        self._selector = selector
+        self.iteration_started: Optional[float] = time.monotonic()
+        self.iteration = 0
+        self.busy = 0.0  # accumulated, flushed to the counters by the heartbeat
+        self.idle = 0.0
+
+    def select(self, timeout=None):
+        entered = time.monotonic()
+        busy = entered - self.iteration_started
+        self.busy += busy
+        if busy > _config.slow_callback_threshold:
+            SLOW_CALLBACKS.inc()
+        self.iteration_started = None
+        try:
+            return self._selector.select(timeout)
+        finally:
+            now = time.monotonic()
+            self.idle += now - entered
+            self.iteration += 1
+            self.iteration_started = now
+
+    def flush(self) -> None:
+        busy, self.busy = self.busy, 0.0
+        idle, self.idle = self.idle, 0.0
+        EVENT_LOOP_BUSY_SECONDS.inc(busy)
+        EVENT_LOOP_IDLE_SECONDS.inc(idle)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._selector, name)
+
+
+class Watchdog(threading.Thread):
+    """Reports loop iterations that run longer than the slow callback threshold."""
+
+    def __init__(self, selector: TimedSelector):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.selector = selector
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        reported = -1
+        while not self._stop_event.wait(_config.watchdog_interval):
+            started = self.selector.iteration_started
+            iteration = self.selector.iteration
+            if started is None or iteration == reported:
+                continue
+            stalled = time.monotonic() - started
+            if stalled > _config.slow_callback_threshold:
+                reported = iteration
+                self._report(stalled)
+
+    def _report(self, stalled: float) -> None:
+        frame = sys._current_frames().get(loop_thread)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH)) if frame else ""
+        task = asyncio.current_task(_loop)
+        running = task.get_coro().__qualname__ if task is not None else "(no task)"
+        logger.warning(
+            f"🐢 Event loop blocked for {stalled:.3f}s by {running}; stack sample:\n{stack}"
+        )
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def lag() -> Optional[float]:
+    """Current loop lag in seconds, or None before the first heartbeat.
+
+    A blocked loop stops ticking, so the age of the last tick counts as lag too.
+    """
+    if last_tick is None:
+        return None
+    return max(_lag, time.monotonic() - last_tick - _config.heartbeat_interval)
+
+
+async def heartbeat() -> None:
+    """Tick on the event loop, measure how late each tick is and flush counters."""
+    global last_tick, _lag
+    interval = _config.heartbeat_interval
+    while True:
+        before = time.monotonic()
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        _lag = max(0.0, now - before - interval)
+        last_tick = now
+        EVENT_LOOP_LAG.set(_lag)
+        if _selector is not None:
+            _selector.flush()
+
+
+def start(config: LoopMonitorConfig) -> asyncio.Task:
+    """Instrument the running loop; returns the heartbeat task."""
+    global _config, _loop, loop_thread, _selector, _watchdog
+    _config = config
+    _loop = asyncio.get_running_loop()
+    loop_thread = threading.get_ident()
+
+    # Only selector-based loops (the asyncio default) expose their selector
+    selector = getattr(_loop, "_selector", None)
+    if selector is not None and not isinstance(selector, TimedSelector):
+        _selector = _loop._selector = TimedSelector(selector)
+        if config.slow_callback_threshold > 0:
+            _watchdog = Watchdog(_selector)
+            _watchdog.start()
+    elif selector is None:
+        logger.warning("⚠️ Event loop has no selector; busy/idle time and slow callbacks are not measured")
+    return asyncio.create_task(heartbeat())
+
+
+def stop() -> None:
+    """Stop the watchdog thread."""
+    if _watchdog is not None:
+        _watchdog.stop()
+
+
+class _TimedCoroutine:
+    """Awaitable that runs a coroutine and adds the time of each step to a counter."""
+
+    def __init__(self, coro, name: str):
+        self._coro = coro
+        self._name = name
+
+    def __await__(self):
+        steps = self._coro.__await__()
+        spent = 0.0
+        value, error = None, None
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    yielded = steps.throw(error) if error is not None else steps.send(value)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    spent += time.perf_counter() - started
+                try:
+                    value, error = (yield yielded), None
+                except BaseException as e:  # cancellation is delivered here
+                    value, error = None, e
+        finally:
+            HANDLER_LOOP_SECONDS.labels(handler=self._name).inc(spent)
+
+
+def timed(fn):
+    """Count the time an async handler spends running on the loop."""
+    @functools.wraps(fn)
+    async def wrapper(**kwargs):
+        return await _TimedCoroutine(fn(**kwargs), fn.__name__)
+    return wrapper
@@ -5,7 +5,12 @@ from datetime import datetime
 from enum import Enum
 from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, HttpUrl, constr
+from pydantic import BaseModel as _BaseModel, ConfigDict, Field, HttpUrl, constr
+
+
+class BaseModel(_BaseModel):
+    """Base for all models; validators are built on first use, not at import."""
+    model_config = ConfigDict(defer_build=True)
 
 
 class ComponentType(str, Enum):
@@ -36,6 +41,7 @@ class Phase(str, Enum):
     ACTIVE = "Active"
     DEPRECATED = "Deprecated"
     RETIRED = "Retired"
+    ERROR = "Error"
 
 
 class ConditionType(str, Enum):
@@ -97,7 +103,7 @@ class ApplicationMetadataSpec(BaseModel):
     team: TeamInfo
     composition: List[Component]
     tracking: Tracking
-    tags: Optional[List[str]] = Field(None, pattern=r"^[a-zA-Z0-9][-a-zA-Z0-9_]*[a-zA-Z0-9]$")
+    tags: Optional[List[constr(pattern=r"^[a-zA-Z0-9][-a-zA-Z0-9_]*[a-zA-Z0-9]$")]] = None
 
 
 class ApplicationMetadataStatus(BaseModel):
@@ -0,0 +1,130 @@
+"""
+Hot reload of the controller configuration.
+
+The config file is polled and re-applied without a restart. ConfigMap volumes
+update by swapping the ``..data`` symlink, so the watcher compares the resolved
+path and its stat rather than relying on the mtime of the mounted path. A new
+configuration is fully parsed before it replaces the current one; handlers
+that call ``get_config()`` therefore see either the old or the new config,
+never a mix.
+"""
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+from typing import Callable, List, Optional, Tuple
+
+import yaml
+
+from controller.config import ControllerConfig, get_config, set_config
+from controller.metrics import CONFIG_GENERATION, CONFIG_RELOAD_ERRORS
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Called as callback(old, new) after a new config is applied; may be async
+Subscriber = Callable[[ControllerConfig, ControllerConfig], object]
+
+_subscribers: List[Subscriber] = []
+_generation = 1
+
+
+def subscribe(callback: Subscriber) -> None:
+    """Register a callback to run after every successful reload."""
+    _subscribers.append(callback)
+
+
+def generation() -> int:
+    """Number of configurations applied so far (1 = the one loaded at startup)."""
+    return _generation
+
+
+def _config_path() -> str:
+    return os.environ.get("CONFIG_PATH", "/etc/appmetadata/config.yaml")
+
+
+def _fingerprint(path: str) -> Optional[Tuple[str, int, int, int]]:
+    try:
+        real = os.path.realpath(path)
+        st = os.stat(real)
+    except OSError:
+        return None
+    return real, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+async def apply(new: ControllerConfig) -> None:
+    """Swap in a new configuration and notify the subscribers."""
+    global _generation
+    old = get_config()
+    set_config(new)
+    _generation += 1
+    CONFIG_GENERATION.set(_generation)
+
+    for callback in _subscribers:
+        try:
+            result = callback(old, new)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"❌ Config subscriber {callback.__qualname__} failed: {e}")
+
+
+class ConfigWatcher:
+    """Polls the config file and applies changes."""
+
+    def __init__(self, interval: float, path: Optional[str] = None):
+        self.interval = interval
+        self.path = path or _config_path()
+        self._fingerprint = _fingerprint(self.path)
+        content = self._read()
+        self._digest = hashlib.sha256(content).hexdigest() if content is not None else None
+
+    def _read(self) -> Optional[bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    async def run(self) -> None:
+        CONFIG_GENERATION.set(_generation)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                CONFIG_RELOAD_ERRORS.inc()
+                logger.error(f"❌ Config reload failed, keeping generation {_generation}: {e}")
+
+    async def check(self) -> bool:
+        """Reload if the file changed; return True if a new config was applied."""
+        fingerprint = _fingerprint(self.path)
+        if fingerprint == self._fingerprint:
+            return False
+        self._fingerprint = fingerprint
+
+        # The symlink swap can also happen without a content change
+        content = self._read()
+        if content is None:
+            return False
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == self._digest:
+            return False
+
+        new = ControllerConfig(**(yaml.safe_load(content) or {}))
+        self._digest = digest
+
+        await apply(new)
+        logger.info(f"🔁 Applied configuration generation {_generation} from {self.path}")
+        return True
+
+
+def _apply_log_level(old: ControllerConfig, new: ControllerConfig) -> None:
+    if old.logging.level != new.logging.level:
+        logging.getLogger().setLevel(getattr(logging, new.logging.level.upper()))
+
+
+subscribe(_apply_log_level)
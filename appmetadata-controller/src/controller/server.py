@@ -0,0 +1,137 @@
+"""
+HTTP server for metrics and health probes.
+
+One threaded WSGI server on the metrics port serves ``/metrics``, ``/healthz``
+and ``/readyz``, so kubelet probes are plain HTTP requests answered from
+in-process state instead of ``exec`` probes that start an interpreter.
+
+In an operator process the probes report:
+
+- ``/healthz``: the event loop is running and its lag, measured by
+  ``controller.loopmon``, is below ``probes.max_loop_lag``.
+- ``/readyz``: kopf has finished its startup and connected its watches
+  (``ready_flag``), the loop is healthy, and the initial listing has been
+  processed, i.e. a watch event was seen or ``probes.initial_sync_grace``
+  seconds have passed without one (nothing to list).
+
+With ``debug.enabled``, ``/debug/*`` is routed to ``controller.profiling``.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Iterable, Optional, Tuple
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from prometheus_client import REGISTRY, CollectorRegistry, make_wsgi_app
+from prometheus_client.exposition import ThreadingWSGIServer
+
+from controller import loopmon
+from controller.config import ControllerConfig, ProbesConfig
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# A check returns (ok, message)
+Check = Callable[[], Tuple[bool, str]]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Do not log every probe and scrape."""
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def make_app(registry: Optional[CollectorRegistry], liveness: Check, readiness: Check,
+             debug_app=None):
+    """WSGI app routing /metrics, /healthz, /readyz and optionally /debug/*."""
+    metrics_app = make_wsgi_app(registry) if registry is not None else None
+
+    def probe(check: Check, start_response) -> Iterable[bytes]:
+        try:
+            ok, message = check()
+        except Exception as e:
+            ok, message = False, f"check failed: {e}"
+        status = "200 OK" if ok else "503 Service Unavailable"
+        start_response(status, [("Content-Type", "text/plain; charset=utf-8")])
+        return [f"{message}\n".encode()]
+
+    def app(environ, start_response) -> Iterable[bytes]:
+        path = environ.get("PATH_INFO", "")
+        if path == "/healthz":
+            return probe(liveness, start_response)
+        if path == "/readyz":
+            return probe(readiness, start_response)
+        if path == "/metrics" and metrics_app is not None:
+            return metrics_app(environ, start_response)
+        if path.startswith("/debug/") and debug_app is not None:
+            return debug_app(environ, start_response)
+        start_response("404 Not Found", [("Content-Type", "text/plain; charset=utf-8")])
+        return [b"Not Found\n"]
+
+    return app
+
+
+def serve(port: int, registry: Optional[CollectorRegistry], liveness: Check, readiness: Check,
+          debug_app=None) -> None:
+    """Serve metrics and probes from a daemon thread."""
+    httpd = make_server("", port, make_app(registry, liveness, readiness, debug_app),
+                        ThreadingWSGIServer, handler_class=_QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+
+
+# Operator process state, written from the event loop and read by probe threads
+
+# Passed to kopf.run(); set by kopf once startup handlers ran and watches started
+ready_flag = threading.Event()
+
+_probes = ProbesConfig()
+_ready_at: Optional[float] = None
+_event_seen = False
+
+
+def mark_event() -> None:
+    """Record that a watch event was delivered."""
+    global _event_seen
+    _event_seen = True
+
+
+def _loop_health() -> Tuple[bool, str]:
+    lag = loopmon.lag()
+    if lag is None:
+        return True, "starting"
+    if lag > _probes.max_loop_lag:
+        return False, f"event loop lag {lag:.2f}s exceeds {_probes.max_loop_lag}s"
+    return True, f"event loop lag {lag:.3f}s"
+
+
+def operator_liveness() -> Tuple[bool, str]:
+    return _loop_health()
+
+
+def operator_readiness() -> Tuple[bool, str]:
+    global _ready_at
+    if not ready_flag.is_set() or loopmon.lag() is None:
+        return False, "operator starting"
+    if _ready_at is None:
+        _ready_at = time.monotonic()
+    ok, message = _loop_health()
+    if not ok:
+        return False, message
+    if not _event_seen and time.monotonic() - _ready_at < _probes.initial_sync_grace:
+        return False, "waiting for initial sync"
+    return True, "ready"
+
+
+def serve_operator(config: ControllerConfig, registry: Optional[CollectorRegistry] = REGISTRY) -> None:
+    """Serve metrics (unless disabled) and the operator probes."""
+    global _probes
+    _probes = config.probes
+    debug_app = None
+    if config.debug.enabled:
+        from controller import profiling
+        debug_app = profiling.make_app(config.debug, lambda: loopmon.loop_thread)
+        logger.info("🔬 Debug profiling endpoints enabled on the metrics port")
+    serve(config.metrics.port, registry if config.metrics.enabled else None,
+          operator_liveness, operator_readiness, debug_app)
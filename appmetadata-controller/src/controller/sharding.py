@@ -0,0 +1,271 @@
+"""
+Horizontal sharding of reconcile work across controller replicas.
+
+Every replica holds a Lease named ``<lease_prefix>-<identity>`` and renews it
+periodically. The set of Leases that are still within their duration is the
+shard membership; objects are assigned to members with a consistent hash ring,
+so a replica joining or leaving only moves ~1/N of the objects. Supervisor
+workers shard per worker index (``worker_suffix``).
+
+Kopf's progress and diff-base are kept per replica, in annotations prefixed
+with ``<identity>.shard.apps.company.io``. A replica that skips an object it
+does not own stores its own diff-base only, so the owner still sees the change.
+Objects that move to a replica are not changed from that replica's point of
+view; the reconcile timer re-drives them instead (see ``take_handoff``).
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import re
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from controller.config import ShardingConfig
+from controller.metrics import SHARD_HANDOFF_LATENCY, SHARD_MEMBERS, SHARD_OBJECTS
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+SHARD_GROUP_LABEL = "apps.company.io/shard-group"
+
+# Annotation domain of the per-replica kopf storages
+STORAGE_DOMAIN = "shard.apps.company.io"
+
+
+def _hash(value: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def storage_prefix(identity: str) -> str:
+    """Annotation prefix of a replica's kopf progress and diff-base."""
+    label = re.sub(r"[^a-z0-9-]", "-", identity.lower()).strip("-")
+    if len(label) > 63:  # DNS label limit; keep it unique with a hash suffix
+        label = f"{label[:46]}-{_hash(identity):016x}"
+    return f"{label}.{STORAGE_DOMAIN}"
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes."""
+
+    def __init__(self, members: Iterable[str], virtual_nodes: int = 64):
+        self.members: Tuple[str, ...] = tuple(sorted(set(members)))
+        points: List[Tuple[int, str]] = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(virtual_nodes)
+        )
+        self._hashes = [point[0] for point in points]
+        self._owners = [point[1] for point in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """Return the member that owns the key, or None for an empty ring."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardManager:
+    """Maintains Lease-based membership and answers ownership queries."""
+
+    def __init__(self, config: ShardingConfig, identity: Optional[str] = None):
+        self.config = config
+        self.identity = identity or f"{os.getenv('POD_NAME') or socket.gethostname()}{worker_suffix}"
+        self.group = f"{config.lease_prefix}{worker_suffix}"
+        self.ring = HashRing([self.identity], config.virtual_nodes)
+        self._previous_ring: Optional[HashRing] = None
+        self._ring_changed_at = time.monotonic()
+        self._owned: Set[str] = set()
+        self._claimed: Set[str] = set()
+        self._handoff: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._api = None
+
+    @property
+    def lease_name(self) -> str:
+        return f"{self.config.lease_prefix}-{self.identity}"
+
+    @property
+    def storage_prefix(self) -> str:
+        return storage_prefix(self.identity)
+
+    def configure_storage(self, settings) -> None:
+        """Keep kopf's progress and diff-base under this replica's own prefix."""
+        import kopf
+        settings.persistence.progress_storage = kopf.AnnotationsProgressStorage(
+            prefix=self.storage_prefix)
+        settings.persistence.diffbase_storage = kopf.AnnotationsDiffBaseStorage(
+            prefix=self.storage_prefix)
+
+    def stale_storage_keys(self, annotations: Dict[str, str]) -> List[str]:
+        """Storage annotations of replicas that are no longer in the group."""
+        live = {storage_prefix(member) for member in self.ring.members}
+        stale = []
+        for key in annotations:
+            prefix = key.split("/", 1)[0]
+            if "/" in key and prefix.endswith(f".{STORAGE_DOMAIN}") and prefix not in live:
+                stale.append(key)
+        return stale
+
+    def object_key(self, meta: Dict[str, Any]) -> str:
+        """Key an object is hashed by."""
+        if self.config.key == "uid" and meta.get("uid"):
+            return meta["uid"]
+        return f"{meta.get('namespace')}/{meta.get('name')}"
+
+    def owns(self, meta: Dict[str, Any]) -> bool:
+        """Return True if this replica is responsible for the object."""
+        key = self.object_key(meta)
+        if self.ring.owner(key) != self.identity:
+            self._owned.discard(key)
+            return False
+
+        self._owned.add(key)
+        if (
+            self._previous_ring is not None
+            and key not in self._claimed
+            and self._previous_ring.owner(key) != self.identity
+        ):
+            # First time we see an object that moved to us since the last rebalance
+            self._claimed.add(key)
+            self._handoff.add(key)
+            SHARD_HANDOFF_LATENCY.observe(time.monotonic() - self._ring_changed_at)
+        return True
+
+    def take_handoff(self, meta: Dict[str, Any]) -> bool:
+        """True once for an owned object that moved here at the last rebalance."""
+        key = self.object_key(meta)
+        if key in self._handoff:
+            self._handoff.discard(key)
+            return True
+        return False
+
+    def forget(self, meta: Dict[str, Any]) -> None:
+        """Drop a deleted object from the ownership bookkeeping."""
+        key = self.object_key(meta)
+        self._owned.discard(key)
+        self._claimed.discard(key)
+        self._handoff.discard(key)
+
+    async def start(self) -> None:
+        """Join the shard group and start the membership loop."""
+        from kubernetes import client
+        self._api = client.CoordinationV1Api(api_client)
+        await self._heartbeat()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"🧩 Joined shard group as {self.identity} "
+            f"({len(self.ring.members)} member(s))"
+        )
+
+    async def stop(self) -> None:
+        """Leave the shard group, letting the others take over immediately."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._api is not None:
+            try:
+                await asyncio.to_thread(
+                    self._api.delete_namespaced_lease,
+                    self.lease_name, self.config.lease_namespace
+                )
+            except Exception as e:
+                logger.warning(f"Failed to release shard lease {self.lease_name}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.renew_interval)
+            try:
+                await self._heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Shard membership refresh failed: {e}")
+
+    async def _heartbeat(self) -> None:
+        await asyncio.to_thread(self._renew_lease)
+        members = await asyncio.to_thread(self._list_members)
+        self._apply_members(members)
+        SHARD_OBJECTS.labels(shard=self.identity).set(len(self._owned))
+
+    def _renew_lease(self) -> None:
+        from kubernetes import client
+        from kubernetes.client.rest import ApiException
+
+        now = datetime.now(timezone.utc)
+        body = client.V1Lease(
+            metadata=client.V1ObjectMeta(
+                name=self.lease_name,
+                labels={SHARD_GROUP_LABEL: self.group},
+            ),
+            spec=client.V1LeaseSpec(
+                holder_identity=self.identity,
+                lease_duration_seconds=self.config.lease_duration,
+                renew_time=now,
+            ),
+        )
+        try:
+            self._api.patch_namespaced_lease(self.lease_name, self.config.lease_namespace, body)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            body.spec.acquire_time = now
+            self._api.create_namespaced_lease(self.config.lease_namespace, body)
+
+    def _list_members(self) -> List[str]:
+        leases = self._api.list_namespaced_lease(
+            self.config.lease_namespace,
+            label_selector=f"{SHARD_GROUP_LABEL}={self.group}",
+        )
+        now = datetime.now(timezone.utc)
+        members = []
+        for lease in leases.items:
+            spec = lease.spec
+            if not spec or not spec.holder_identity or not spec.renew_time:
+                continue
+            duration = spec.lease_duration_seconds or self.config.lease_duration
+            if spec.renew_time + timedelta(seconds=duration) >= now:
+                members.append(spec.holder_identity)
+        # Our own lease was just renewed; never drop ourselves on clock skew
+        members.append(self.identity)
+        return members
+
+    def _apply_members(self, members: List[str]) -> None:
+        if tuple(sorted(set(members))) == self.ring.members:
+            return
+        ring = HashRing(members, self.config.virtual_nodes)
+        logger.info(
+            f"🔀 Shard membership changed: {list(self.ring.members)} -> {list(ring.members)}"
+        )
+        self._previous_ring, self.ring = self.ring, ring
+        self._ring_changed_at = time.monotonic()
+        self._claimed.clear()
+        self._owned = {key for key in self._owned if ring.owner(key) == self.identity}
+        # Keep moved objects that were not re-driven yet and are still ours
+        self._handoff = {key for key in self._handoff if ring.owner(key) == self.identity}
+        SHARD_MEMBERS.set(len(ring.members))
+
+
+# Active shard manager, set on startup when sharding is enabled
+manager: Optional[ShardManager] = None
+
+# Appended to the identity and the group of a supervisor worker ("-w<index>");
+# empty for a single process
+worker_suffix = ""
+
+# Kubernetes ApiClient for the lease calls; None uses a new one. Set by an
+# operator that shares one client between several controllers.
+api_client = None
+
+
+def owns_object(meta: Dict[str, Any], **_) -> bool:
+    """Kopf ``when=`` filter: True if this replica should handle the object."""
+    return manager is None or manager.owns(meta)
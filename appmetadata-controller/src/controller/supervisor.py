@@ -0,0 +1,245 @@
+"""
+Multi-process worker mode for the ApplicationMetadata controller.
+
+The supervisor resolves the configured namespace names and globs, partitions
+the namespaces across a pool of worker processes, each running its own kopf
+loop, and restarts workers that crash. Metrics from all workers are aggregated
+with the Prometheus multiprocess mode and served by the supervisor, together
+with ``/healthz`` (the supervisor loop is running) and ``/readyz`` (every
+non-empty partition has a live worker).
+"""
+import fnmatch
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from controller.config import ControllerConfig
+from controller.sharding import HashRing
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Seconds the workers get to finish in-flight handlers after SIGTERM. They
+# are stopped together against one deadline, which has to fit into the pod's
+# terminationGracePeriodSeconds (30).
+STOP_TIMEOUT = 25
+
+# Seconds without a supervisor loop tick before /healthz fails
+STALL_TIMEOUT = 30
+
+
+def resolve_namespaces(patterns: List[str]) -> List[str]:
+    """Expand namespace globs against the cluster; plain names pass through."""
+    names = {p for p in patterns if not any(c in p for c in "*?[")}
+    globs = [p for p in patterns if p not in names]
+    if not patterns:
+        globs = ["*"]
+
+    if globs:
+        from kubernetes import client, config as kube_config
+        try:
+            kube_config.load_incluster_config()
+        except kube_config.ConfigException:
+            kube_config.load_kube_config()
+        existing = [ns.metadata.name for ns in client.CoreV1Api().list_namespace().items]
+        for pattern in globs:
+            names.update(fnmatch.filter(existing, pattern))
+
+    return sorted(names)
+
+
+def partition(namespaces: List[str], workers: int) -> List[List[str]]:
+    """Assign namespaces to workers on a consistent hash ring.
+
+    The ring keeps assignments stable when namespaces come and go, so a resync
+    only restarts the workers whose partition actually changed. Groups may be
+    empty when there are few namespaces.
+    """
+    ring = HashRing([str(i) for i in range(workers)])
+    groups: List[List[str]] = [[] for _ in range(workers)]
+    for namespace in sorted(namespaces):
+        groups[int(ring.owner(namespace))].append(namespace)
+    return groups
+
+
+def _run_worker(index: int, namespaces: List[str]) -> None:
+    """Worker process body: run one kopf loop for a namespace partition."""
+    from controller import logs
+    from controller.__main__ import run_operator
+    from controller import sharding
+    from controller.config import get_config
+
+    # Worker i of every replica watches the same partition, so they form their
+    # own shard group, each worker with its own lease
+    sharding.worker_suffix = f"-w{index}"
+
+    # One file per worker: size-based rotation is not safe across processes
+    logs.setup(get_config().logging, file_suffix=f"worker-{index}")
+    logger.info(
+        f"👷 Worker {index} (pid {os.getpid()}) watching {len(namespaces)} namespace(s)"
+    )
+    run_operator(namespaces)
+
+
+class Supervisor:
+    """Starts, watches and restarts the worker processes."""
+
+    def __init__(self, config: ControllerConfig, patterns: List[str]):
+        self.config = config
+        self.patterns = patterns
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._partitions: List[List[str]] = []
+        self._failures: Dict[int, int] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._started_at: Dict[int, float] = {}
+        self._stopping = False
+        self._last_tick = time.monotonic()
+
+    def run(self) -> None:
+        """Run the supervisor until SIGTERM/SIGINT."""
+        self._prepare_multiprocess_metrics()
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        namespaces = resolve_namespaces(self.patterns)
+        if not namespaces:
+            logger.error("❌ No namespaces matched; nothing to supervise")
+            sys.exit(1)
+        self._partitions = partition(namespaces, self.config.workers.processes)
+        for index in range(len(self._partitions)):
+            self._start(index)
+
+        next_resync = time.monotonic() + self.config.workers.resync_interval
+        while not self._stopping:
+            time.sleep(1)
+            self._last_tick = time.monotonic()
+            self._reap()
+            if time.monotonic() >= next_resync:
+                next_resync = time.monotonic() + self.config.workers.resync_interval
+                self._resync()
+
+        self._shutdown()
+
+    def _prepare_multiprocess_metrics(self) -> None:
+        # Must be set before any worker imports prometheus_client
+        path = self.config.workers.multiproc_dir
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+        from controller import server
+
+        registry = None
+        if self.config.metrics.enabled:
+            from prometheus_client import CollectorRegistry
+            from prometheus_client.multiprocess import MultiProcessCollector
+
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry, path=path)
+        server.serve(self.config.metrics.port, registry, self.liveness, self.readiness)
+        logger.info(f"📊 Started aggregated metrics and probe server on port {self.config.metrics.port}")
+
+    def liveness(self) -> Tuple[bool, str]:
+        stalled = time.monotonic() - self._last_tick
+        if stalled > STALL_TIMEOUT:
+            return False, f"supervisor loop stalled for {stalled:.0f}s"
+        return True, f"{len(self._processes)} worker(s) running"
+
+    def readiness(self) -> Tuple[bool, str]:
+        expected = [i for i, group in enumerate(self._partitions) if group]
+        down = [i for i in expected if not (i in self._processes and self._processes[i].is_alive())]
+        if not expected or down:
+            return False, f"worker(s) {down} not running" if down else "no workers started"
+        return True, f"{len(expected)} worker(s) running"
+
+    def _start(self, index: int) -> None:
+        # An empty namespace list would make kopf watch cluster-wide
+        if not self._partitions[index]:
+            return
+        process = self._context.Process(
+            target=_run_worker,
+            args=(index, self._partitions[index]),
+            name=f"appmetadata-worker-{index}",
+            daemon=False,
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"▶️ Started worker {index} (pid {process.pid}): {self._partitions[index]}")
+
+    def _reap(self) -> None:
+        """Schedule restarts for dead workers and start the ones that are due."""
+        from prometheus_client import multiprocess
+
+        now = time.monotonic()
+        for index, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            multiprocess.mark_process_dead(process.pid)
+            del self._processes[index]
+            # A worker that ran for a while before dying starts a fresh backoff
+            if now - self._started_at.get(index, now) > 60:
+                self._failures[index] = 0
+            failures = self._failures.get(index, 0) + 1
+            self._failures[index] = failures
+            delay = min(self.config.workers.restart_backoff * 2 ** (failures - 1), 60)
+            self._restart_at[index] = now + delay
+            logger.error(
+                f"💥 Worker {index} (pid {process.pid}) exited with {process.exitcode}; "
+                f"restarting in {delay}s"
+            )
+
+        for index, due in list(self._restart_at.items()):
+            if due <= now:
+                del self._restart_at[index]
+                self._start(index)
+
+    def _resync(self) -> None:
+        """Re-resolve globs and restart the workers whose partition changed."""
+        try:
+            partitions = partition(resolve_namespaces(self.patterns), self.config.workers.processes)
+        except Exception as e:
+            logger.error(f"❌ Failed to resolve namespaces: {e}")
+            return
+        if partitions == self._partitions:
+            return
+
+        previous, self._partitions = self._partitions, partitions
+        changed = [i for i in range(len(partitions)) if partitions[i] != previous[i]]
+        logger.info(f"🔀 Namespace partitions changed; restarting worker(s) {changed}")
+        self._stop_workers(changed)
+        for index in changed:
+            self._failures.pop(index, None)
+            self._restart_at.pop(index, None)
+            self._start(index)
+
+    def _stop_workers(self, indexes: List[int]) -> None:
+        """Terminate the workers at once and wait for them until one shared deadline."""
+        from prometheus_client import multiprocess
+
+        processes = [self._processes.pop(i) for i in indexes if i in self._processes]
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in processes:
+            if process.is_alive():
+                logger.warning(f"⚠️ Worker pid {process.pid} did not stop in {STOP_TIMEOUT}s; killing it")
+                process.kill()
+                process.join()
+            multiprocess.mark_process_dead(process.pid)
+
+    def _handle_signal(self, sig, frame) -> None:
+        logger.info("📥 Shutting down workers gracefully...")
+        self._stopping = True
+
+    def _shutdown(self) -> None:
+        self._stop_workers(list(self._processes))
+        sys.exit(0)
@@ -0,0 +1,60 @@
+"""Tests for the debug profiling endpoints (controller.profiling)."""
+import threading
+
+import pytest
+
+from controller import profiling
+from controller.config import DebugConfig
+
+TOKEN = "secret"
+
+
+@pytest.fixture
+def app(monkeypatch):
+    calls = []
+    monkeypatch.setattr(profiling, "heap_top", lambda seconds, top: calls.append((seconds, top)) or "heap\n")
+    monkeypatch.setattr(profiling, "sample_stacks",
+                        lambda thread_id, seconds, interval: calls.append(seconds) or {"a;b": 1})
+    config = DebugConfig(enabled=True, token=TOKEN, max_seconds=30)
+    wsgi = profiling.make_app(config, threading.get_ident)
+
+    def get(path, query="", token=TOKEN):
+        status = []
+        environ = {"PATH_INFO": path, "QUERY_STRING": query,
+                   "HTTP_AUTHORIZATION": f"Bearer {token}"}
+        body = b"".join(wsgi(environ, lambda s, headers: status.append(s)))
+        return status[0], body.decode()
+
+    get.calls = calls
+    return get
+
+
+def test_requires_the_token(app):
+    assert app("/debug/profile", token="wrong")[0].startswith("401")
+    assert app.calls == []
+
+
+@pytest.mark.parametrize("value", ["nan", "NaN", "inf", "-inf", "abc"])
+def test_non_finite_seconds_are_rejected(app, value):
+    status, _ = app("/debug/profile", f"seconds={value}")
+    assert status.startswith("400")
+    status, _ = app("/debug/heap", f"seconds=1&top={value}")
+    assert status.startswith("400")
+    assert app.calls == []
+
+
+def test_seconds_are_clamped_to_the_maximum(app):
+    assert app("/debug/profile", "seconds=1e9")[0].startswith("200")
+    assert app("/debug/profile", "seconds=-5")[0].startswith("200")
+    assert app.calls == [30, 0.0]
+
+
+def test_heap_top(app):
+    status, body = app("/debug/heap", "seconds=2&top=5000")
+    assert status.startswith("200") and body == "heap\n"
+    assert app.calls == [(2.0, 1000)]
+
+
+def test_sample_stacks_of_a_thread():
+    counts = profiling.sample_stacks(threading.get_ident(), 0.02, 0.005)
+    assert counts and all("test_sample_stacks_of_a_thread" in stack for stack in counts)
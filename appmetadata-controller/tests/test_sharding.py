@@ -0,0 +1,155 @@
+"""Tests for shard ownership (controller.sharding)."""
+import kopf
+import pytest
+
+from controller import sharding
+from controller.config import ShardingConfig
+from controller.sharding import HashRing, ShardManager, storage_prefix
+
+
+def meta(name, namespace="default", **extra):
+    return {"name": name, "namespace": namespace, **extra}
+
+
+@pytest.fixture
+def manager():
+    return ShardManager(ShardingConfig(virtual_nodes=32), identity="pod-a")
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([]).owner("default/app") is None
+
+
+def test_ring_is_deterministic_and_ignores_member_order():
+    keys = [f"ns/app-{i}" for i in range(200)]
+    first = HashRing(["a", "b", "c"])
+    second = HashRing(["c", "a", "b", "a"])
+    assert [first.owner(k) for k in keys] == [second.owner(k) for k in keys]
+    assert {first.owner(k) for k in keys} == {"a", "b", "c"}
+
+
+def test_member_leaving_only_moves_its_own_keys():
+    keys = [f"ns/app-{i}" for i in range(500)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b"])
+    for key in keys:
+        if before.owner(key) != "c":
+            assert after.owner(key) == before.owner(key)
+
+
+def test_single_member_owns_everything(manager):
+    assert manager.owns(meta("app"))
+    assert sharding.owns_object(meta("app"))  # no active manager: everything is ours
+
+
+def test_object_key_by_uid():
+    uid_manager = ShardManager(ShardingConfig(key="uid"), identity="pod-a")
+    assert uid_manager.object_key(meta("app", uid="1234")) == "1234"
+    assert uid_manager.object_key(meta("app")) == "default/app"
+
+
+def test_ownership_follows_membership(manager):
+    manager._apply_members(["pod-a", "pod-b"])
+    objects = [meta(f"app-{i}") for i in range(100)]
+    owned = [m for m in objects if manager.owns(m)]
+    assert 0 < len(owned) < len(objects)
+    for m in objects:
+        assert manager.owns(m) == (manager.ring.owner(manager.object_key(m)) == "pod-a")
+
+
+def test_moved_objects_are_handed_off_once(manager):
+    manager._apply_members(["pod-a", "pod-b"])
+    objects = [meta(f"app-{i}") for i in range(100)]
+    owned_before = {m["name"] for m in objects if manager.owns(m)}
+
+    manager._apply_members(["pod-a"])  # pod-b left
+    moved = [m for m in objects if manager.owns(m) and m["name"] not in owned_before]
+    assert moved
+    for m in moved:
+        assert manager.take_handoff(m)
+        assert not manager.take_handoff(m)
+    for m in objects:
+        if m["name"] in owned_before:
+            assert not manager.take_handoff(m)
+
+
+def test_pending_handoff_survives_another_rebalance(manager):
+    manager._apply_members(["pod-a", "pod-b"])
+    objects = [meta(f"app-{i}") for i in range(100)]
+    owned_before = {m["name"] for m in objects if manager.owns(m)}
+    manager._apply_members(["pod-a"])
+    moved = [m for m in objects if manager.owns(m) and m["name"] not in owned_before]
+
+    manager._apply_members(["pod-a", "pod-c"])  # before the timer re-drove them
+    for m in moved:
+        assert manager.take_handoff(m) == manager.owns(m)
+
+
+def test_forget_drops_pending_handoff(manager):
+    manager._apply_members(["pod-a", "pod-b"])
+    objects = [meta(f"app-{i}") for i in range(100)]
+    owned_before = {m["name"] for m in objects if manager.owns(m)}
+    manager._apply_members(["pod-a"])
+    moved = next(m for m in objects if manager.owns(m) and m["name"] not in owned_before)
+    manager.forget(moved)
+    assert not manager.take_handoff(moved)
+
+
+def test_storage_prefix_is_a_dns_label():
+    assert storage_prefix("Pod_A") == "pod-a.shard.apps.company.io"
+    long_identity = "controller-" * 10
+    label = storage_prefix(long_identity).split(".", 1)[0]
+    assert len(label) == 63
+    assert label != storage_prefix(long_identity + "x").split(".", 1)[0]
+
+
+def test_storages_are_per_replica(manager):
+    settings = kopf.OperatorSettings()
+    manager.configure_storage(settings)
+    assert isinstance(settings.persistence.progress_storage, kopf.AnnotationsProgressStorage)
+    assert isinstance(settings.persistence.diffbase_storage, kopf.AnnotationsDiffBaseStorage)
+    assert settings.persistence.progress_storage.prefix == "pod-a.shard.apps.company.io"
+    assert settings.persistence.diffbase_storage.prefix == "pod-a.shard.apps.company.io"
+
+
+def test_other_replicas_storage_is_not_part_of_the_essence(manager):
+    settings = kopf.OperatorSettings()
+    manager.configure_storage(settings)
+    other = ShardManager(ShardingConfig(), identity="pod-b")
+    body = kopf.Body({
+        "spec": {"name": "app"},
+        "metadata": {"annotations": {
+            f"{other.storage_prefix}/last-handled-configuration": "{}",
+            f"{other.storage_prefix}/kopf-managed": "yes",
+            "team": "payments",
+        }},
+    })
+    essence = settings.persistence.diffbase_storage.build(body=body)
+    assert essence["metadata"]["annotations"] == {"team": "payments"}
+
+
+def test_stale_storage_keys(manager):
+    manager._apply_members(["pod-a", "pod-b"])
+    annotations = {
+        "pod-a.shard.apps.company.io/last-handled-configuration": "{}",
+        "pod-b.shard.apps.company.io/create_fn": "{}",
+        "pod-gone.shard.apps.company.io/last-handled-configuration": "{}",
+        "pod-gone.shard.apps.company.io/kopf-managed": "yes",
+        "kopf.zalando.org/last-handled-configuration": "{}",
+        "team": "payments",
+    }
+    assert sorted(manager.stale_storage_keys(annotations)) == [
+        "pod-gone.shard.apps.company.io/kopf-managed",
+        "pod-gone.shard.apps.company.io/last-handled-configuration",
+    ]
+
+
+def test_supervisor_workers_have_their_own_identity_and_group(monkeypatch):
+    monkeypatch.setenv("POD_NAME", "controller-abc")
+    monkeypatch.setattr(sharding, "worker_suffix", "-w2")
+    worker = ShardManager(ShardingConfig())
+    assert worker.identity == "controller-abc-w2"
+    assert worker.group == "appmetadata-controller-shard-w2"
+    assert worker.lease_name == "appmetadata-controller-shard-controller-abc-w2"
+    monkeypatch.setattr(sharding, "worker_suffix", "")
+    assert ShardManager(ShardingConfig()).identity == "controller-abc"
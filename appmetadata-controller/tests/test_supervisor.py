@@ -0,0 +1,71 @@
+"""Tests for the worker supervisor (controller.supervisor)."""
+import time
+
+from prometheus_client import multiprocess
+
+from controller import supervisor
+from controller.config import ControllerConfig
+from controller.supervisor import Supervisor, partition
+
+
+class FakeProcess:
+    """A worker that ignores SIGTERM for `stop_after` seconds."""
+
+    def __init__(self, pid, stop_after):
+        self.pid = pid
+        self.stop_after = stop_after
+        self.terminated_at = None
+        self.killed = False
+
+    def terminate(self):
+        self.terminated_at = time.monotonic()
+
+    def is_alive(self):
+        if self.killed:
+            return False
+        return self.terminated_at is None or time.monotonic() - self.terminated_at < self.stop_after
+
+    def join(self, timeout=None):
+        end = time.monotonic() + (timeout if timeout is not None else 3600)
+        while self.is_alive() and time.monotonic() < end:
+            time.sleep(0.01)
+
+    def kill(self):
+        self.killed = True
+
+
+def test_partition_is_stable_and_complete():
+    namespaces = [f"team-{i}" for i in range(40)]
+    groups = partition(namespaces, 4)
+    assert sorted(sum(groups, [])) == sorted(namespaces)
+    assert partition(list(reversed(namespaces)), 4) == groups
+    # Adding a namespace only touches the partition it lands in
+    grown = partition(namespaces + ["team-new"], 4)
+    assert sum(a != b for a, b in zip(groups, grown)) == 1
+
+
+def test_workers_stop_against_one_shared_deadline(monkeypatch):
+    monkeypatch.setattr(supervisor, "STOP_TIMEOUT", 0.3)
+    monkeypatch.setattr(multiprocess, "mark_process_dead", lambda pid: None)
+    sup = Supervisor(ControllerConfig(), [])
+    stubborn = {i: FakeProcess(100 + i, stop_after=10) for i in range(4)}
+    sup._processes = dict(stubborn)
+
+    started = time.monotonic()
+    sup._stop_workers(list(sup._processes))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.6  # not 4 x STOP_TIMEOUT
+    assert all(p.terminated_at is not None and p.killed for p in stubborn.values())
+    assert not sup._processes
+
+
+def test_well_behaved_workers_are_not_killed(monkeypatch):
+    monkeypatch.setattr(multiprocess, "mark_process_dead", lambda pid: None)
+    sup = Supervisor(ControllerConfig(), [])
+    processes = {i: FakeProcess(100 + i, stop_after=0.05) for i in range(3)}
+    sup._processes = dict(processes)
+    sup._stop_workers([0, 2])
+    assert processes[0].terminated_at and not processes[0].killed
+    assert processes[1].terminated_at is None
+    assert list(sup._processes) == [1]
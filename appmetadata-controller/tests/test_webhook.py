@@ -0,0 +1,135 @@
+"""Tests for the admission webhook decisions (controller.webhook)."""
+import copy
+from pathlib import Path
+
+import pytest
+import yaml
+
+from controller import reloader, webhook
+from controller.config import WebhookConfig
+from controller.webhook import AdmissionServer, DecisionCache
+
+EXAMPLE = Path(__file__).resolve().parents[1] / "application-metadata-example.yaml"
+
+
+@pytest.fixture
+def spec():
+    return yaml.safe_load(EXAMPLE.read_text())["spec"]
+
+
+@pytest.fixture
+def server():
+    return AdmissionServer(WebhookConfig(decision_cache_size=4))
+
+
+@pytest.fixture
+def validations(monkeypatch):
+    """Count how often a spec is actually validated."""
+    calls = []
+    model = webhook.ApplicationMetadataSpec
+
+    def counting(**spec):
+        calls.append(spec)
+        return model(**spec)
+
+    monkeypatch.setattr(webhook, "ApplicationMetadataSpec", counting)
+    return calls
+
+
+def create(spec, uid="1"):
+    return {"uid": uid, "operation": "CREATE", "object": {"metadata": {}, "spec": spec}}
+
+
+def test_key_is_canonical(spec):
+    reordered = dict(reversed(list(spec.items())))
+    assert DecisionCache.key(spec) == DecisionCache.key(reordered)
+    changed = dict(spec, version="9.9.9")
+    assert DecisionCache.key(spec) != DecisionCache.key(changed)
+
+
+def test_key_changes_with_the_config_generation(spec, monkeypatch):
+    before = DecisionCache.key(spec)
+    monkeypatch.setattr(reloader, "_generation", reloader.generation() + 1)
+    assert DecisionCache.key(spec) != before
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = DecisionCache(2)
+    cache.put("a", {"allowed": True})
+    cache.put("b", {"allowed": True})
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.put("c", {"allowed": False})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"allowed": True}
+    assert cache.get("c") == {"allowed": False}
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(webhook.time, "monotonic", lambda: now[0])
+    cache = DecisionCache(2)
+    cache.put("repo", {"allowed": True}, ttl=10)
+    cache.put("plain", {"allowed": True})
+    now[0] += 10
+    assert cache.get("repo") is None
+    assert cache.get("plain") is not None
+
+
+def test_clear_on_reload():
+    cache = DecisionCache(2)
+    cache.put("a", {"allowed": True})
+    cache.clear()
+    assert cache.get("a") is None
+
+
+async def test_repeated_spec_is_answered_from_the_cache(server, spec, validations):
+    first = await server.review(create(spec, uid="1"))
+    second = await server.review(create(copy.deepcopy(spec), uid="2"))
+    assert first == {"uid": "1", "allowed": True}
+    assert second == {"uid": "2", "allowed": True}
+    assert len(validations) == 1
+
+
+async def test_denials_are_cached_with_their_reason(server, spec, validations):
+    spec["composition"][0]["dependencies"] = ["missing"]
+    first = await server.review(create(spec, uid="1"))
+    second = await server.review(create(spec, uid="2"))
+    assert not first["allowed"] and "missing" in first["status"]["message"]
+    assert {**second, "uid": "1"} == first
+    assert len(validations) == 1
+
+
+async def test_incomplete_decisions_are_not_cached(server, spec, validations, monkeypatch):
+    async def skipped(app_spec, budget):
+        return [], ["Repository check skipped: latency budget exceeded"]
+
+    server.config.external_checks = True
+    monkeypatch.setattr(server, "_external_errors", skipped)
+    await server.review(create(spec))
+    response = await server.review(create(spec))
+    assert response["warnings"]
+    assert len(validations) == 2
+
+
+async def test_disabled_cache_validates_every_time(spec, validations):
+    server = AdmissionServer(WebhookConfig(decision_cache_size=0))
+    await server.review(create(spec))
+    await server.review(create(spec))
+    assert len(validations) == 2
+
+
+async def test_metadata_only_update_is_allowed_without_validation(server, validations):
+    invalid = {"name": "x"}
+    request = {
+        "uid": "1", "operation": "UPDATE",
+        "object": {"metadata": {"finalizers": []}, "spec": invalid},
+        "oldObject": {"metadata": {"finalizers": ["kopf"]}, "spec": invalid},
+    }
+    assert (await server.review(request))["allowed"]
+    assert validations == []
+
+
+async def test_non_object_spec_is_denied(server):
+    response = await server.review(create(["not", "an", "object"]))
+    assert not response["allowed"]
+    assert response["status"]["code"] == 422
@@ -0,0 +1,13 @@
+#!/bin/bash
+set -e
+
+cd "$(dirname "$0")/.."  # Change to project root
+
+# Only configuration goes into ConfigMaps; the code is in the image (Dockerfile)
+WORK_DIR="manifests/files"
+mkdir -p "${WORK_DIR}"
+
+cp ../appmetadata-controller/manifests/config.yaml "${WORK_DIR}/appmetadata-config.yaml"
+cp ../pet-controller/manifests/base/config/controller-config.yaml "${WORK_DIR}/pet-config.yaml"
+
+echo "✅ Files prepared for kustomize in ${WORK_DIR}/"
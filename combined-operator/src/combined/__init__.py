@@ -0,0 +1,3 @@
+"""
+Combined operator: the ApplicationMetadata and Pet controllers in one process.
+"""
@@ -0,0 +1,102 @@
+"""
+Main entry point for the combined operator.
+
+Runs the ApplicationMetadata and Pet controllers on one event loop: one kopf
+runtime and its watches, one Kubernetes ApiClient, and one server for
+/metrics, /healthz and /readyz on the ApplicationMetadata metrics port. Each
+controller can be switched off with --no-appmetadata / --no-pet (or
+OPERATOR_APPMETADATA / OPERATOR_PET=false).
+
+Configuration: CONFIG_PATH is the ApplicationMetadata config (namespaces,
+logging, metrics and probes apply to the whole operator), PET_CONFIG_PATH the
+Pet controller's.
+"""
+from combined import controllers
+
+controllers.add_appmetadata_path()
+
+from controller import startup  # noqa: E402 (first controller import, for the startup timings)
+
+import logging  # noqa: E402
+import signal  # noqa: E402
+import sys  # noqa: E402
+from typing import List  # noqa: E402
+
+import click  # noqa: E402
+
+from controller import logs  # noqa: E402
+from controller.__main__ import resolve_namespace_patterns  # noqa: E402
+from controller.config import get_config  # noqa: E402
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+
+@click.command()
+@click.option("--appmetadata/--no-appmetadata", default=True, envvar="OPERATOR_APPMETADATA",
+              show_default=True, help="Run the ApplicationMetadata controller.")
+@click.option("--pet/--no-pet", default=True, envvar="OPERATOR_PET",
+              show_default=True, help="Run the Pet controller.")
+@click.option("--namespace", "namespaces", multiple=True,
+              help="Namespace or glob to watch; repeatable.")
+def main(appmetadata: bool, pet: bool, namespaces: List[str]):
+    """Main entry point."""
+    enabled = [name for name, on in ((controllers.APPMETADATA, appmetadata), (controllers.PET, pet)) if on]
+    if not enabled:
+        raise click.UsageError("Enable at least one controller")
+
+    # Load configuration
+    config = get_config()
+    patterns = resolve_namespace_patterns(config, namespaces)
+
+    # Configure logging first: the Pet controller's basicConfig() is then a no-op
+    logs.setup(config.logging)
+    if config.workers.processes > 1:
+        logger.warning(f"⚠️ workers.processes={config.workers.processes} is ignored; "
+                       f"the combined operator runs one process")
+    if config.sharding.enabled:
+        # Sharding keeps kopf's state per replica, which would apply to Pets too
+        logger.error("❌ sharding.enabled is not supported by the combined operator; "
+                     "run the ApplicationMetadata controller on its own to shard it")
+        sys.exit(1)
+
+    # Register the handlers of the enabled controllers, sharing one API client
+    with startup.stage("import_kopf"):
+        import kopf
+    with startup.stage("import_handlers"):
+        controllers.load(enabled, controllers.shared_api_client())
+        from combined import handlers
+        handlers.register(enabled)
+        controllers.check_handler_ids()
+
+    # Start the metrics and probe server (/metrics, /healthz, /readyz)
+    from controller import server
+    try:
+        if config.metrics.enabled and appmetadata:
+            from controller.metrics import register_inventory_collector
+            register_inventory_collector()
+        server.serve_operator(config)
+        logger.info(f"📊 Started metrics and probe server on port {config.metrics.port}")
+    except Exception as e:
+        logger.error(f"❌ Failed to start metrics server: {e}")
+        sys.exit(1)
+
+    logger.info(f"🚀 Starting combined operator: {', '.join(enabled)}")
+
+    # Register signal handlers
+    def signal_handler(sig, frame):
+        logger.info("📥 Shutting down gracefully...")
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    # Start kopf: one runtime and one set of watches for both controllers
+    if patterns:
+        kopf.run(standalone=True, namespaces=patterns, ready_flag=server.ready_flag)
+    else:
+        kopf.run(standalone=True, clusterwide=True, ready_flag=server.ready_flag)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+The controllers the combined operator hosts, and how they are loaded.
+
+Both projects ship a package named ``controller``. The ApplicationMetadata
+controller imports itself by that name, so it keeps it; the Pet controller
+only uses relative imports and is loaded as ``pet_controller``. Importing a
+controller's handler module registers its handlers with kopf, so a controller
+that is switched off is never imported at all.
+"""
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Iterable
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+APPMETADATA = "appmetadata"
+PET = "pet"
+ALL = (APPMETADATA, PET)
+
+# Source trees used when the packages are not importable already (running
+# from a checkout); the image installs them as controller and pet_controller
+_ROOT = Path(__file__).resolve().parents[3]
+APPMETADATA_SOURCE = os.environ.get(
+    "APPMETADATA_CONTROLLER_SRC", str(_ROOT / "appmetadata-controller" / "src"))
+PET_SOURCE = os.environ.get(
+    "PET_CONTROLLER_SRC", str(_ROOT / "pet-controller" / "src" / "controller"))
+
+PET_PACKAGE = "pet_controller"
+
+CONTROLLER_ENABLED = Gauge(
+    "combined_operator_controller_enabled",
+    "Controllers hosted by this operator process",
+    ["controller"],
+)
+
+
+def add_appmetadata_path() -> None:
+    """Make the ApplicationMetadata ``controller`` package importable."""
+    if importlib.util.find_spec("controller") is None:
+        sys.path.insert(0, APPMETADATA_SOURCE)
+
+
+def import_pet() -> ModuleType:
+    """Import the Pet controller package as ``pet_controller``."""
+    if PET_PACKAGE not in sys.modules and importlib.util.find_spec(PET_PACKAGE) is None:
+        spec = importlib.util.spec_from_file_location(
+            PET_PACKAGE, os.path.join(PET_SOURCE, "__init__.py"),
+            submodule_search_locations=[PET_SOURCE],
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PET_PACKAGE] = module
+        spec.loader.exec_module(module)
+    return importlib.import_module(PET_PACKAGE)
+
+
+def shared_api_client():
+    """One Kubernetes ApiClient (and connection pool) for every controller."""
+    from kubernetes import client
+    from kubernetes import config as kube_config
+    try:
+        kube_config.load_incluster_config()
+    except kube_config.ConfigException:
+        kube_config.load_kube_config()
+    return client.ApiClient()
+
+
+def load(enabled: Iterable[str], api_client) -> None:
+    """Register the handlers of the enabled controllers, sharing `api_client`."""
+    for name in ALL:
+        on = name in enabled
+        CONTROLLER_ENABLED.labels(name).set(1 if on else 0)
+        if not on:
+            logger.info(f"⏸️ {name} controller disabled")
+            continue
+        if name == APPMETADATA:
+            from controller import handlers, sharding  # noqa: F401 (registers the handlers)
+            sharding.api_client = api_client
+        else:
+            import_pet()
+            pet_main = importlib.import_module(f"{PET_PACKAGE}.main")
+            pet_main.standalone = False
+            importlib.import_module(f"{PET_PACKAGE}.api").use(api_client)
+        logger.info(f"🔌 {name} controller handlers registered")
+
+
+def check_handler_ids() -> None:
+    """Fail if two startup/cleanup handlers share an id.
+
+    Kopf tracks operator activities by handler id, so of two handlers with the
+    same id only the first would run.
+    """
+    import kopf
+    seen = set()
+    for handler in kopf.get_default_registry()._activities.get_all_handlers():
+        key = (handler.activity, handler.id)
+        if key in seen:
+            raise RuntimeError(f"Two {handler.activity.value} handlers with id {handler.id!r}; "
+                               f"give one an explicit id=")
+        seen.add(key)
@@ -0,0 +1,64 @@
+"""
+Kopf handlers of the combined operator itself.
+
+There is one kopf runtime, so there is one set of operator settings for every
+watch. They are applied by ``configure_watching``, registered after both
+controllers so that it has the last word over their own ``configure``
+handlers.
+"""
+import importlib
+import logging
+from typing import Iterable
+
+import kopf
+
+from combined.controllers import APPMETADATA, PET, PET_PACKAGE
+from controller import loopmon, server
+from controller.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Watch settings for both controllers (the ApplicationMetadata defaults)
+WATCH_CONNECT_TIMEOUT = 60
+WATCH_SERVER_TIMEOUT = 600
+
+_loop_monitor_task = None
+
+
+def configure_watching(settings: kopf.OperatorSettings, **_):
+    """Apply the shared watch, posting and progress settings."""
+    settings.posting.level = logging.INFO
+    settings.watching.connect_timeout = WATCH_CONNECT_TIMEOUT
+    settings.watching.server_timeout = WATCH_SERVER_TIMEOUT
+    # The Pet controller writes its own status; both keep kopf's state in annotations
+    settings.persistence.progress_storage = kopf.AnnotationsProgressStorage()
+
+
+async def start_loop_monitor(**_):
+    """Measure event loop lag for the probes when ApplicationMetadata is disabled."""
+    global _loop_monitor_task
+    _loop_monitor_task = loopmon.start(get_config().loop_monitor)
+
+
+async def stop_loop_monitor(**_):
+    """Stop the loop monitor."""
+    if _loop_monitor_task is not None:
+        _loop_monitor_task.cancel()
+    loopmon.stop()
+
+
+def pet_event_seen(**_):
+    """Readiness: the Pet watch delivers events (initial listing included)."""
+    server.mark_event()
+
+
+def register(enabled: Iterable[str]) -> None:
+    """Register the operator's own handlers for the enabled controllers."""
+    enabled = set(enabled)
+    kopf.on.startup()(configure_watching)
+    if APPMETADATA not in enabled:
+        kopf.on.startup()(start_loop_monitor)
+        kopf.on.cleanup()(stop_loop_monitor)
+    if PET in enabled:
+        pet_config = importlib.import_module(f"{PET_PACKAGE}.config")
+        kopf.on.event(pet_config.GROUP, pet_config.VERSION, pet_config.PETS)(pet_event_seen)
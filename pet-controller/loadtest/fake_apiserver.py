@@ -0,0 +1,133 @@
+"""
+In-memory stand-in for the Kubernetes API server, enough for the calls the
+Pet controller makes on custom resources:
+
+    GET   /apis/{group}/{version}/{plural}                                 list (limit/continue)
+    GET   /apis/{group}/{version}/namespaces/{ns}/{plural}/{name}          get
+    POST  /apis/{group}/{version}/namespaces/{ns}/{plural}                 create
+    PATCH /apis/{group}/{version}/namespaces/{ns}/{plural}/{name}[/status] merge or apply patch
+    GET   /stats                                                           request counts
+
+A patch of an object that does not exist creates it, so the load harness does
+not have to create every Pet before its handlers write status. Every request
+can be delayed by `latency` seconds to stand in for API server round trips.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def merge(target, patch):
+    """JSON merge patch (RFC 7386)."""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+class Store:
+    def __init__(self):
+        self.objects = {}  # (plural, namespace, name) -> object
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.version = 0
+
+    def put(self, key, obj):
+        self.version += 1
+        meta = obj.setdefault('metadata', {})
+        meta.update(namespace=key[1], name=key[2], resourceVersion=str(self.version))
+        meta.setdefault('uid', f'{key[1]}-{key[2]}-{self.version}')
+        meta.setdefault('generation', 1)
+        self.objects[key] = obj
+        return obj
+
+
+def make_handler(store: Store, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def reply(self, status, body):
+            self.send(status, json.dumps(body).encode())
+
+        def send(self, status, data):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def route(self):
+            if latency:
+                time.sleep(latency)
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            store.requests[self.command] += 1
+            return url, parts
+
+        def body(self):
+            return json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+        def do_GET(self):
+            url, parts = self.route()
+            if parts == ['stats']:
+                self.reply(200, {'requests': dict(store.requests), 'objects': len(store.objects)})
+            elif len(parts) == 4:  # list
+                plural = parts[3]
+                query = parse_qs(url.query)
+                limit = int(query.get('limit', [500])[0])
+                start = int(query.get('continue', [0])[0])
+                with store.lock:
+                    items = [obj for key, obj in sorted(store.objects.items()) if key[0] == plural]
+                    meta = {'continue': str(start + limit)} if start + limit < len(items) else {}
+                    data = json.dumps({'items': items[start:start + limit], 'metadata': meta}).encode()
+                self.send(200, data)
+            elif len(parts) == 7:
+                with store.lock:
+                    obj = store.objects.get((parts[5], parts[4], parts[6]))
+                    data = json.dumps(obj).encode() if obj is not None else None
+                if data is None:
+                    self.reply(404, {'kind': 'Status', 'code': 404})
+                else:
+                    self.send(200, data)
+            else:
+                self.reply(404, {'kind': 'Status', 'code': 404})
+
+        def do_POST(self):
+            _, parts = self.route()
+            obj = self.body()
+            with store.lock:
+                data = json.dumps(store.put((parts[5], parts[4], obj['metadata']['name']), obj)).encode()
+            self.send(201, data)
+
+        def do_PATCH(self):
+            _, parts = self.route()
+            patch = self.body()
+            key = (parts[5], parts[4], parts[6])
+            if len(parts) == 8:  # status subresource
+                patch = {'status': patch.get('status') or {}}
+            else:
+                patch.pop('status', None)
+            with store.lock:
+                obj = merge(store.objects.get(key) or {}, patch)
+                data = json.dumps(store.put(key, obj)).encode()
+            self.send(200, data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int, latency: float = 0.0, ready=None) -> None:
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(Store(), latency))
+    server.daemon_threads = True
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
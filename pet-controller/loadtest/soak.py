@@ -0,0 +1,350 @@
+"""
+Load and soak test for the Pet controller handlers.
+
+Runs the create, update and delete handlers of controller.main (with the probe
+engine, status writer and reconciliation wheel they use) at fixed event rates,
+against fake_apiserver in a child process. Pets are generated from the Pet
+templates in examples/valid/pets.yaml with unique names and IDs. After each
+handler the Pet watch handler is called as kopf would for the event; the
+status patches the controller writes are not echoed back. Updates and deletes
+see a Pet that has settled as Active.
+
+Every step reports the offered and sustained events/s, latency percentiles
+per operation measured from each event's scheduled arrival (so time queued for
+a handler slot or API token counts), the events still unfinished at the end of
+the step, the status patches not yet sent, and RSS per live Pet. A step is
+saturated when it sustains less than 90% of the offered rate, its p99 exceeds
+--slo, more than a second's worth of events is left unfinished, or status
+patches fall more than two seconds' worth behind. With --ramp the rates are multiplied by
+--ramp-factor each step until a step saturates; the last rate sustained is the
+saturation point.
+
+Usage:
+    PYTHONPATH=src python loadtest/soak.py [--create-rate 20] [--update-rate 5]
+        [--delete-rate 2] [--duration 60] [--step 10] [--ramp] [--qps 50] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import time
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+from kubernetes import client
+
+from controller import limits, probes, reconcile, status as status_writer
+from controller import main as handlers
+from controller.config import get_config
+from fake_apiserver import serve
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATES = ROOT / 'examples' / 'valid' / 'pets.yaml'
+CONFIG = ROOT / 'manifests' / 'base' / 'config' / 'controller-config.yaml'
+
+CREATE, UPDATE, DELETE = 'create', 'update', 'delete'
+OPERATIONS = (CREATE, UPDATE, DELETE)
+NAMESPACE = 'loadtest'
+SETTLED = {'phase': 'Active', 'conditions': [{
+    'type': 'Ready', 'status': 'True', 'lastTransitionTime': '2025-01-01T00:00:00+00:00',
+    'reason': 'HealthCheckPassed', 'message': 'settled',
+}]}
+
+# Saturation thresholds, see the module docstring
+SUSTAINED_RATIO = 0.9
+
+handler_logger = logging.getLogger('loadtest.handlers')
+
+
+def load_templates(path: Path) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [doc for doc in yaml.safe_load_all(f) if doc and doc.get('kind') == 'Pet']
+
+
+def rss_bytes() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Fleet:
+    """The Pets created and not yet deleted; per Pet only [position, id, generation]."""
+
+    def __init__(self, templates: List[Dict[str, Any]], seed: int):
+        self.templates = templates
+        self.random = random.Random(seed)
+        self.names: List[str] = []  # for O(1) random picks
+        self.pets: Dict[str, List[int]] = {}
+        self.busy = set()  # Pets with a handler running, like kopf serializes per object
+        self.next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.pets)
+
+    def add(self) -> str:
+        pet_id = self.next_id
+        self.next_id += 1
+        name = f"{self.templates[pet_id % len(self.templates)]['metadata']['name']}-{pet_id}"
+        self.pets[name] = [len(self.names), pet_id, 1]
+        self.names.append(name)
+        self.busy.add(name)
+        return name
+
+    def pick(self) -> Optional[str]:
+        for _ in range(5):
+            if not self.names:
+                return None
+            name = self.names[self.random.randrange(len(self.names))]
+            if name not in self.busy:
+                self.busy.add(name)
+                return name
+        return None
+
+    def remove(self, name: str) -> None:
+        position = self.pets.pop(name)[0]
+        last = self.names.pop()
+        if last != name:
+            self.names[position] = last
+            self.pets[last][0] = position
+
+    def kwargs(self, name: str, status: Dict[str, Any]) -> Dict[str, Any]:
+        """Handler arguments for a Pet, as kopf would pass them."""
+        _, pet_id, generation = self.pets[name]
+        template = self.templates[pet_id % len(self.templates)]
+        spec = dict(template['spec'], id=pet_id)
+        if generation > 1:
+            spec['tag'] = f'gen-{generation}'
+        labels = dict(template['metadata'].get('labels') or {})
+        meta = {
+            'name': name, 'namespace': NAMESPACE, 'uid': f'uid-{pet_id}', 'labels': labels,
+            'creationTimestamp': f'2025-01-01T00:00:00.{pet_id:09d}', 'generation': generation,
+        }
+        body = {'metadata': meta, 'spec': spec, 'status': status}
+        return dict(body=body, spec=spec, meta=meta, status=status, labels=labels,
+                    name=name, namespace=NAMESPACE, logger=handler_logger)
+
+
+class Harness:
+    def __init__(self, fleet: Fleet):
+        self.fleet = fleet
+        self.inflight = set()
+        self.reset()
+
+    def reset(self) -> None:
+        self.latencies: Dict[str, List[float]] = {op: [] for op in OPERATIONS}
+        self.completed = 0
+        self.errors: Counter = Counter()
+        self.skipped: Counter = Counter()
+
+    async def handle(self, operation: str) -> bool:
+        if operation == CREATE:
+            name = self.fleet.add()
+            kwargs = self.fleet.kwargs(name, {})
+            await handlers.create_pet(**kwargs)
+            await handlers.index_pet(type='ADDED', **kwargs)
+        else:
+            name = self.fleet.pick()
+            if name is None:
+                return False
+            if operation == UPDATE:
+                self.fleet.pets[name][2] += 1
+                kwargs = self.fleet.kwargs(name, SETTLED)
+                await handlers.update_pet(**kwargs)
+                await handlers.index_pet(type='MODIFIED', **kwargs)
+            else:
+                kwargs = self.fleet.kwargs(name, SETTLED)
+                await handlers.delete_pet(**kwargs)
+                await handlers.index_pet(type='DELETED', **kwargs)
+                self.fleet.remove(name)
+        self.fleet.busy.discard(name)
+        return True
+
+    async def event(self, operation: str, scheduled: float) -> None:
+        try:
+            handled = await self.handle(operation)
+        except Exception as e:
+            self.errors[f'{operation}: {e.__class__.__name__}'] += 1
+            return
+        if not handled:
+            self.skipped[operation] += 1
+            return
+        self.latencies[operation].append(time.monotonic() - scheduled)
+        self.completed += 1
+
+    async def arrivals(self, operation: str, rate: float, until: float) -> None:
+        if rate <= 0:
+            return
+        interval = 1 / rate
+        due = time.monotonic()
+        while due < until:
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            task = asyncio.create_task(self.event(operation, due))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+            due += interval
+
+    async def step(self, rates: Dict[str, float], seconds: float, slo: float, base_rss: int) -> Dict[str, Any]:
+        self.reset()
+        started = time.monotonic()
+        await asyncio.gather(*(self.arrivals(op, rates[op], started + seconds) for op in OPERATIONS))
+        elapsed = time.monotonic() - started
+        completed, backlog = self.completed, len(self.inflight)
+        unsent = len(status_writer.writer())
+        offered = sum(rates.values())
+        # Unfinished events finish (and count towards latency) before the next step
+        if self.inflight:
+            await asyncio.wait(set(self.inflight), timeout=max(seconds, 10))
+        latency = {
+            op: {f'p{int(q * 100)}_ms': round(percentile(values, q) * 1000, 2) if values else None
+                 for q in (0.5, 0.9, 0.99)}
+            for op, values in self.latencies.items()
+        }
+        p99 = max((percentile(values, 0.99) for values in self.latencies.values() if values), default=0.0)
+        sustained = completed / elapsed
+        rss = rss_bytes()
+        return {
+            'offered_events_per_second': round(offered, 2),
+            'sustained_events_per_second': round(sustained, 2),
+            'latency': latency,
+            'unfinished': backlog,
+            'status_unsent': unsent,
+            'errors': dict(self.errors),
+            'skipped': dict(self.skipped),
+            'live_pets': len(self.fleet),
+            'rss_bytes': rss,
+            'rss_per_pet_bytes': round((rss - base_rss) / len(self.fleet)) if len(self.fleet) else None,
+            'saturated': (sustained < SUSTAINED_RATIO * offered or p99 > slo
+                          or backlog > offered or unsent > 2 * offered),
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def api_stats(port: int) -> Dict[str, Any]:
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/stats') as response:
+        return json.load(response)
+
+
+async def run(args: argparse.Namespace, port: int) -> Dict[str, Any]:
+    os.environ.setdefault('CONFIG_PATH', str(CONFIG))
+    controller_config = get_config()
+    settings = controller_config.settings
+    if args.qps:
+        settings.rate_limit_qps = args.qps
+        settings.rate_limit_burst = max(settings.rate_limit_burst, int(args.qps))
+
+    configuration = client.Configuration()
+    configuration.host = f'http://127.0.0.1:{port}'
+    configuration.connection_pool_maxsize = 64
+    client.Configuration.set_default(configuration)
+
+    limits.configure(settings)
+    status_writer.configure(settings.status_debounce)
+    reconcile.configure(settings, handlers.reconcile_pets).start()
+    probes.configure(controller_config.health_check, settings, handlers.probe_finished)
+
+    harness = Harness(Fleet(load_templates(args.templates), args.seed))
+    rates = {CREATE: args.create_rate, UPDATE: args.update_rate, DELETE: args.delete_rate}
+    base_rss = rss_bytes()
+    steps = []
+    try:
+        if args.ramp:
+            for _ in range(args.max_steps):
+                result = await harness.step(rates, args.step, args.slo, base_rss)
+                steps.append(result)
+                report(result, args.json)
+                if result['saturated']:
+                    break
+                rates = {op: rate * args.ramp_factor for op, rate in rates.items()}
+        else:
+            for _ in range(max(1, round(args.duration / args.step))):
+                result = await harness.step(rates, args.step, args.slo, base_rss)
+                steps.append(result)
+                report(result, args.json)
+    finally:
+        # Status patches still pending are dropped with the event loop
+        await reconcile.wheel().stop()
+        await probes.engine().stop()
+
+    sustained = [s['offered_events_per_second'] for s in steps if not s['saturated']]
+    return {
+        'rates': {CREATE: args.create_rate, UPDATE: args.update_rate, DELETE: args.delete_rate},
+        'settings': {
+            'rate_limit_qps': settings.rate_limit_qps,
+            'rate_limit_burst': settings.rate_limit_burst,
+            'max_concurrent_creates': settings.max_concurrent_creates,
+            'max_concurrent_reconciles': settings.max_concurrent_reconciles,
+            'status_debounce': settings.status_debounce,
+        },
+        'api_latency_ms': args.api_latency,
+        'steps': steps,
+        'saturation_events_per_second': max(sustained) if sustained else None,
+        'rss_per_pet_bytes': steps[-1]['rss_per_pet_bytes'] if steps else None,
+        'api': api_stats(port),
+    }
+
+
+def report(step: Dict[str, Any], quiet: bool) -> None:
+    if quiet:
+        return
+    latency = '  '.join(f"{op} p50/p99 {values['p50_ms']}/{values['p99_ms']}ms"
+                        for op, values in step['latency'].items() if values['p50_ms'] is not None)
+    print(f"{step['offered_events_per_second']:>8.1f} offered  {step['sustained_events_per_second']:>8.1f} sustained  "
+          f"{latency}  unfinished {step['unfinished']}  status unsent {step['status_unsent']}  pets {step['live_pets']}  "
+          f"rss/pet {step['rss_per_pet_bytes']}B{'  SATURATED' if step['saturated'] else ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--create-rate', type=float, default=20, help='creates per second')
+    parser.add_argument('--update-rate', type=float, default=5, help='updates per second')
+    parser.add_argument('--delete-rate', type=float, default=2, help='deletes per second')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to run without --ramp')
+    parser.add_argument('--step', type=float, default=10, help='seconds per reported step')
+    parser.add_argument('--ramp', action='store_true', help='raise the rates each step until saturated')
+    parser.add_argument('--ramp-factor', type=float, default=2)
+    parser.add_argument('--max-steps', type=int, default=10)
+    parser.add_argument('--slo', type=float, default=1.0, help='p99 latency (s) above which a step is saturated')
+    parser.add_argument('--qps', type=float, help='override settings.rate_limit_qps')
+    parser.add_argument('--api-latency', type=float, default=0, help='fake API server delay per request (ms)')
+    parser.add_argument('--templates', type=Path, default=TEMPLATES)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='machine-readable output')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    port = free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(port, args.api_latency / 1000, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+    try:
+        results = asyncio.run(run(args, port))
+    finally:
+        server.terminate()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"saturation: {results['saturation_events_per_second']} events/s  "
+              f"rss/pet: {results['rss_per_pet_bytes']}B  api requests: {results['api']['requests']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Local stub of the upstream Petstore API (inputs/openapi.yaml) for trying the
+importer without the real service.
+
+Serves COUNT generated pets:
+    GET  /v1/pets?limit=N[&after=ID]   listPets, next page in the x-next header
+    GET  /v1/pets/{petId}              showPetById
+    POST /v1/pets                      createPets (JSON pet body)
+
+Usage:
+    python3 scripts/petstore-stub.py [--port 8000] [--count 20000]
+Point a PetStore's spec.endpoints.baseUrl at http://localhost:8000.
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TAGS = ['dog', 'cat', 'bird', 'fish', '']
+MAX_PAGE_SIZE = 100
+
+pets = {}
+
+
+def generate(count):
+    for pet_id in range(1, count + 1):
+        pet = {'id': pet_id, 'name': f'Pet {pet_id}'}
+        tag = TAGS[pet_id % len(TAGS)]
+        if tag:
+            pet['tag'] = tag
+        pets[pet_id] = pet
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real service
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away mid-page
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts == ['v1', 'pets']:
+            query = parse_qs(url.query)
+            limit = min(int(query.get('limit', [MAX_PAGE_SIZE])[0]), MAX_PAGE_SIZE)
+            after = int(query.get('after', [0])[0])
+            ids = sorted(pet_id for pet_id in pets if pet_id > after)[:limit + 1]
+            page = [pets[pet_id] for pet_id in ids[:limit]]
+            headers = {}
+            if len(ids) > limit:
+                headers['x-next'] = f'/v1/pets?limit={limit}&after={ids[limit - 1]}'
+            self.send_json(200, page, headers)
+        elif len(parts) == 3 and parts[:2] == ['v1', 'pets'] and parts[2].isdigit() and int(parts[2]) in pets:
+            self.send_json(200, [pets[int(parts[2])]])
+        else:
+            self.send_json(404, {'code': 404, 'message': 'not found'})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/v1/pets':
+            self.send_json(404, {'code': 404, 'message': 'not found'})
+            return
+        pet = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not isinstance(pet.get('id'), int) or not pet.get('name'):
+            self.send_json(400, {'code': 400, 'message': 'id and name are required'})
+            return
+        pets[pet['id']] = pet
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--count', type=int, default=20000, help='pets to serve')
+    args = parser.parse_args()
+    generate(args.count)
+    print(f"🐾 Petstore stub serving {len(pets)} pets on http://localhost:{args.port}/v1")
+    ThreadingHTTPServer(('', args.port), Handler).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,7 @@ set -e
 echo "=== Pet Controller Local Development ==="
 
 # Check if we're in the right directory
-if [ ! -f "src/controller.py" ]; then
+if [ ! -f "src/controller/main.py" ]; then
     echo "Error: Please run this script from the pet-controller directory"
     exit 1
 fi
@@ -24,7 +24,7 @@ echo "Installing dependencies..."
 pip install -r requirements.txt
 
 # Set environment variables
-export CONFIG_PATH="$(pwd)/config.yaml"
+export CONFIG_PATH="$(pwd)/manifests/base/config/controller-config.yaml"
 export KOPF_LOG_FORMAT="plain"
 export KOPF_LOG_LEVEL="INFO"
 
@@ -34,4 +34,4 @@ echo "Press Ctrl+C to stop"
 echo ""
 
 # Run the controller
-python -m src.controller
\ No newline at end of file
+PYTHONPATH=src python -m controller
\ No newline at end of file
@@ -0,0 +1,48 @@
+#!/bin/bash
+set -e
+
+cd "$(dirname "$0")/.."  # Change to project root
+
+# Indent non-empty lines for a YAML block scalar
+indent() {
+    sed 's/^\(.\)/    \1/' "$1"
+}
+
+# Controller code: one key per module in src/controller
+CODE_MAP="manifests/base/configmaps/controller-code.yaml"
+{
+    cat <<EOF
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: pet-controller-code
+  namespace: pet-system
+data:
+EOF
+    for file in src/controller/*.py; do
+        key="$(basename "$file")"
+        if [ -s "$file" ]; then
+            echo "  ${key}: |"
+            indent "$file"
+        else
+            echo "  ${key}: \"\""
+        fi
+    done
+} > "${CODE_MAP}"
+
+# Controller configuration
+CONFIG_MAP="manifests/base/config/configmap.yaml"
+{
+    cat <<EOF
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: pet-controller-config
+  namespace: petstore-system
+data:
+  config.yaml: |
+EOF
+    indent manifests/base/config/controller-config.yaml
+} > "${CONFIG_MAP}"
+
+echo "✅ Synced ${CODE_MAP} and ${CONFIG_MAP}"
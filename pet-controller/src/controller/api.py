@@ -0,0 +1,41 @@
+"""
+Kubernetes API access shared by the controller modules.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+
+from kubernetes import client
+
+from . import limits
+from .config import GROUP, VERSION
+
+_custom_objects: Optional[client.CustomObjectsApi] = None
+
+
+def custom_objects() -> client.CustomObjectsApi:
+    global _custom_objects
+    if _custom_objects is None:
+        _custom_objects = client.CustomObjectsApi()
+    return _custom_objects
+
+
+def use(api_client: client.ApiClient) -> None:
+    """Make API calls over `api_client`, e.g. one shared with another controller."""
+    global _custom_objects
+    _custom_objects = client.CustomObjectsApi(api_client)
+
+
+async def list_all(plural: str, page_size: int) -> AsyncIterator[Dict[str, Any]]:
+    """Yield every object of a custom resource, listed `page_size` at a time."""
+    token = None
+    while True:
+        await limits.api_call()
+        page = await asyncio.to_thread(
+            custom_objects().list_cluster_custom_object, GROUP, VERSION, plural,
+            limit=page_size, _continue=token,
+        )
+        for item in page.get('items', []):
+            yield item
+        token = page.get('metadata', {}).get('continue')
+        if not token:
+            break
@@ -0,0 +1,110 @@
+"""
+Pet Controller configuration, loaded from the YAML file at CONFIG_PATH
+(manifests/base/config/controller-config.yaml). Missing keys keep their defaults.
+"""
+import logging
+import os
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = '/etc/petstore/config.yaml'
+
+# Custom resources handled by the controller
+GROUP = 'petstore.example.com'
+VERSION = 'v1'
+PETS = 'pets'
+PETSTORES = 'petstores'
+
+
+@dataclass
+class Settings:
+    reconcile_interval: float = 30
+    startup_delay: float = 5
+    shutdown_timeout: float = 30
+    health_check_timeout: float = 10
+    health_check_retry_count: int = 3
+    health_check_retry_delay: float = 5
+    max_concurrent_reconciles: int = 5
+    max_concurrent_creates: int = 10
+    strict_validation: bool = True
+    auto_fix_minor_issues: bool = False
+    batch_size: int = 100
+    rate_limit_qps: float = 50
+    rate_limit_burst: int = 100
+    status_debounce: float = 0.5
+    max_concurrent_probes: int = 50
+    sync_interval: float = 300
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = True
+    port: int = 9090
+    path: str = '/metrics'
+
+
+@dataclass
+class SimulationConfig:
+    even_id_healthy: bool = True
+    odd_id_divisible_by_3: bool = True
+
+
+@dataclass
+class RealChecksConfig:
+    enabled: bool = False
+    endpoint_template: str = 'http://pet-{id}.pets.svc.cluster.local:8080/health'
+    timeout: float = 5
+    expected_status_code: int = 200
+    expected_response: str = ''
+
+
+@dataclass
+class HealthCheckConfig:
+    simulation: SimulationConfig = field(default_factory=SimulationConfig)
+    real_checks: RealChecksConfig = field(default_factory=RealChecksConfig)
+
+
+@dataclass
+class ControllerConfig:
+    settings: Settings = field(default_factory=Settings)
+    health_check: HealthCheckConfig = field(default_factory=HealthCheckConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+
+
+def _section(cls, data: Optional[Dict[str, Any]]):
+    known = {f.name for f in fields(cls)}
+    return cls(**{k: v for k, v in (data or {}).items() if k in known})
+
+
+def load_config(path: Optional[str] = None) -> ControllerConfig:
+    # PET_CONFIG_PATH first: CONFIG_PATH is the other controller's in a combined operator
+    path = path or os.environ.get('PET_CONFIG_PATH') or os.environ.get('CONFIG_PATH', DEFAULT_CONFIG_PATH)
+    try:
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        logger.warning(f"⚠️ No configuration at {path}, using defaults")
+        data = {}
+    health_check = data.get('health_check') or {}
+    return ControllerConfig(
+        settings=_section(Settings, data.get('settings')),
+        health_check=HealthCheckConfig(
+            simulation=_section(SimulationConfig, health_check.get('simulation')),
+            real_checks=_section(RealChecksConfig, health_check.get('real_checks')),
+        ),
+        metrics=_section(MetricsConfig, data.get('metrics')),
+    )
+
+
+_config: Optional[ControllerConfig] = None
+
+
+def get_config() -> ControllerConfig:
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
@@ -0,0 +1,188 @@
+"""
+Bulk import of upstream pets as Pet resources.
+
+Mirrors the pets listed by a PetStore's upstream API (spec.endpoints) into Pets
+named <store>-<id> in the store's namespace, labelled with the store.
+
+- listPets pages are fetched by a separate task, at most PREFETCH_PAGES ahead,
+  so fetching overlaps with writing and memory stays bounded by the page size.
+- Each page is written with server-side apply, up to max_concurrent_creates
+  Pets at a time, each write taking a token from the controller's rate limit.
+  Applying is idempotent, so a page written twice is harmless.
+- The apply is not forced: if a Pet of that name already exists with a
+  different spec.id or store label set by another field manager, the API
+  server reports a conflict and the Pet is left alone and counted as rejected.
+- After each page the URL of the next one is saved in the PetStore's
+  CHECKPOINT_ANNOTATION, with the counts of Pets applied and rejected so far;
+  a later run resumes from there. The annotation is removed when the import
+  completes.
+
+Usage:
+    python -m controller.importer <namespace>/<petstore> [--restart]
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from kubernetes import config
+from kubernetes.client.rest import ApiException
+
+from . import api, limits
+from .config import GROUP, PETS, PETSTORES, VERSION, get_config
+from .stores import STORE_LABEL
+from .upstream import PetstoreClient
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ANNOTATION = 'petstore.example.com/import-checkpoint'
+FIELD_MANAGER = 'pet-importer'
+
+# listPets pages fetched ahead of the one being written
+PREFETCH_PAGES = 2
+
+APPLY_PATCH = 'application/apply-patch+yaml'
+MERGE_PATCH = 'application/merge-patch+json'
+
+
+def pet_manifest(pet: Dict[str, Any], namespace: str, store: str, name: Optional[str] = None) -> Dict[str, Any]:
+    """The Pet mirroring an upstream pet, named <store>-<id> unless `name` is given."""
+    spec = {'id': pet['id'], 'name': pet['name']}
+    if pet.get('tag'):
+        spec['tag'] = pet['tag']
+    return {
+        'apiVersion': f'{GROUP}/{VERSION}',
+        'kind': 'Pet',
+        'metadata': {
+            'name': name or f"{store}-{pet['id']}",
+            'namespace': namespace,
+            'labels': {STORE_LABEL: store},
+        },
+        'spec': spec,
+    }
+
+
+def read_checkpoint(body: Dict[str, Any]) -> Dict[str, Any]:
+    annotations = body['metadata'].get('annotations') or {}
+    value = annotations.get(CHECKPOINT_ANNOTATION)
+    return json.loads(value) if value else {}
+
+
+class Importer:
+    def __init__(self, namespace: str, store: str, concurrency: int):
+        self.namespace = namespace
+        self.store = store
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self.applied = 0
+        self.rejected = 0
+        self.conflicts = 0  # of the rejected ones
+
+    async def apply(self, pet: Dict[str, Any], name: Optional[str] = None) -> None:
+        """Write an upstream pet; `name` is that of the store's Pet with its id, if one is known."""
+        body = pet_manifest(pet, self.namespace, self.store, name)
+        async with self._slots:
+            await limits.api_call()
+            try:
+                await asyncio.to_thread(
+                    api.custom_objects().patch_namespaced_custom_object,
+                    GROUP, VERSION, self.namespace, PETS, body['metadata']['name'], body,
+                    # Only a Pet known to mirror this pet is overwritten; <store>-<id>
+                    # may be someone else's Pet
+                    field_manager=FIELD_MANAGER, force=name is not None, _content_type=APPLY_PATCH,
+                )
+            except ApiException as e:
+                if e.status is None or e.status >= 500 or e.status == 429:
+                    raise
+                self.rejected += 1
+                if e.status == 409:
+                    self.conflicts += 1
+                    logger.warning(f"⚠️ Upstream pet {pet.get('id')} not imported: Pet "
+                                   f"{self.namespace}/{body['metadata']['name']} exists with other values")
+                    return
+                # Rejected by the API server (e.g. a name or tag the CRD does not accept)
+                logger.warning(f"⚠️ Upstream pet {pet.get('id')} not imported: {e.status} {e.reason}")
+                return
+        self.applied += 1
+
+    async def apply_page(self, pets) -> None:
+        await asyncio.gather(*(self.apply(pet) for pet in pets))
+
+    async def save_checkpoint(self, checkpoint: Optional[Dict[str, Any]]) -> None:
+        value = json.dumps(checkpoint) if checkpoint else None
+        await limits.api_call()
+        await asyncio.to_thread(
+            api.custom_objects().patch_namespaced_custom_object,
+            GROUP, VERSION, self.namespace, PETSTORES, self.store,
+            {'metadata': {'annotations': {CHECKPOINT_ANNOTATION: value}}},
+            _content_type=MERGE_PATCH,
+        )
+
+
+async def run_import(namespace: str, store: str, restart: bool = False) -> Tuple[int, int]:
+    """Import the upstream pets of a PetStore; returns (applied, rejected) of this run."""
+    settings = get_config().settings
+    limits.configure(settings)
+    body = await asyncio.to_thread(
+        api.custom_objects().get_namespaced_custom_object, GROUP, VERSION, namespace, PETSTORES, store,
+    )
+    checkpoint = {} if restart else read_checkpoint(body)
+    if checkpoint:
+        logger.info(f"⏩ Resuming import of PetStore {namespace}/{store} after {checkpoint['imported']} pets")
+    # Totals of the runs before this one
+    imported, rejected = checkpoint.get('imported', 0), checkpoint.get('rejected', 0)
+
+    client = PetstoreClient.for_store(body, max_connections=1)
+    importer = Importer(namespace, store, settings.max_concurrent_creates)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=PREFETCH_PAGES)
+
+    async def fetch():
+        try:
+            async for page in client.pages(checkpoint.get('next')):
+                await queue.put(page)
+            await queue.put(None)
+        except Exception as e:
+            await queue.put(e)
+
+    fetcher = asyncio.create_task(fetch())
+    try:
+        while True:
+            page = await queue.get()
+            if page is None:
+                break
+            if isinstance(page, Exception):
+                raise page
+            pets, next_page = page
+            await importer.apply_page(pets)
+            totals = {'imported': imported + importer.applied, 'rejected': rejected + importer.rejected}
+            if next_page:
+                await importer.save_checkpoint({'next': next_page, **totals})
+            logger.info(f"📥 PetStore {namespace}/{store}: {totals['imported']} upstream pets imported, "
+                        f"{totals['rejected']} rejected")
+    finally:
+        fetcher.cancel()
+        await asyncio.gather(fetcher, return_exceptions=True)
+        await client.close()
+    await importer.save_checkpoint(None)
+    logger.info(f"✅ Import of PetStore {namespace}/{store} completed: "
+                f"{importer.applied} applied, {importer.rejected} rejected")
+    return importer.applied, importer.rejected
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('petstore', help='<namespace>/<name> of the PetStore to import into')
+    parser.add_argument('--restart', action='store_true', help='ignore a saved checkpoint')
+    args = parser.parse_args()
+    namespace, _, store = args.petstore.rpartition('/')
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        config.load_incluster_config()
+    except config.ConfigException:
+        config.load_kube_config()
+    asyncio.run(run_import(namespace or 'default', store, args.restart))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Cluster-wide index of Pet IDs.
+
+Maps spec.id to the Pets (namespace, name) that claim it, so create and update
+handlers check uniqueness with a dictionary lookup instead of listing all Pets.
+The index is filled from the paginated list of all Pets at startup and kept
+current from the watch stream.
+
+When several Pets claim the same ID, the owner is the one created first, ties
+broken by uid. The result depends only on the objects, not on the order in
+which their events arrive, so concurrent creates settle on the same winner in
+every controller replica; the others are reported as duplicates.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import PET_ID_COLLISIONS, PET_INDEX_SIZE
+
+Key = Tuple[str, str]  # (namespace, name)
+Rank = Tuple[str, str]  # (creationTimestamp, uid)
+
+
+def _rank(meta: Dict[str, Any]) -> Rank:
+    return (meta.get('creationTimestamp') or '', meta.get('uid') or '')
+
+
+class PetIdIndex:
+    def __init__(self):
+        self._claims: Dict[int, Dict[Key, Rank]] = {}
+        self._ids: Dict[Key, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def owner(self, pet_id: int) -> Optional[Key]:
+        claims = self._claims.get(pet_id)
+        if not claims:
+            return None
+        return min(claims, key=claims.__getitem__)
+
+    def claim(self, key: Key, pet_id: Any, meta: Dict[str, Any]) -> Optional[Key]:
+        """Record that `key` uses `pet_id`; returns a previous owner that lost the ID."""
+        if not isinstance(pet_id, int):
+            self.release(key)
+            return None
+        if self._ids.get(key) != pet_id:
+            self.release(key)
+        previous = self.owner(pet_id)
+        claims = self._claims.setdefault(pet_id, {})
+        if key not in claims and claims:
+            PET_ID_COLLISIONS.inc()
+        claims[key] = _rank(meta)
+        self._ids[key] = pet_id
+        PET_INDEX_SIZE.set(len(self._ids))
+        if previous is not None and previous != key and self.owner(pet_id) == key:
+            return previous
+        return None
+
+    def release(self, key: Key) -> None:
+        pet_id = self._ids.pop(key, None)
+        if pet_id is None:
+            return
+        claims = self._claims[pet_id]
+        del claims[key]
+        if not claims:
+            del self._claims[pet_id]
+        PET_INDEX_SIZE.set(len(self._ids))
+
+    def duplicate_of(self, key: Key, pet_id: Any) -> Optional[Key]:
+        """The Pet owning `pet_id` if it is not `key`."""
+        owner = self.owner(pet_id) if isinstance(pet_id, int) else None
+        return owner if owner is not None and owner != key else None
+
+    def clear(self) -> None:
+        self._claims.clear()
+        self._ids.clear()
+        PET_INDEX_SIZE.set(0)
+
+
+pet_ids = PetIdIndex()
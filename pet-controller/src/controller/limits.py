@@ -0,0 +1,115 @@
+"""
+Concurrency and rate limits for Pet handlers.
+
+Each operation has its own semaphore (max_concurrent_creates for creates,
+max_concurrent_reconciles for everything else), and all operations share one
+token bucket of rate_limit_burst tokens refilled at rate_limit_qps. A token is
+taken once per API call the controller makes itself (e.g. each status patch
+sent by controller.status), and once per kopf handler run for the patch kopf
+sends after it (diff-base, progress annotations, finalizers). Periodic
+reconcile batches are not kopf handlers, so they take no token of their own.
+"""
+import asyncio
+import functools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from .config import Settings
+from .metrics import QUEUE_DEPTH, QUEUE_WAIT, timed
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+RECONCILE = 'reconcile'
+
+# Operations run as kopf handlers, which kopf follows with a patch of its own
+KOPF_HANDLERS = frozenset({CREATE, UPDATE, DELETE})
+
+
+class TokenBucket:
+    """`burst` tokens, refilled continuously at `rate` per second.
+
+    A caller that finds the bucket empty reserves the next token (the count
+    goes negative) and sleeps exactly until it is due, so waiters are served
+    in order and each wakes up once.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self.rate)
+        except asyncio.CancelledError:
+            self._tokens += 1  # give the reserved token back
+            raise
+
+
+class Limiter:
+    def __init__(self, settings: Settings):
+        reconciles = max(1, settings.max_concurrent_reconciles)
+        self.semaphores: Dict[str, asyncio.Semaphore] = {
+            CREATE: asyncio.Semaphore(max(1, settings.max_concurrent_creates)),
+            UPDATE: asyncio.Semaphore(reconciles),
+            DELETE: asyncio.Semaphore(reconciles),
+            RECONCILE: asyncio.Semaphore(reconciles),
+        }
+        self.bucket = TokenBucket(settings.rate_limit_qps, settings.rate_limit_burst)
+
+    @asynccontextmanager
+    async def slot(self, operation: str):
+        """Hold a concurrency slot for `operation`."""
+        depth = QUEUE_DEPTH.labels(operation=operation)
+        started = time.monotonic()
+        depth.inc()
+        try:
+            async with self.semaphores[operation]:
+                depth.dec()
+                depth = None
+                QUEUE_WAIT.labels(operation=operation).observe(time.monotonic() - started)
+                yield
+        finally:
+            if depth is not None:  # cancelled while waiting
+                depth.dec()
+
+
+_limiter: Optional[Limiter] = None
+
+
+def configure(settings: Settings) -> Limiter:
+    global _limiter
+    _limiter = Limiter(settings)
+    return _limiter
+
+
+async def api_call() -> None:
+    """Take one API token, waiting for the bucket to refill if needed."""
+    await _limiter.bucket.acquire()
+
+
+def limited(operation: str):
+    """Run an async handler within the limits for `operation`, timing the run."""
+    def decorator(fn):
+        run = timed(operation)(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(**kwargs):
+            async with _limiter.slot(operation):
+                if operation in KOPF_HANDLERS:
+                    await api_call()  # for kopf's own patch after the handler
+                return await run(**kwargs)
+        return wrapper
+    return decorator
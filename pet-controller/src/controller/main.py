@@ -3,9 +3,14 @@
 Pet Controller - Kubernetes Controller for Pet CRD
 """
 import logging
+import os
 import kopf
 from kubernetes import client, config
 from datetime import datetime, timezone
+from prometheus_client import start_http_server
+
+from . import api, index, limits, metrics, probes, readiness, reconcile, status as status_writer, stores, sync
+from .config import PETS, PETSTORES, get_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,57 +28,329 @@ def validate_pet_spec(spec):
         return False, f"Invalid name: {pet_name}. Must be non-empty string"
     return True, "Valid"
 
-def simulate_pet_health_check(spec):
-    pet_id = spec['id']
-    pet_name = spec['name']
-    if pet_id % 2 == 0:
-        return True, f"Pet {pet_name} (ID: {pet_id}) is healthy"
-    else:
-        return pet_id % 3 == 0, f"Pet {pet_name} (ID: {pet_id}) health check in progress"
+# False when these handlers are hosted by an operator that loads the kube
+# config and serves /metrics itself (the combined operator)
+standalone = True
 
-@kopf.on.startup()
+# Explicit id: kopf keys startup state by id, and the combined operator also
+# runs the ApplicationMetadata controller's `configure`
+@kopf.on.startup(id='pet_configure')
 def configure(settings, **_):
-    config.load_incluster_config()
+    if standalone:
+        config.load_incluster_config()
+    controller_config = get_config()
+    limits.configure(controller_config.settings)
+    status_writer.configure(controller_config.settings.status_debounce)
+    reconcile.configure(controller_config.settings, reconcile_pets)
+    # Status is written by status_writer; keep kopf's own state out of it
+    settings.persistence.progress_storage = kopf.AnnotationsProgressStorage()
+    if controller_config.metrics.enabled:
+        metrics.register_pet_collector()
+        if standalone:
+            start_http_server(controller_config.metrics.port)
+            logger.info(f"📊 Metrics served on :{controller_config.metrics.port}")
     logger.info("🐾 Pet Controller started successfully!")
     logger.info("👀 Watching for Pet resources...")
 
+@kopf.on.startup()
+async def start_readiness(**_):
+    if standalone:
+        await readiness.serve(READINESS_ENDPOINT)
+
+@kopf.on.cleanup()
+async def stop_readiness(**_):
+    await readiness.stop()
+
+@kopf.on.startup()
+async def load_caches(**_):
+    page_size = get_config().settings.batch_size
+    index.pet_ids.clear()
+    reconcile.wheel().clear()
+    sync.catalog.clear()
+    readiness.reset()
+    candidates = []  # valid Pets of a store, counted once every ID is claimed
+    async for body in api.list_all(PETSTORES, page_size):
+        stores.registry.observe_store(body)
+        readiness.expect(PETSTORES, [(body['metadata']['namespace'], body['metadata']['name'])])
+    async for body in api.list_all(PETS, page_size):
+        meta = body['metadata']
+        key = (meta['namespace'], meta['name'])
+        spec, labels, status = body.get('spec') or {}, meta.get('labels'), body.get('status')
+        readiness.expect(PETS, [key])
+        index.pet_ids.claim(key, spec.get('id'), meta)
+        store_key = stores.store_of(key[0], labels)
+        if store_key is not None and validate_pet_spec(spec)[0]:
+            conditions = (status or {}).get('conditions') or []
+            candidates.append((key, store_key, spec.get('id'), spec.get('tag'), conditions))
+        metrics.record_pet(key, (status or {}).get('phase'))
+        reconcile.wheel().track(key, meta.get('uid'), reconcile.PetState(spec, labels, status, meta))
+        sync.catalog.observe(key, store_key, spec, status)
+    # Only the Pets admit_to_store would accept count: valid and owning their ID
+    for key, store_key, pet_id, tag, conditions in candidates:
+        if index.pet_ids.duplicate_of(key, pet_id) is None:
+            stores.registry.restore(key, store_key, tag, conditions)
+    readiness.loaded()
+    logger.info(f"🔢 Loaded {len(index.pet_ids)} Pets into the ID index and store counters")
+
+@kopf.on.startup()
+async def start_probes(**_):
+    controller_config = get_config()
+    probes.configure(controller_config.health_check, controller_config.settings, probe_finished)
+
+@kopf.on.startup()
+async def start_reconciler(**_):
+    reconcile.wheel().start()
+
+@kopf.on.cleanup()
+async def stop_reconciler(**_):
+    await reconcile.wheel().stop()
+
+@kopf.on.cleanup()
+async def stop_probes(**_):
+    await probes.engine().stop()
+
+@kopf.on.cleanup()
+async def flush_status(**_):
+    await status_writer.writer().flush_all()
+
+async def probe_finished(key, healthy, message, current):
+    """Record a Pet's health check result; `current` is its PetState when the check was submitted."""
+    namespace, name = key
+    if healthy:
+        phase, reason = "Active", "HealthCheckPassed"
+    else:
+        phase = "Inactive" if current.phase in ("Active", "Inactive") else "Pending"
+        reason = "HealthCheckFailed"
+    if current.phase == phase and current.ready_digest == reconcile.condition_digest(reason, message):
+        return  # periodic re-check with the same result
+    logger.info(f"🩺 Health check of Pet {namespace}/{name}: {message} - Phase: {phase}")
+    await status_writer.writer().write(namespace, name, {
+        'phase': phase,
+        'conditions': [status_writer.ready_condition(current.status(), healthy, reason, message)],
+    })
+
+async def schedule_health_check(spec, name, namespace, status, meta):
+    """Start the Pet's health check; a Pet without a usable phase waits in Pending."""
+    probes.engine().submit((namespace, name), spec, reconcile.PetState(spec, None, status, meta))
+    if (status or {}).get('phase') in (None, "Error"):
+        await write_status(namespace, name, status, meta, "Pending", False,
+                           "HealthCheckPending", "Health check in progress")
+    else:
+        await status_writer.writer().write(namespace, name, {'observedGeneration': meta.get('generation')})
+
+async def write_status(namespace, name, current, meta, phase, ready, reason, message):
+    if phase == "Error":
+        metrics.VALIDATION_FAILURES.labels(reason=reason).inc()
+        probes.engine().cancel((namespace, name))
+    await status_writer.writer().write(namespace, name, {
+        'phase': phase,
+        'conditions': [status_writer.ready_condition(current, ready, reason, message)],
+        'observedGeneration': meta.get('generation'),
+    })
+
+async def claim_pet_id(spec, name, namespace, meta):
+    """Index the Pet's ID; returns an error message if another Pet owns it."""
+    key = (namespace, name)
+    demoted = index.pet_ids.claim(key, spec.get('id'), meta)
+    if demoted is not None:
+        # An older Pet with this ID showed up after the current owner was admitted
+        message = f"Duplicate ID {spec['id']}: already used by Pet {namespace}/{name}"
+        logger.error(f"❌ Pet {demoted[0]}/{demoted[1]} validation failed: {message}")
+        metrics.VALIDATION_FAILURES.labels(reason='DuplicateId').inc()
+        probes.engine().cancel(demoted)
+        await status_writer.writer().write(demoted[0], demoted[1], {
+            'phase': 'Error',
+            'conditions': [status_writer.ready_condition(None, False, 'DuplicateId', message)],
+        })
+    owner = index.pet_ids.duplicate_of(key, spec.get('id'))
+    if owner is not None:
+        return f"Duplicate ID {spec['id']}: already used by Pet {owner[0]}/{owner[1]}"
+    return None
+
+@kopf.on.event('petstore.example.com', 'v1', 'pets')
+@metrics.timed('pet_event')
+async def index_pet(type, spec, name, namespace, meta, labels, status, **_):
+    key = (namespace, name)
+    readiness.seen(PETS, key)
+    if type == 'DELETED':
+        metrics.forget_pet(key)
+        reconcile.wheel().forget(key)
+        sync.catalog.forget(key)
+        index.pet_ids.release(key)
+        await release_from_store(key)
+        return
+    metrics.record_pet(key, status.get('phase'))
+    reconcile.wheel().track(key, meta.get('uid'), reconcile.PetState(spec, labels, status, meta))
+    sync.catalog.observe(key, stores.store_of(namespace, labels), spec, status)
+    await claim_pet_id(spec, name, namespace, meta)
+    admitted = stores.registry.admitted(key)
+    if admitted is not None and admitted != stores.store_of(namespace, labels):
+        await release_from_store(key)  # relabelled to another store or none
+
+async def publish_store(store_key, current=None):
+    """Write a PetStore's pet count to its status, unless `current` already shows it."""
+    store = stores.registry.get(store_key)
+    if store is None:
+        return
+    update = {'phase': 'Ready', 'petCount': len(store.pets), 'observedGeneration': store.generation}
+    if current is not None and all(current.get(k) == v for k, v in update.items()):
+        return
+    update['lastSync'] = datetime.now(timezone.utc).isoformat()
+    await status_writer.writer().write(store_key[0], store_key[1], update, plural=PETSTORES)
+
+async def release_from_store(pet_key):
+    store_key = stores.registry.release(pet_key)
+    if store_key is not None:
+        await publish_store(store_key)
+
+async def admit_to_store(spec, name, namespace, labels):
+    """Count the Pet against its PetStore; returns (reason, message) if the store does not admit it."""
+    pet_key = (namespace, name)
+    store_key = stores.store_of(namespace, labels)
+    if store_key is None:
+        await release_from_store(pet_key)
+        return None
+    previous = stores.registry.admitted(pet_key)
+    reason = stores.registry.admit(pet_key, store_key, spec.get('tag'))
+    if previous is not None and stores.registry.admitted(pet_key) != previous:
+        await publish_store(previous)
+    if reason == stores.STORE_NOT_FOUND:
+        raise kopf.TemporaryError(f"PetStore {namespace}/{store_key[1]} not found", delay=30)
+    if reason == stores.TAG_NOT_ALLOWED:
+        return reason, f"Tag {spec.get('tag')!r} is not allowed in PetStore {namespace}/{store_key[1]}"
+    if reason == stores.STORE_FULL:
+        store = stores.registry.get(store_key)
+        return reason, f"PetStore {namespace}/{store_key[1]} is full ({store.max_pets} pets)"
+    await publish_store(store_key)
+    return None
+
+@kopf.on.event('petstore.example.com', 'v1', 'petstores')
+@metrics.timed('petstore_event')
+async def track_petstore(type, body, name, namespace, status, **_):
+    key = (namespace, name)
+    readiness.seen(PETSTORES, key)
+    if type == 'DELETED':
+        stores.registry.remove_store(key)
+        status_writer.writer().discard(namespace, name, plural=PETSTORES)
+        return
+    violations = stores.registry.observe_store(body)
+    if violations:
+        logger.info(f"🏷️ Tag policy of PetStore {namespace}/{name} changed, {len(violations)} Pets no longer allowed")
+    for (pet_namespace, pet_name), tag in violations:
+        message = f"Tag {tag!r} is not allowed in PetStore {namespace}/{name}"
+        metrics.VALIDATION_FAILURES.labels(reason=stores.TAG_NOT_ALLOWED).inc()
+        probes.engine().cancel((pet_namespace, pet_name))
+        await status_writer.writer().write(pet_namespace, pet_name, {
+            'phase': 'Error',
+            'conditions': [status_writer.ready_condition(None, False, stores.TAG_NOT_ALLOWED, message)],
+        })
+    await publish_store(key, status)
+
+def has_upstream(spec, **_):
+    return bool((spec.get('endpoints') or {}).get('baseUrl'))
+
+@kopf.daemon('petstore.example.com', 'v1', 'petstores', when=has_upstream)
+async def sync_upstream(body, stopped, **_):
+    await sync.run(body, stopped, get_config().settings)
+
 @kopf.on.create('petstore.example.com', 'v1', 'pets')
-async def create_pet(spec, name, namespace, logger, **kwargs):
+@limits.limited(limits.CREATE)
+async def create_pet(spec, name, namespace, labels, status, meta, logger, **kwargs):
     logger.info(f"🆕 Creating Pet: {namespace}/{name}")
     
     is_valid, message = validate_pet_spec(spec)
+    duplicate = await claim_pet_id(spec, name, namespace, meta) if is_valid else None
+    if duplicate is not None:
+        is_valid, message = False, duplicate
     if not is_valid:
         logger.error(f"❌ Pet {namespace}/{name} validation failed: {message}")
-        return {"status": "error", "message": message}
-    
-    is_healthy, health_msg = simulate_pet_health_check(spec)
-    phase = "Active" if is_healthy else "Pending"
+        await write_status(namespace, name, status, meta, "Error", False, "ValidationFailed", message)
+        return
     
-    logger.info(f"✅ Pet {namespace}/{name} validated and processed - Phase: {phase}")
-    logger.info(f"🩺 Health check: {health_msg}")
+    rejected = await admit_to_store(spec, name, namespace, labels)
+    if rejected is not None:
+        reason, message = rejected
+        logger.error(f"❌ Pet {namespace}/{name} rejected: {message}")
+        await write_status(namespace, name, status, meta, "Error", False, reason, message)
+        return
     
-    return {"status": "created", "phase": phase, "health": health_msg}
+    logger.info(f"✅ Pet {namespace}/{name} validated - health check scheduled")
+    await schedule_health_check(spec, name, namespace, status, meta)
 
 @kopf.on.update('petstore.example.com', 'v1', 'pets')
-async def update_pet(spec, name, namespace, logger, **kwargs):
+@limits.limited(limits.UPDATE)
+async def update_pet(spec, name, namespace, labels, status, meta, logger, **kwargs):
     logger.info(f"📝 Updating Pet: {namespace}/{name}")
     
     is_valid, message = validate_pet_spec(spec)
+    duplicate = await claim_pet_id(spec, name, namespace, meta) if is_valid else None
+    if duplicate is not None:
+        is_valid, message = False, duplicate
     if not is_valid:
         logger.error(f"❌ Pet {namespace}/{name} update validation failed: {message}")
-        return {"status": "error", "message": message}
+        await write_status(namespace, name, status, meta, "Error", False, "ValidationFailed", message)
+        return
     
-    is_healthy, health_msg = simulate_pet_health_check(spec)
-    phase = "Active" if is_healthy else "Pending"
+    rejected = await admit_to_store(spec, name, namespace, labels)
+    if rejected is not None:
+        reason, message = rejected
+        logger.error(f"❌ Pet {namespace}/{name} rejected: {message}")
+        await write_status(namespace, name, status, meta, "Error", False, reason, message)
+        return
     
-    logger.info(f"✅ Pet {namespace}/{name} updated - Phase: {phase}")
-    return {"status": "updated", "phase": phase}
+    logger.info(f"✅ Pet {namespace}/{name} updated - health check scheduled")
+    await schedule_health_check(spec, name, namespace, status, meta)
 
 @kopf.on.delete('petstore.example.com', 'v1', 'pets')
+@limits.limited(limits.DELETE)
 async def delete_pet(spec, name, namespace, logger, **kwargs):
     logger.info(f"🗑️ Deleting Pet: {namespace}/{name} (ID: {spec.get('id', 'unknown')})")
+    probes.engine().cancel((namespace, name))
+    status_writer.writer().discard(namespace, name)
+    await release_from_store((namespace, name))
     logger.info(f"✅ Pet {namespace}/{name} cleanup completed")
 
-if __name__ == '__main__':
+@limits.limited(limits.RECONCILE)
+async def reconcile_pets(batch, **_):
+    """Periodic pass over Pets due on the reconcile wheel.
+
+    Healthy and unhealthy Pets get a fresh health check. Pets rejected for a
+    duplicate ID, a full store or a disallowed tag are admitted again once that
+    no longer holds; Pets with an invalid spec wait for an update.
+    """
+    for key, pet in batch:
+        namespace, name = key
+        spec = pet.spec()
+        if probes.engine().pending(key):
+            metrics.RECONCILED_PETS.labels(action='probing').inc()
+            continue
+        if pet.phase != "Error":
+            probes.engine().submit(key, spec, pet)
+            metrics.RECONCILED_PETS.labels(action='probe').inc()
+            continue
+        is_valid, _ = validate_pet_spec(spec)
+        if not is_valid or index.pet_ids.duplicate_of(key, spec.get('id')) is not None:
+            metrics.RECONCILED_PETS.labels(action='rejected').inc()
+            continue
+        try:
+            rejected = await admit_to_store(spec, name, namespace, pet.labels())
+        except kopf.TemporaryError:
+            rejected = True  # store gone; the Pet's next event or visit retries
+        if rejected:
+            metrics.RECONCILED_PETS.labels(action='rejected').inc()
+            continue
+        logger.info(f"♻️ Pet {namespace}/{name} is no longer rejected - health check scheduled")
+        await schedule_health_check(spec, name, namespace, pet.status(), pet.meta())
+        metrics.RECONCILED_PETS.labels(action='readmitted').inc()
+
+# Served on the event loop: kopf's liveness endpoint, and readiness once the
+# caches are loaded and the watches delivered the initial listing
+LIVENESS_ENDPOINT = os.environ.get('KOPF_LIVENESS_ENDPOINT', 'http://0.0.0.0:8080/healthz')
+READINESS_ENDPOINT = os.environ.get('READINESS_ENDPOINT', 'http://0.0.0.0:8081/readyz')
+
+def main():
     logger.info("🚀 Starting Pet Controller...")
-    kopf.run()
\ No newline at end of file
+    kopf.run(liveness_endpoint=LIVENESS_ENDPOINT)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Prometheus metrics for the Pet Controller, served on metrics.port.
+
+Counters and histograms are updated where things happen. Pets by phase is
+computed per scrape by PetCollector from a dict the watch handler keeps
+current, so the hot path only does a dict write.
+"""
+import collections
+import functools
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+HANDLER_DURATION = Histogram(
+    'pet_controller_handler_duration_seconds',
+    'Time handlers took to run, excluding the wait for a concurrency slot',
+    ['operation'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+HANDLERS_IN_FLIGHT = Gauge(
+    'pet_controller_handlers_in_flight',
+    'Handlers currently running',
+    ['operation'],
+)
+
+VALIDATION_FAILURES = Counter(
+    'pet_controller_validation_failures_total',
+    'Pets set to Error, by condition reason',
+    ['reason'],
+)
+
+QUEUE_DEPTH = Gauge(
+    'pet_controller_queue_depth',
+    'Handler runs waiting for a concurrency slot',
+    ['operation'],
+)
+
+QUEUE_WAIT = Histogram(
+    'pet_controller_queue_wait_seconds',
+    'Time handler runs waited for a concurrency slot',
+    ['operation'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+STATUS_PATCHES = Counter(
+    'pet_controller_status_patches_total',
+    'Status patches sent to the API server',
+    ['result'],
+)
+
+STATUS_UPDATES_COALESCED = Counter(
+    'pet_controller_status_updates_coalesced_total',
+    'Status updates merged into a pending patch',
+)
+
+STATUS_UPDATES_DISCARDED = Counter(
+    'pet_controller_status_updates_discarded_total',
+    'Pending status patches dropped because their object was deleted',
+)
+
+PET_INDEX_SIZE = Gauge(
+    'pet_controller_pet_id_index_size',
+    'Pets in the ID uniqueness index',
+)
+
+PET_ID_COLLISIONS = Counter(
+    'pet_controller_pet_id_collisions_total',
+    'Pets seen claiming an ID already claimed by another Pet',
+)
+
+PETSTORE_UTILIZATION = Gauge(
+    'pet_controller_petstore_utilization',
+    'Pets counted against a PetStore divided by its maxPets',
+    ['namespace', 'store'],
+)
+
+PROBE_DURATION = Histogram(
+    'pet_controller_probe_duration_seconds',
+    'Duration of Pet health check attempts',
+    ['result'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+PROBE_RETRIES = Counter(
+    'pet_controller_probe_retries_total',
+    'Pet health check attempts scheduled for a retry',
+)
+
+PROBE_BACKLOG = Gauge(
+    'pet_controller_probe_backlog',
+    'Pets with a health check queued, running or waiting for a retry',
+)
+
+RECONCILE_TRACKED = Gauge(
+    'pet_controller_reconcile_tracked_pets',
+    'Pets on the periodic reconciliation wheel',
+)
+
+RECONCILE_LAG = Gauge(
+    'pet_controller_reconcile_lag_seconds',
+    'How late the reconciliation wheel started its last tick',
+)
+
+RECONCILED_PETS = Counter(
+    'pet_controller_reconciled_pets_total',
+    'Pets visited by periodic reconciliation, by action taken',
+    ['action'],
+)
+
+SYNC_DURATION = Histogram(
+    'pet_controller_sync_duration_seconds',
+    'Time taken by one diff pass of a PetStore against its upstream API',
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+SYNC_DRIFT = Gauge(
+    'pet_controller_sync_drift',
+    'Differences found by the last upstream sync of a PetStore',
+    ['namespace', 'store', 'change'],
+)
+
+SYNC_FAILURES = Counter(
+    'pet_controller_sync_failures_total',
+    'Upstream syncs that failed',
+)
+
+
+def timed(operation: str):
+    """Count an async handler in flight and observe its duration."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(**kwargs):
+            with HANDLERS_IN_FLIGHT.labels(operation=operation).track_inprogress(), \
+                    HANDLER_DURATION.labels(operation=operation).time():
+                return await fn(**kwargs)
+        return wrapper
+    return decorator
+
+
+# Pet (namespace, name) -> phase, as last seen on the watch
+_pet_phases: Dict[Tuple[str, str], str] = {}
+
+UNKNOWN_PHASE = 'Unknown'
+
+
+def record_pet(key: Tuple[str, str], phase: Optional[str]) -> None:
+    _pet_phases[key] = phase or UNKNOWN_PHASE
+
+
+def forget_pet(key: Tuple[str, str]) -> None:
+    _pet_phases.pop(key, None)
+
+
+class PetCollector:
+    """Custom collector producing pet_controller_pets{phase} from _pet_phases per scrape."""
+
+    def describe(self) -> List[GaugeMetricFamily]:
+        return [GaugeMetricFamily('pet_controller_pets', 'Pets by status phase', labels=['phase'])]
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        # Snapshot; scrapes run on the metrics server thread
+        counts = collections.Counter(list(_pet_phases.values()))
+        family = GaugeMetricFamily('pet_controller_pets', 'Pets by status phase', labels=['phase'])
+        for phase, count in counts.items():
+            family.add_metric([phase], count)
+        yield family
+
+
+def register_pet_collector(registry: CollectorRegistry = REGISTRY) -> None:
+    registry.register(PetCollector())
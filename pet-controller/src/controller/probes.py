@@ -0,0 +1,222 @@
+"""
+Asynchronous Pet health checks.
+
+Handlers submit a Pet to the ProbeEngine and return; the result is delivered
+later through a callback, so no handler slot is held while a probe runs or
+waits for a retry.
+
+- A fixed pool of max_concurrent_probes workers runs probes, which is the
+  global concurrency limit.
+- Each attempt is bounded by health_check_timeout. A failed attempt is retried
+  up to health_check_retry_count times after health_check_retry_delay * 2^n
+  seconds, with jitter so Pets failing together do not retry together.
+- Waiting retries are entries in one heap served by a single scheduler task,
+  not a sleeping coroutine per Pet, so thousands of them cost a tuple each.
+- Submitting a Pet again replaces its pending probe. Queue and heap entries
+  carry the token of the submission they belong to; entries of a replaced
+  one are skipped when they come up, so a Pet is probed once per due time.
+
+A probe is any `async def probe(spec) -> (healthy, message)`; make_probe()
+picks the simulated or the HTTP one from the health_check configuration.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .config import HealthCheckConfig, RealChecksConfig, Settings, SimulationConfig
+from .metrics import PROBE_BACKLOG, PROBE_DURATION, PROBE_RETRIES
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]  # (namespace, name)
+Probe = Callable[[Dict[str, Any]], Awaitable[Tuple[bool, str]]]
+# on_result(key, healthy, message, context)
+ResultCallback = Callable[[Key, bool, str, Any], Awaitable[None]]
+
+
+class SimulatedProbe:
+    """The placeholder check: even IDs are healthy, odd IDs if divisible by 3."""
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+
+    async def __call__(self, spec: Dict[str, Any]) -> Tuple[bool, str]:
+        pet_id = spec['id']
+        if pet_id % 2 == 0:
+            healthy = self.config.even_id_healthy
+        else:
+            healthy = self.config.odd_id_divisible_by_3 and pet_id % 3 == 0
+        state = "is healthy" if healthy else "is not healthy yet"
+        return healthy, f"Pet {spec['name']} (ID: {pet_id}) {state}"
+
+
+class HttpProbe:
+    """GET the Pet's health endpoint over a pooled HTTP client."""
+
+    def __init__(self, config: RealChecksConfig, max_connections: int):
+        self.config = config
+        self.client = httpx.AsyncClient(
+            timeout=config.timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    async def __call__(self, spec: Dict[str, Any]) -> Tuple[bool, str]:
+        url = self.config.endpoint_template.format(**spec)
+        try:
+            response = await self.client.get(url)
+        except httpx.HTTPError as e:
+            return False, f"{url}: {e.__class__.__name__}"
+        if response.status_code != self.config.expected_status_code:
+            return False, f"{url}: HTTP {response.status_code}"
+        if self.config.expected_response and response.text.strip() != self.config.expected_response:
+            return False, f"{url}: unexpected response"
+        return True, f"{url}: healthy"
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def make_probe(config: HealthCheckConfig, settings: Settings) -> Probe:
+    if config.real_checks.enabled:
+        return HttpProbe(config.real_checks, settings.max_concurrent_probes)
+    return SimulatedProbe(config.simulation)
+
+
+class _Job:
+    __slots__ = ('spec', 'context', 'attempt', 'token', 'queued')
+
+    def __init__(self, spec: Dict[str, Any], context: Any, token: int):
+        self.spec = spec
+        self.context = context
+        self.attempt = 0
+        self.token = token
+        self.queued = False
+
+
+class ProbeEngine:
+    def __init__(self, probe: Probe, settings: Settings, on_result: ResultCallback):
+        self.probe = probe
+        self.on_result = on_result
+        self.concurrency = max(1, settings.max_concurrent_probes)
+        self.timeout = settings.health_check_timeout
+        self.retries = settings.health_check_retry_count
+        self.retry_delay = settings.health_check_retry_delay
+        self._jobs: Dict[Key, _Job] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()  # of (key, token)
+        self._retries: List[Tuple[float, int, Key]] = []  # heap of (due, token, key)
+        self._wakeup = asyncio.Event()
+        self._tokens = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def submit(self, key: Key, spec: Dict[str, Any], context: Any = None) -> None:
+        """Probe a Pet as soon as a worker is free, replacing its pending probe."""
+        job = self._jobs[key] = _Job(dict(spec), context, next(self._tokens))
+        self._enqueue(key, job)
+        self._report()
+
+    def pending(self, key: Key) -> bool:
+        """Whether a probe of the Pet is queued, running or waiting for a retry."""
+        return key in self._jobs
+
+    def cancel(self, key: Key) -> None:
+        if self._jobs.pop(key, None) is not None:
+            self._report()
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based): half fixed, half random."""
+        delay = self.retry_delay * 2 ** (attempt - 1)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _enqueue(self, key: Key, job: _Job) -> None:
+        if not job.queued:
+            job.queued = True
+            self._queue.put_nowait((key, job.token))
+
+    def _report(self) -> None:
+        PROBE_BACKLOG.set(len(self._jobs))
+
+    async def _scheduler(self) -> None:
+        while not self._stopping:
+            now = time.monotonic()
+            while self._retries and self._retries[0][0] <= now:
+                _, token, key = heapq.heappop(self._retries)
+                job = self._jobs.get(key)
+                if job is not None and job.token == token:
+                    self._enqueue(key, job)
+            self._wakeup.clear()
+            timeout = self._retries[0][0] - now if self._retries else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            key, token = await self._queue.get()
+            job = self._jobs.get(key)
+            if job is None or job.token != token:
+                continue  # cancelled, or queued before a resubmission
+            job.queued = False
+            healthy, message = await self._attempt(job.spec)
+            if self._jobs.get(key) is not job:
+                continue  # cancelled or resubmitted meanwhile
+            if healthy or job.attempt >= self.retries:
+                del self._jobs[key]
+                self._report()
+                try:
+                    await self.on_result(key, healthy, message, job.context)
+                except Exception as e:
+                    logger.error(f"❌ Handling the health check result of Pet {key[0]}/{key[1]} failed: {e}")
+                continue
+            job.attempt += 1
+            PROBE_RETRIES.inc()
+            heapq.heappush(self._retries, (time.monotonic() + self.backoff(job.attempt), job.token, key))
+            self._wakeup.set()
+
+    async def _attempt(self, spec: Dict[str, Any]) -> Tuple[bool, str]:
+        started = time.monotonic()
+        try:
+            healthy, message = await asyncio.wait_for(self.probe(spec), self.timeout)
+            result = 'healthy' if healthy else 'unhealthy'
+        except asyncio.TimeoutError:
+            healthy, message, result = False, f"Health check timed out after {self.timeout}s", 'timeout'
+        except Exception as e:
+            healthy, message, result = False, f"Health check failed: {e}", 'error'
+        PROBE_DURATION.labels(result=result).observe(time.monotonic() - started)
+        return healthy, message
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._scheduler())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        # On Python 3.11 wait_for() can swallow a cancellation that races with
+        # its result, so the loops also check the flag
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        close = getattr(self.probe, 'close', None)
+        if close is not None:
+            await close()
+
+
+_engine: Optional[ProbeEngine] = None
+
+
+def configure(config: HealthCheckConfig, settings: Settings, on_result: ResultCallback) -> ProbeEngine:
+    global _engine
+    _engine = ProbeEngine(make_probe(config, settings), settings, on_result)
+    _engine.start()
+    return _engine
+
+
+def engine() -> ProbeEngine:
+    return _engine
@@ -0,0 +1,100 @@
+"""
+Readiness of the Pet controller, served on READINESS_ENDPOINT (/readyz).
+
+kopf's liveness endpoint only shows that the event loop answers. The pod is
+ready once the caches are loaded and the watches have delivered the initial
+listing: every Pet and PetStore listed by load_caches has been seen by its
+watch handler, which also shows that the watch is connected. Objects deleted
+between that list and the watch never arrive, so after INITIAL_SYNC_GRACE
+seconds a watch that has delivered at least one event counts as synced.
+
+The server runs on the event loop, so a blocked loop also fails readiness.
+Once ready, the pod stays ready: later watch reconnects are kopf's business.
+"""
+import logging
+import time
+import urllib.parse
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from aiohttp import web
+
+from .config import PETS, PETSTORES
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]  # (namespace, name)
+
+# Seconds after loading the caches before listed objects that never arrived are ignored
+INITIAL_SYNC_GRACE = 60
+
+_expected: Dict[str, Set[Key]] = {PETS: set(), PETSTORES: set()}
+_seen: Dict[str, bool] = {PETS: False, PETSTORES: False}
+_loaded_at: Optional[float] = None
+_ready = False
+_runner: Optional[web.AppRunner] = None
+
+
+def reset() -> None:
+    global _loaded_at, _ready
+    for plural in _expected:
+        _expected[plural] = set()
+        _seen[plural] = False
+    _loaded_at = None
+    _ready = False
+
+
+def expect(plural: str, keys: Iterable[Key]) -> None:
+    """Record the objects the initial listing of a watch has to deliver."""
+    _expected[plural].update(keys)
+
+
+def loaded() -> None:
+    """The caches are filled from the API list."""
+    global _loaded_at
+    _loaded_at = time.monotonic()
+
+
+def seen(plural: str, key: Key) -> None:
+    """A watch delivered an event for `key`."""
+    _seen[plural] = True
+    _expected[plural].discard(key)
+
+
+def check() -> Tuple[bool, str]:
+    """Return (ready, message)."""
+    global _ready
+    if _ready:
+        return True, "ready"
+    if _loaded_at is None:
+        return False, "loading caches"
+    waiting = {plural: len(keys) for plural, keys in _expected.items() if keys}
+    if waiting and time.monotonic() - _loaded_at >= INITIAL_SYNC_GRACE:
+        # Only objects that were deleted in the meantime can still be missing
+        waiting = {plural: n for plural, n in waiting.items() if not _seen[plural]}
+    if waiting:
+        return False, "waiting for initial sync: " + ", ".join(f"{n} {plural}" for plural, n in waiting.items())
+    _ready = True
+    logger.info("✅ Initial sync complete, ready")
+    return True, "ready"
+
+
+async def _readyz(request: web.Request) -> web.Response:
+    ready, message = check()
+    return web.Response(status=200 if ready else 503, text=f"{message}\n")
+
+
+async def serve(endpoint: str) -> None:
+    """Serve check() at `endpoint` (http://host:port/path) on the running loop."""
+    global _runner
+    parts = urllib.parse.urlsplit(endpoint)
+    app = web.Application()
+    app.add_routes([web.get(parts.path or '/readyz', _readyz)])
+    _runner = web.AppRunner(app, handle_signals=False, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, parts.hostname or '0.0.0.0', parts.port or 8081).start()
+    logger.info(f"🚦 Readiness served at {endpoint}")
+
+
+async def stop() -> None:
+    if _runner is not None:
+        await _runner.cleanup()
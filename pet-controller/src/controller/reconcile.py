@@ -0,0 +1,183 @@
+"""
+Periodic reconciliation of Pets on a timing wheel.
+
+Every Pet is revisited once per settings.reconcile_interval. Instead of a timer
+per Pet, the interval is divided into one-second ticks, and each Pet sits in the
+bucket of the tick derived from its UID, so Pets are spread evenly over the
+interval. A single task advances the wheel and hands the Pets of the current
+tick to the reconcile handler in chunks of settings.batch_size.
+
+A Pet costs one bucket entry and a PetState: the fields of its spec, labels and
+status that reconciliation reads, with the Ready condition's reason and message
+kept as a digest, so the size of an entry does not depend on the size of the
+Pet object.
+
+Every Pet has the same period, which is one revolution of the wheel, so one
+level of buckets covers every deadline; there is nothing to cascade from a
+coarser wheel.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .config import Settings
+from .metrics import RECONCILE_LAG, RECONCILE_TRACKED
+from .stores import STORE_LABEL
+
+logger = logging.getLogger(__name__)
+
+# Seconds per wheel bucket
+TICK = 1.0
+
+Key = Tuple[str, str]  # (namespace, name)
+# handler(batch=[(key, state), ...])
+BatchHandler = Callable[..., Awaitable[None]]
+
+
+def condition_digest(reason: Optional[str], message: Optional[str]) -> bytes:
+    return hashlib.blake2b(f'{reason}\0{message}'.encode(), digest_size=8).digest()
+
+
+class PetState:
+    """What periodic reconciliation keeps of a Pet between watch events."""
+    __slots__ = ('pet_id', 'name', 'tag', 'store', 'generation', 'phase', 'ready', 'ready_since', 'ready_digest')
+
+    def __init__(self, spec: Dict[str, Any], labels: Optional[Dict[str, str]],
+                 status: Optional[Dict[str, Any]], meta: Dict[str, Any]):
+        status = status or {}
+        self.pet_id = spec.get('id')
+        self.name = spec.get('name')
+        self.tag = spec.get('tag')
+        self.store = (labels or {}).get(STORE_LABEL)
+        self.generation = meta.get('generation')
+        self.phase = status.get('phase')
+        self.ready = self.ready_since = None
+        self.ready_digest = condition_digest(None, None)
+        for condition in status.get('conditions') or []:
+            if condition.get('type') == 'Ready':
+                self.ready = condition.get('status')
+                self.ready_since = condition.get('lastTransitionTime')
+                self.ready_digest = condition_digest(condition.get('reason'), condition.get('message'))
+
+    def spec(self) -> Dict[str, Any]:
+        spec = {'id': self.pet_id, 'name': self.name}
+        if self.tag is not None:
+            spec['tag'] = self.tag
+        return {k: v for k, v in spec.items() if v is not None}
+
+    def labels(self) -> Dict[str, str]:
+        return {STORE_LABEL: self.store} if self.store else {}
+
+    def status(self) -> Dict[str, Any]:
+        """The phase and the Ready condition's status and transition time."""
+        status: Dict[str, Any] = {'phase': self.phase} if self.phase else {}
+        if self.ready is not None:
+            condition = {'type': 'Ready', 'status': self.ready}
+            if self.ready_since:
+                condition['lastTransitionTime'] = self.ready_since
+            status['conditions'] = [condition]
+        return status
+
+    def meta(self) -> Dict[str, Any]:
+        return {'generation': self.generation}
+
+
+class _Entry:
+    __slots__ = ('slot', 'state')
+
+    def __init__(self, slot: int, state: Any):
+        self.slot = slot
+        self.state = state
+
+
+class TimingWheel:
+    def __init__(self, settings: Settings, handler: BatchHandler):
+        self.handler = handler
+        self.batch_size = max(1, settings.batch_size)
+        self.size = max(1, round(settings.reconcile_interval / TICK))
+        self._buckets: List[Set[Key]] = [set() for _ in range(self.size)]
+        self._entries: Dict[Key, _Entry] = {}
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def slot_of(self, uid: str) -> int:
+        return zlib.crc32(uid.encode()) % self.size
+
+    def track(self, key: Key, uid: str, state: Any) -> None:
+        """Add a Pet to the wheel or replace its state."""
+        slot = self.slot_of(uid or f'{key[0]}/{key[1]}')
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = _Entry(slot, state)
+            RECONCILE_TRACKED.set(len(self._entries))
+        else:
+            entry.state = state
+            if entry.slot == slot:
+                return
+            self._buckets[entry.slot].discard(key)  # recreated under a new UID
+            entry.slot = slot
+        self._buckets[slot].add(key)
+
+    def forget(self, key: Key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._buckets[entry.slot].discard(key)
+            RECONCILE_TRACKED.set(len(self._entries))
+
+    def clear(self) -> None:
+        for bucket in self._buckets:
+            bucket.clear()
+        self._entries.clear()
+        RECONCILE_TRACKED.set(0)
+
+    def due(self) -> List[List[Tuple[Key, Any]]]:
+        """Take the Pets of the current tick, in batches, and advance the wheel."""
+        keys = list(self._buckets[self._cursor])
+        self._cursor = (self._cursor + 1) % self.size
+        return [
+            [(key, self._entries[key].state) for key in keys[i:i + self.batch_size]]
+            for i in range(0, len(keys), self.batch_size)
+        ]
+
+    async def _run(self) -> None:
+        next_tick = time.monotonic()
+        while True:
+            next_tick += TICK
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+            # Behind schedule when a tick takes longer than TICK; the next
+            # ticks then run back to back until the wheel catches up
+            RECONCILE_LAG.set(max(0.0, time.monotonic() - next_tick))
+            results = await asyncio.gather(
+                *(self.handler(batch=batch) for batch in self.due()),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"❌ Periodic reconciliation of a batch failed: {result}")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+_wheel: Optional[TimingWheel] = None
+
+
+def configure(settings: Settings, handler: BatchHandler) -> TimingWheel:
+    global _wheel
+    _wheel = TimingWheel(settings, handler)
+    return _wheel
+
+
+def wheel() -> TimingWheel:
+    return _wheel
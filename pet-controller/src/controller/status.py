@@ -0,0 +1,145 @@
+"""
+Coalescing status writer.
+
+Handlers hand their status changes to the writer instead of returning them to
+kopf. Changes for the same object (Pet or PetStore) are merged into one pending patch that is sent
+as a single merge patch to the status subresource after settings.status_debounce
+seconds, so a newer value for a field replaces (drops) an older one that was not
+sent yet. With a debounce of 0 every handler flushes its own patch right away.
+At most one patch per object is in flight; a flush waits for it, so patches
+reach the API server in the order they were queued.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from kubernetes.client.rest import ApiException
+
+from . import api, limits
+from .config import GROUP, PETS, VERSION
+from .metrics import STATUS_PATCHES, STATUS_UPDATES_COALESCED, STATUS_UPDATES_DISCARDED
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a failed patch is sent again
+RETRY_DELAY = 5
+
+Key = Tuple[str, str, str]  # (plural, namespace, name)
+
+
+def ready_condition(status, ready: bool, reason: str, message: str) -> Dict[str, Any]:
+    """A Ready condition, keeping lastTransitionTime if the status did not change."""
+    value = 'True' if ready else 'False'
+    transition = datetime.now(timezone.utc).isoformat()
+    for condition in (status or {}).get('conditions') or []:
+        if condition.get('type') == 'Ready' and condition.get('status') == value:
+            transition = condition.get('lastTransitionTime', transition)
+    return {
+        'type': 'Ready',
+        'status': value,
+        'lastTransitionTime': transition,
+        'reason': reason,
+        'message': message,
+    }
+
+
+class StatusWriter:
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        self._timers: Dict[Key, asyncio.Task] = {}
+        self._in_flight: Dict[Key, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        """Objects with a patch waiting to be sent."""
+        return len(self._pending)
+
+    async def write(self, namespace: str, name: str, status: Dict[str, Any], plural: str = PETS) -> None:
+        """Queue status fields for an object; newer values replace pending ones."""
+        key = (plural, namespace, name)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = dict(status)
+        else:
+            pending.update(status)
+            STATUS_UPDATES_COALESCED.inc()
+
+        if self.debounce <= 0:
+            await self.flush(namespace, name, plural)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key, self.debounce))
+
+    async def _flush_later(self, key: Key, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timers.pop(key, None)
+        await self._send(key)
+
+    async def flush(self, namespace: str, name: str, plural: str = PETS) -> None:
+        """Send the pending patch for an object now."""
+        key = (plural, namespace, name)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        await self._send(key)
+
+    async def flush_all(self) -> None:
+        for plural, namespace, name in list(self._pending):
+            await self.flush(namespace, name, plural)
+
+    def discard(self, namespace: str, name: str, plural: str = PETS) -> None:
+        """Drop the pending patch of a deleted object."""
+        key = (plural, namespace, name)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if self._pending.pop(key, None) is not None:
+            STATUS_UPDATES_DISCARDED.inc()
+
+    async def _send(self, key: Key) -> None:
+        # Let a patch already on its way land first, or it could overwrite this one
+        while key in self._in_flight:
+            await asyncio.shield(self._in_flight[key])
+        patch = self._pending.pop(key, None)
+        if not patch:
+            return
+        done = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            await self._patch(key, patch)
+        finally:
+            del self._in_flight[key]
+            done.set_result(None)
+
+    async def _patch(self, key: Key, patch: Dict[str, Any]) -> None:
+        plural, namespace, name = key
+        await limits.api_call()
+        try:
+            await asyncio.to_thread(
+                api.custom_objects().patch_namespaced_custom_object_status,
+                GROUP, VERSION, namespace, plural, name, {'status': patch},
+            )
+        except ApiException as e:
+            if e.status == 404:
+                STATUS_PATCHES.labels(result='gone').inc()
+                return
+            STATUS_PATCHES.labels(result='error').inc()
+            logger.warning(f"⚠️ Status patch for {plural} {namespace}/{name} failed, retrying: {e.reason}")
+            # Fields written meanwhile are newer than the failed ones
+            self._pending[key] = {**patch, **self._pending.get(key, {})}
+            if key not in self._timers:
+                self._timers[key] = asyncio.create_task(self._flush_later(key, RETRY_DELAY))
+            return
+        STATUS_PATCHES.labels(result='ok').inc()
+
+
+_writer: Optional[StatusWriter] = None
+
+
+def configure(debounce: float) -> StatusWriter:
+    global _writer
+    _writer = StatusWriter(debounce)
+    return _writer
+
+
+def writer() -> StatusWriter:
+    return _writer
@@ -0,0 +1,152 @@
+"""
+PetStore capacity accounting and tag policy.
+
+A Pet belongs to the PetStore named by its STORE_LABEL label, in the same
+namespace. Each store keeps the Pets admitted against its
+spec.config.maxPets, updated as Pets are created, relabelled and deleted, so a
+capacity check is a dictionary lookup and a length comparison instead of a list
+call. The stores are rebuilt from the PetStore and Pet lists at startup.
+
+spec.config.allowedTags is compiled into a TagPolicy when a store's generation
+changes, not on every check.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import PETSTORE_UTILIZATION
+
+STORE_LABEL = 'petstore.example.com/store'
+
+# Ready condition reasons of Pets a store did not admit
+STORE_FULL = 'StoreFull'
+STORE_NOT_FOUND = 'StoreNotFound'
+TAG_NOT_ALLOWED = 'TagNotAllowed'
+
+# Default of spec.config.maxPets in the PetStore CRD
+DEFAULT_MAX_PETS = 100
+
+Key = Tuple[str, str]  # (namespace, name)
+
+
+class TagPolicy:
+    """allowedTags as a hashed set; with `prefix`, an entry also allows tags starting with it."""
+    __slots__ = ('tags', 'lengths', 'casefold', 'prefix')
+
+    def __init__(self, allowed: List[str], casefold: bool = False, prefix: bool = False):
+        self.casefold = casefold
+        self.prefix = prefix
+        self.tags = frozenset(tag.casefold() if casefold else tag for tag in allowed)
+        # Only prefixes as long as an entry can match
+        self.lengths = sorted({len(tag) for tag in self.tags}) if prefix else []
+
+    def allows(self, tag: Optional[str]) -> bool:
+        if not self.tags or not tag:
+            return True
+        if self.casefold:
+            tag = tag.casefold()
+        if tag in self.tags:
+            return True
+        return any(tag[:length] in self.tags for length in self.lengths if length < len(tag))
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'TagPolicy':
+        matching = config.get('tagMatching') or {}
+        return cls(config.get('allowedTags') or [],
+                   casefold=matching.get('caseInsensitive', False),
+                   prefix=matching.get('prefix', False))
+
+
+class Store:
+    __slots__ = ('max_pets', 'generation', 'tags', 'pets')
+
+    def __init__(self):
+        self.max_pets = DEFAULT_MAX_PETS
+        self.generation: Optional[int] = None
+        self.tags = TagPolicy([])
+        self.pets: Dict[Key, Optional[str]] = {}  # admitted Pet -> its tag
+
+
+def store_of(namespace: str, labels: Dict[str, str]) -> Optional[Key]:
+    """The PetStore a Pet belongs to, if it names one."""
+    store = (labels or {}).get(STORE_LABEL)
+    return (namespace, store) if store else None
+
+
+class StoreRegistry:
+    def __init__(self):
+        self._stores: Dict[Key, Store] = {}
+        self._pet_store: Dict[Key, Key] = {}  # admitted Pet -> its store
+
+    def get(self, key: Key) -> Optional[Store]:
+        return self._stores.get(key)
+
+    def admitted(self, pet: Key) -> Optional[Key]:
+        """The store a Pet is counted against."""
+        return self._pet_store.get(pet)
+
+    def observe_store(self, body: Dict[str, Any]) -> List[Tuple[Key, Optional[str]]]:
+        """Track a PetStore; returns the (Pet, tag) it released after a tag policy change."""
+        meta = body['metadata']
+        key = (meta['namespace'], meta['name'])
+        store = self._stores.get(key)
+        if store is None:
+            store = self._stores[key] = Store()
+        generation = meta.get('generation')
+        if generation is not None and generation == store.generation:
+            return []
+        config = (body.get('spec') or {}).get('config') or {}
+        store.generation = generation
+        store.max_pets = config.get('maxPets', DEFAULT_MAX_PETS)
+        store.tags = TagPolicy.from_config(config)
+        violations = [(pet, tag) for pet, tag in store.pets.items() if not store.tags.allows(tag)]
+        for pet, _ in violations:
+            self.release(pet)
+        self._report(key, store)
+        return violations
+
+    def remove_store(self, key: Key) -> None:
+        store = self._stores.pop(key, None)
+        if store is None:
+            return
+        for pet in store.pets:
+            del self._pet_store[pet]
+        PETSTORE_UTILIZATION.remove(*key)
+
+    def admit(self, pet: Key, store_key: Key, tag: Optional[str]) -> Optional[str]:
+        """Count a Pet against its store; returns the reason if the store does not admit it."""
+        store = self._stores.get(store_key)
+        if store is None:
+            return STORE_NOT_FOUND
+        if not store.tags.allows(tag):
+            self.release(pet)
+            return TAG_NOT_ALLOWED
+        if pet in store.pets:
+            store.pets[pet] = tag
+            return None
+        if len(store.pets) >= store.max_pets:
+            return STORE_FULL
+        self.release(pet)
+        store.pets[pet] = tag
+        self._pet_store[pet] = store_key
+        self._report(store_key, store)
+        return None
+
+    def release(self, pet: Key) -> Optional[Key]:
+        """Stop counting a Pet; returns the store it was counted against."""
+        store_key = self._pet_store.pop(pet, None)
+        if store_key is not None:
+            store = self._stores[store_key]
+            store.pets.pop(pet, None)
+            self._report(store_key, store)
+        return store_key
+
+    def restore(self, pet: Key, store_key: Key, tag: Optional[str], conditions: List[Dict[str, Any]]) -> None:
+        """Count an existing, valid Pet at startup, as admit() would, unless its store did not admit it."""
+        if any(c.get('reason') in (STORE_FULL, TAG_NOT_ALLOWED) for c in conditions):
+            return
+        self.admit(pet, store_key, tag)
+
+    def _report(self, key: Key, store: Store) -> None:
+        PETSTORE_UTILIZATION.labels(*key).set(len(store.pets) / max(store.max_pets, 1))
+
+
+registry = StoreRegistry()
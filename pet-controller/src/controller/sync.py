@@ -0,0 +1,175 @@
+"""
+Diff-based sync of Pets with a PetStore's upstream API.
+
+Every settings.sync_interval seconds the upstream catalog is read with
+listPets, a page at a time, and compared with the store's Pets in the local
+catalog, which the watch keeps current: one digest per Pet, keyed by spec.id.
+
+- An upstream pet without a Pet is created and one whose digest differs from
+  its Pet's is updated, both by server-side apply like the importer. A create
+  is not forced, so a Pet already named <store>-<id> that does not mirror the
+  pet (another spec.id or store) is left alone and reported as a conflict.
+- A Pet whose id is no longer listed upstream gets status.upstream Missing,
+  and InSync again once it reappears. When the listing was cut short (the
+  store has enablePagination false and upstream has more pages), absence
+  proves nothing and no Pet is marked Missing.
+- Pets that match are not written at all, so a cycle costs the listPets pages
+  plus one write per difference, instead of a showPetById call per Pet.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from . import status as status_writer
+from .config import Settings
+from .importer import Importer
+from .metrics import SYNC_DRIFT, SYNC_DURATION, SYNC_FAILURES
+from .upstream import PetstoreClient, client_options
+
+logger = logging.getLogger(__name__)
+
+IN_SYNC = 'InSync'
+MISSING = 'Missing'
+
+# Kinds of difference reported in pet_controller_sync_drift
+CREATED = 'created'
+UPDATED = 'updated'
+MISSING_UPSTREAM = 'missing'
+CONFLICT = 'conflict'
+
+Key = Tuple[str, str]  # (namespace, name)
+
+
+def digest(record: Dict[str, Any]) -> bytes:
+    """Hash of the fields an upstream pet and its Pet spec share."""
+    fields = [record.get('id'), record.get('name'), record.get('tag') or '']
+    return hashlib.blake2b(json.dumps(fields).encode(), digest_size=8).digest()
+
+
+class _Entry:
+    __slots__ = ('name', 'digest', 'missing')
+
+    def __init__(self, name: str, digest: bytes, missing: bool):
+        self.name = name
+        self.digest = digest
+        self.missing = missing
+
+
+class LocalCatalog:
+    """The Pets of each store by spec.id, as seen on the watch."""
+
+    def __init__(self):
+        self._stores: Dict[Key, Dict[Any, _Entry]] = {}
+        self._pets: Dict[Key, Tuple[Key, Any]] = {}  # Pet -> (store, spec.id)
+
+    def observe(self, key: Key, store_key: Optional[Key], spec: Dict[str, Any],
+                status: Optional[Dict[str, Any]]) -> None:
+        self.forget(key)
+        pet_id = spec.get('id')
+        if store_key is None or not isinstance(pet_id, int):
+            return
+        missing = (status or {}).get('upstream') == MISSING
+        self._stores.setdefault(store_key, {})[pet_id] = _Entry(key[1], digest(spec), missing)
+        self._pets[key] = (store_key, pet_id)
+
+    def forget(self, key: Key) -> None:
+        found = self._pets.pop(key, None)
+        if found is None:
+            return
+        store_key, pet_id = found
+        pets = self._stores[store_key]
+        if pets.get(pet_id) is not None and pets[pet_id].name == key[1]:
+            del pets[pet_id]
+        if not pets:
+            del self._stores[store_key]
+
+    def clear(self) -> None:
+        self._stores.clear()
+        self._pets.clear()
+
+    def pets_of(self, store_key: Key) -> Dict[Any, _Entry]:
+        return dict(self._stores.get(store_key, {}))
+
+
+catalog = LocalCatalog()
+
+
+async def sync_store(client: PetstoreClient, namespace: str, store: str, concurrency: int) -> Dict[str, int]:
+    """One diff pass of a store against its upstream catalog; returns the drift found."""
+    local = catalog.pets_of((namespace, store))
+    writer = Importer(namespace, store, concurrency)
+    drift = {CREATED: 0, UPDATED: 0, MISSING_UPSTREAM: 0, CONFLICT: 0}
+    seen = set()
+    async for pets, _ in client.pages():
+        changes = []
+        for pet in pets:
+            pet_id = pet.get('id')
+            if not isinstance(pet_id, int) or pet_id in seen:
+                continue
+            seen.add(pet_id)
+            entry = local.get(pet_id)
+            if entry is None:
+                changes.append(writer.apply(pet))
+                drift[CREATED] += 1
+                continue
+            if entry.digest != digest(pet):
+                changes.append(writer.apply(pet, entry.name))
+                drift[UPDATED] += 1
+            if entry.missing:
+                changes.append(status_writer.writer().write(namespace, entry.name, {'upstream': IN_SYNC}))
+        await asyncio.gather(*changes)
+    # Only creates are not forced, so every conflict is one of them
+    drift[CONFLICT] = writer.conflicts
+    drift[CREATED] -= writer.conflicts
+    if client.truncated:
+        logger.info(f"⏭️ PetStore {namespace}/{store}: upstream catalog has more pages than read "
+                    f"(enablePagination is false), not checking for missing pets")
+        return drift
+    for pet_id, entry in local.items():
+        if pet_id not in seen and not entry.missing:
+            drift[MISSING_UPSTREAM] += 1
+            await status_writer.writer().write(namespace, entry.name, {'upstream': MISSING})
+    return drift
+
+
+async def run(body: Dict[str, Any], stopped, settings: Settings) -> None:
+    """Sync a PetStore with its upstream API until `stopped` (a kopf daemon's flag)."""
+    meta = body['metadata']
+    namespace, store = meta['namespace'], meta['name']
+    client: Optional[PetstoreClient] = None
+    options: Optional[Dict[str, Any]] = None  # that the client was built from
+    try:
+        while not stopped:
+            # The daemon's body follows the PetStore, so edits to spec.endpoints
+            # or spec.config rebuild the client
+            wanted = client_options(body)
+            if client is None or wanted != options:
+                if client is not None:
+                    await client.close()
+                options = wanted
+                client = PetstoreClient(**options, max_connections=1)
+            started = time.monotonic()
+            try:
+                drift = await sync_store(client, namespace, store, settings.max_concurrent_creates)
+            except Exception as e:
+                SYNC_FAILURES.inc()
+                logger.error(f"❌ Sync of PetStore {namespace}/{store} with {client.root} failed: {e}")
+            else:
+                SYNC_DURATION.observe(time.monotonic() - started)
+                for change, count in drift.items():
+                    SYNC_DRIFT.labels(namespace, store, change).set(count)
+                if any(drift.values()):
+                    logger.info(f"🔄 Synced PetStore {namespace}/{store} with {client.root}: "
+                                + ", ".join(f"{count} {change}" for change, count in drift.items()))
+            await stopped.wait(settings.sync_interval)
+    finally:
+        if client is not None:
+            await client.close()
+        for change in (CREATED, UPDATED, MISSING_UPSTREAM, CONFLICT):
+            try:
+                SYNC_DRIFT.remove(namespace, store, change)
+            except KeyError:
+                pass
@@ -0,0 +1,100 @@
+"""
+Client for the upstream Petstore API (inputs/openapi.yaml).
+
+listPets is read a page at a time over one pooled HTTP client: the first page
+is GET {api}/pets?limit=N and every response names the next page in its x-next
+header, so a page URL is also a cursor to resume from.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# listPets returns at most this many pets per page
+MAX_PAGE_SIZE = 100
+
+# Attempts per page before giving up
+FETCH_ATTEMPTS = 3
+
+Page = Tuple[List[Dict[str, Any]], Optional[str]]  # (pets, next page URL)
+
+
+def api_root(endpoints: Dict[str, Any]) -> str:
+    """The API root of a PetStore's spec.endpoints, e.g. http://petstore.swagger.io/v1."""
+    root = endpoints['baseUrl'].rstrip('/')
+    version = endpoints.get('version', 'v1')
+    if version and not root.endswith(f'/{version}'):
+        root = f'{root}/{version}'
+    return root
+
+
+def client_options(body: Dict[str, Any]) -> Dict[str, Any]:
+    """The PetstoreClient arguments a PetStore's spec sets: root, page_size and paginate."""
+    spec = body.get('spec') or {}
+    config = spec.get('config') or {}
+    endpoints = spec.get('endpoints') or {}
+    if not endpoints.get('baseUrl'):
+        meta = body['metadata']
+        raise ValueError(f"PetStore {meta['namespace']}/{meta['name']} has no spec.endpoints.baseUrl")
+    return {
+        'root': api_root(endpoints),
+        'page_size': config.get('defaultLimit', 20),
+        'paginate': config.get('enablePagination', True),
+    }
+
+
+class PetstoreClient:
+    def __init__(self, root: str, page_size: int = 20, paginate: bool = True,
+                 timeout: float = 10, max_connections: int = 10):
+        self.root = root.rstrip('/')
+        self.page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        self.paginate = paginate
+        # Set by pages() when a next page was not followed (paginate=False)
+        self.truncated = False
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    @classmethod
+    def for_store(cls, body: Dict[str, Any], **kwargs) -> 'PetstoreClient':
+        """A client for the API named in a PetStore's spec.endpoints."""
+        return cls(**{**client_options(body), **kwargs})
+
+    def first_page(self) -> str:
+        return f'{self.root}/pets?limit={self.page_size}'
+
+    async def fetch(self, url: str) -> Page:
+        """One listPets page and the URL of the next one, if any."""
+        for attempt in range(1, FETCH_ATTEMPTS + 1):
+            try:
+                response = await self.client.get(url)
+                response.raise_for_status()
+                break
+            except httpx.HTTPError as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500
+                if not retryable or attempt == FETCH_ATTEMPTS:
+                    raise
+                logger.warning(f"⚠️ Fetching {url} failed ({e.__class__.__name__}), retrying")
+                await asyncio.sleep(2 ** attempt)
+        pets = response.json()
+        link = response.headers.get('x-next')
+        if link and not self.paginate:
+            self.truncated = True
+            link = None
+        return pets, urljoin(url, link) if link else None
+
+    async def pages(self, start: Optional[str] = None) -> AsyncIterator[Page]:
+        """Yield every page of listPets, from `start` (a next page URL) or the first."""
+        url = start or self.first_page()
+        self.truncated = False
+        while url:
+            pets, url = await self.fetch(url)
+            yield pets, url
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,140 @@
+"""Tests for the bulk importer (controller.importer)."""
+import json
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from controller import api, importer
+from controller.config import PETS, PETSTORES, ControllerConfig, Settings
+from controller.importer import CHECKPOINT_ANNOTATION, pet_manifest, read_checkpoint
+from controller.stores import STORE_LABEL
+
+
+class FakeApi:
+    """Serves one PetStore; applies Pets unless their id is in `reject` or `fail`.
+
+    `owned` maps the names of Pets another field manager created to their
+    spec.id; applying another id to one conflicts unless forced.
+    """
+
+    def __init__(self, annotations=None):
+        self.store = {'metadata': {'namespace': 'default', 'name': 'main', 'annotations': annotations or {}},
+                      'spec': {'endpoints': {'baseUrl': 'http://upstream'}}}
+        self.applied = []
+        self.checkpoints = []
+        self.reject = set()
+        self.fail = set()
+        self.owned = {}
+
+    def get_namespaced_custom_object(self, group, version, namespace, plural, name):
+        return self.store
+
+    def patch_namespaced_custom_object(self, group, version, namespace, plural, name, body, **kwargs):
+        if plural == PETSTORES:
+            self.checkpoints.append(body['metadata']['annotations'][CHECKPOINT_ANNOTATION])
+            return
+        assert plural == PETS and kwargs['field_manager'] == importer.FIELD_MANAGER
+        if body['spec']['id'] in self.reject:
+            raise ApiException(status=422, reason="Unprocessable Entity")
+        if body['spec']['id'] in self.fail:
+            raise ApiException(status=503, reason="Service Unavailable")
+        if self.owned.get(name, body['spec']['id']) != body['spec']['id'] and not kwargs['force']:
+            raise ApiException(status=409, reason="Conflict")
+        self.applied.append(name)
+
+
+class FakeClient:
+    def __init__(self, pages):
+        self.pages_by_url = pages
+        self.started_at = None
+
+    async def pages(self, start=None):
+        self.started_at = start
+        url = start or 'page-1'
+        while url:
+            pets, url = self.pages_by_url[url]
+            yield pets, url
+
+    async def close(self):
+        pass
+
+
+PAGES = {
+    'page-1': ([{'id': 1, 'name': 'buddy'}, {'id': 2, 'name': 'rex', 'tag': 'dog'}], 'page-2'),
+    'page-2': ([{'id': 3, 'name': 'tom'}, {'id': 4, 'name': 'felix'}], None),
+}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    client = FakeClient(PAGES)
+    monkeypatch.setattr(importer.PetstoreClient, 'for_store', classmethod(lambda cls, body, **_: client))
+    monkeypatch.setattr(importer, 'get_config', lambda: ControllerConfig(
+        settings=Settings(rate_limit_qps=10000, rate_limit_burst=10000)))
+    return client
+
+
+def use_api(monkeypatch, fake):
+    monkeypatch.setattr(api, '_custom_objects', fake)
+    return fake
+
+
+def test_pet_manifest():
+    body = pet_manifest({'id': 7, 'name': 'rex', 'tag': 'dog', 'status': 'sold'}, 'default', 'main')
+    assert body['metadata']['name'] == 'main-7'
+    assert body['metadata']['labels'] == {STORE_LABEL: 'main'}
+    assert body['spec'] == {'id': 7, 'name': 'rex', 'tag': 'dog'}
+    assert pet_manifest({'id': 7, 'name': 'rex'}, 'default', 'main', 'mine')['metadata']['name'] == 'mine'
+
+
+def test_read_checkpoint():
+    assert read_checkpoint({'metadata': {}}) == {}
+    body = {'metadata': {'annotations': {CHECKPOINT_ANNOTATION: '{"next": "page-2", "imported": 2}'}}}
+    assert read_checkpoint(body) == {'next': 'page-2', 'imported': 2}
+
+
+async def test_import_applies_every_page_and_clears_the_checkpoint(monkeypatch, upstream):
+    fake = use_api(monkeypatch, FakeApi())
+    assert await importer.run_import('default', 'main') == (4, 0)
+    assert sorted(fake.applied) == ['main-1', 'main-2', 'main-3', 'main-4']
+    assert [json.loads(c) if c else None for c in fake.checkpoints] == [
+        {'next': 'page-2', 'imported': 2, 'rejected': 0}, None]
+
+
+async def test_rejected_pets_are_not_counted_as_imported(monkeypatch, upstream):
+    # Regression: the checkpoint counted every listed pet as imported,
+    # including the ones the API server rejected
+    fake = use_api(monkeypatch, FakeApi())
+    fake.reject = {2}
+    assert await importer.run_import('default', 'main') == (3, 1)
+    assert json.loads(fake.checkpoints[0]) == {'next': 'page-2', 'imported': 1, 'rejected': 1}
+
+
+async def test_pet_of_another_owner_is_not_taken_over(monkeypatch, upstream):
+    fake = use_api(monkeypatch, FakeApi())
+    fake.owned = {'main-3': 42}
+    assert await importer.run_import('default', 'main') == (3, 1)
+    assert 'main-3' not in fake.applied
+
+
+async def test_failed_page_is_not_counted_or_checkpointed(monkeypatch, upstream):
+    fake = use_api(monkeypatch, FakeApi())
+    fake.fail = {3}
+    with pytest.raises(ApiException):
+        await importer.run_import('default', 'main')
+    assert [json.loads(c) for c in fake.checkpoints] == [{'next': 'page-2', 'imported': 2, 'rejected': 0}]
+
+
+async def test_import_resumes_from_the_checkpoint(monkeypatch, upstream):
+    checkpoint = json.dumps({'next': 'page-2', 'imported': 2, 'rejected': 1})
+    fake = use_api(monkeypatch, FakeApi({CHECKPOINT_ANNOTATION: checkpoint}))
+    assert await importer.run_import('default', 'main') == (2, 0)
+    assert upstream.started_at == 'page-2'
+    assert sorted(fake.applied) == ['main-3', 'main-4']
+
+
+async def test_restart_ignores_the_checkpoint(monkeypatch, upstream):
+    checkpoint = json.dumps({'next': 'page-2', 'imported': 2})
+    fake = use_api(monkeypatch, FakeApi({CHECKPOINT_ANNOTATION: checkpoint}))
+    assert await importer.run_import('default', 'main', restart=True) == (4, 0)
+    assert upstream.started_at is None
@@ -0,0 +1,95 @@
+"""Tests for the Pet ID uniqueness index (controller.index)."""
+import itertools
+
+import pytest
+from prometheus_client import REGISTRY
+
+from controller.index import PetIdIndex
+
+
+def meta(created, uid):
+    return {'creationTimestamp': created, 'uid': uid}
+
+
+OLD = meta('2026-01-01T00:00:00Z', 'b')
+NEW = meta('2026-01-02T00:00:00Z', 'a')
+
+
+@pytest.fixture
+def index():
+    return PetIdIndex()
+
+
+def test_first_claim_owns_the_id(index):
+    assert index.claim(('default', 'buddy'), 1, OLD) is None
+    assert index.owner(1) == ('default', 'buddy')
+    assert index.duplicate_of(('default', 'buddy'), 1) is None
+    assert len(index) == 1
+
+
+def test_later_pet_is_the_duplicate(index):
+    index.claim(('default', 'buddy'), 1, OLD)
+    assert index.claim(('default', 'copy'), 1, NEW) is None
+    assert index.duplicate_of(('default', 'copy'), 1) == ('default', 'buddy')
+    assert index.duplicate_of(('default', 'buddy'), 1) is None
+
+
+def test_older_pet_arriving_late_demotes_the_owner(index):
+    index.claim(('default', 'copy'), 1, NEW)
+    assert index.claim(('default', 'buddy'), 1, OLD) == ('default', 'copy')
+    assert index.owner(1) == ('default', 'buddy')
+
+
+def test_owner_does_not_depend_on_event_order():
+    pets = [(('ns', 'a'), meta('2026-01-01T00:00:00Z', 'z')),
+            (('ns', 'b'), meta('2026-01-01T00:00:00Z', 'y')),  # same time, lower uid
+            (('ns', 'c'), meta('2026-01-03T00:00:00Z', 'a'))]
+    owners = set()
+    for order in itertools.permutations(pets):
+        index = PetIdIndex()
+        for key, m in order:
+            index.claim(key, 7, m)
+        owners.add(index.owner(7))
+    assert owners == {('ns', 'b')}
+
+
+def test_changing_id_releases_the_old_one(index):
+    index.claim(('default', 'buddy'), 1, OLD)
+    index.claim(('default', 'copy'), 1, NEW)
+    index.claim(('default', 'buddy'), 2, OLD)
+    assert index.owner(1) == ('default', 'copy')
+    assert index.owner(2) == ('default', 'buddy')
+    assert len(index) == 2
+
+
+def test_invalid_id_releases_the_claim(index):
+    index.claim(('default', 'buddy'), 1, OLD)
+    assert index.claim(('default', 'buddy'), 'one', OLD) is None
+    assert index.owner(1) is None
+    assert index.duplicate_of(('default', 'other'), 'one') is None
+    assert len(index) == 0
+
+
+def test_release_hands_the_id_to_the_next_pet(index):
+    index.claim(('default', 'buddy'), 1, OLD)
+    index.claim(('default', 'copy'), 1, NEW)
+    index.release(('default', 'buddy'))
+    index.release(('default', 'unknown'))
+    assert index.owner(1) == ('default', 'copy')
+    index.release(('default', 'copy'))
+    assert index.owner(1) is None and len(index) == 0
+
+
+def test_reclaiming_does_not_count_a_collision(index):
+    collisions = REGISTRY.get_sample_value('pet_controller_pet_id_collisions_total') or 0
+    index.claim(('default', 'buddy'), 1, OLD)
+    index.claim(('default', 'buddy'), 1, OLD)
+    index.claim(('default', 'copy'), 1, NEW)
+    assert REGISTRY.get_sample_value('pet_controller_pet_id_collisions_total') == collisions + 1
+
+
+def test_clear(index):
+    index.claim(('default', 'buddy'), 1, OLD)
+    index.clear()
+    assert len(index) == 0 and index.owner(1) is None
+    assert REGISTRY.get_sample_value('pet_controller_pet_id_index_size') == 0
@@ -0,0 +1,125 @@
+"""Tests for the concurrency and rate limits (controller.limits)."""
+import asyncio
+import time
+
+import pytest
+
+from controller import limits
+from controller.config import Settings
+from controller.limits import TokenBucket
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record asyncio.sleep calls made by the bucket, on a virtual clock."""
+    now = [1000.0]
+    calls = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        calls.append(delay)
+        now[0] += delay
+        await real_sleep(0)
+
+    monkeypatch.setattr(limits.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(limits.asyncio, "sleep", sleep)
+    return calls
+
+
+async def test_burst_is_free(sleeps):
+    bucket = TokenBucket(rate=10, burst=5)
+    for _ in range(5):
+        await bucket.acquire()
+    assert sleeps == []
+
+
+async def test_empty_bucket_sleeps_until_the_token_is_due(sleeps):
+    bucket = TokenBucket(rate=10, burst=2)
+    for _ in range(5):
+        await bucket.acquire()
+    # One sleep per waiting call, each for exactly one refill interval
+    assert sleeps == pytest.approx([0.1, 0.1, 0.1])
+
+
+async def test_concurrent_waiters_wake_once_each_in_order(monkeypatch):
+    monkeypatch.setattr(limits.time, "monotonic", lambda: 1000.0)
+    woken = []
+
+    async def sleep(delay):
+        woken.append(delay)
+
+    monkeypatch.setattr(limits.asyncio, "sleep", sleep)
+    bucket = TokenBucket(rate=10, burst=1)
+    await bucket.acquire()
+    await asyncio.gather(*(bucket.acquire() for _ in range(4)))
+    assert woken == pytest.approx([0.1, 0.2, 0.3, 0.4])
+
+
+async def test_idle_bucket_refills_up_to_burst(sleeps):
+    bucket = TokenBucket(rate=10, burst=3)
+    for _ in range(3):
+        await bucket.acquire()
+    bucket._updated -= 60  # a minute idle
+    for _ in range(3):
+        await bucket.acquire()
+    assert sleeps == []
+    await bucket.acquire()
+    assert sleeps == pytest.approx([0.1])
+
+
+async def test_cancelled_waiter_returns_its_token():
+    bucket = TokenBucket(rate=1, burst=1)
+    await bucket.acquire()
+    waiter = asyncio.ensure_future(bucket.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert bucket._tokens == pytest.approx(0, abs=0.01)
+
+
+async def test_real_rate():
+    bucket = TokenBucket(rate=100, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    assert 0.04 <= time.monotonic() - started < 0.2
+
+
+async def test_only_kopf_handlers_take_a_token_for_kopf_patch(monkeypatch):
+    limits.configure(Settings())
+    taken = []
+
+    async def api_call():
+        taken.append(1)
+
+    monkeypatch.setattr(limits, "api_call", api_call)
+
+    @limits.limited(limits.UPDATE)
+    async def update(**_):
+        return "updated"
+
+    @limits.limited(limits.RECONCILE)
+    async def reconcile(**_):
+        return "reconciled"
+
+    assert await update() == "updated"
+    assert len(taken) == 1
+    assert await reconcile() == "reconciled"
+    assert len(taken) == 1
+
+
+async def test_slot_limits_concurrency():
+    limits.configure(Settings(max_concurrent_creates=2))
+    running = []
+    peak = []
+
+    @limits.limited(limits.CREATE)
+    async def create(**_):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    await asyncio.gather(*(create() for _ in range(6)))
+    assert max(peak) == 2
@@ -0,0 +1,195 @@
+"""Tests for the asynchronous health check engine (controller.probes)."""
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from controller.config import SimulationConfig, Settings
+from controller.probes import ProbeEngine, SimulatedProbe
+
+BUDDY = ('default', 'buddy')
+
+
+class FakeProbe:
+    """Returns the queued results in order; `gate` holds every attempt until it is set."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, spec):
+        self.calls.append(spec)
+        await self.gate.wait()
+        result = self.results.pop(0) if self.results else (True, 'ok')
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class Results:
+    def __init__(self):
+        self.received = []
+        self.done = asyncio.Event()
+
+    async def __call__(self, key, healthy, message, context):
+        self.received.append((key, healthy, message, context))
+        self.done.set()
+
+
+@pytest.fixture
+async def make_engine():
+    engines = []
+
+    def make(probe, **settings):
+        settings = {'max_concurrent_probes': 2, 'health_check_timeout': 1,
+                    'health_check_retry_count': 2, 'health_check_retry_delay': 0.01, **settings}
+        results = Results()
+        engine = ProbeEngine(probe, Settings(**settings), results)
+        engines.append(engine)
+        return engine, results
+
+    yield make
+    for engine in engines:
+        await engine.stop()
+
+
+async def test_simulated_probe():
+    probe = SimulatedProbe(SimulationConfig())
+    assert (await probe({'id': 2, 'name': 'buddy'}))[0]
+    assert (await probe({'id': 9, 'name': 'rex'}))[0]
+    assert not (await probe({'id': 7, 'name': 'rex'}))[0]
+
+
+async def test_healthy_result_is_delivered_once(make_engine):
+    engine, results = make_engine(FakeProbe((True, 'fine')))
+    engine.start()
+    engine.submit(BUDDY, {'id': 1}, context='ctx')
+    assert engine.pending(BUDDY)
+    await asyncio.wait_for(results.done.wait(), 1)
+    assert results.received == [(BUDDY, True, 'fine', 'ctx')]
+    assert not engine.pending(BUDDY)
+
+
+async def test_failed_attempts_are_retried_until_the_limit(make_engine):
+    probe = FakeProbe((False, 'one'), (False, 'two'), (False, 'three'), (True, 'never'))
+    engine, results = make_engine(probe)
+    retries = REGISTRY.get_sample_value('pet_controller_probe_retries_total') or 0
+    engine.start()
+    engine.submit(BUDDY, {'id': 1})
+    await asyncio.wait_for(results.done.wait(), 1)
+    assert len(probe.calls) == 3
+    assert results.received == [(BUDDY, False, 'three', None)]
+    assert REGISTRY.get_sample_value('pet_controller_probe_retries_total') == retries + 2
+
+
+async def test_retry_succeeds(make_engine):
+    engine, results = make_engine(FakeProbe(RuntimeError('refused'), (True, 'up')))
+    engine.start()
+    engine.submit(BUDDY, {'id': 1})
+    await asyncio.wait_for(results.done.wait(), 1)
+    assert results.received == [(BUDDY, True, 'up', None)]
+
+
+async def test_timeout_counts_as_a_failed_attempt(make_engine):
+    probe = FakeProbe()
+    probe.gate.clear()
+    engine, results = make_engine(probe, health_check_timeout=0.01, health_check_retry_count=0)
+    engine.start()
+    engine.submit(BUDDY, {'id': 1})
+    await asyncio.wait_for(results.done.wait(), 1)
+    [(_, healthy, message, _)] = results.received
+    assert not healthy and 'timed out' in message
+
+
+def test_backoff_doubles_with_jitter():
+    engine = ProbeEngine(FakeProbe(), Settings(health_check_retry_delay=4), Results())
+    for attempt, delay in ((1, 4), (2, 8), (3, 16)):
+        for _ in range(20):
+            assert delay / 2 <= engine.backoff(attempt) <= delay
+
+
+async def test_retries_are_served_from_the_heap_in_due_order(make_engine):
+    probe = FakeProbe((False, 'down'), (False, 'down'))
+    engine, results = make_engine(probe, max_concurrent_probes=1)
+    delays = [0.2, 0.05]
+    engine.backoff = lambda attempt: delays.pop(0)
+    engine.start()
+    engine.submit(('default', 'late'), {'id': 1})
+    engine.submit(('default', 'early'), {'id': 2})
+    await asyncio.sleep(0.3)
+    assert [key for key, *_ in results.received] == [('default', 'early'), ('default', 'late')]
+
+
+async def test_cancel_drops_the_result(make_engine):
+    probe = FakeProbe()
+    probe.gate.clear()
+    engine, results = make_engine(probe)
+    engine.start()
+    engine.submit(BUDDY, {'id': 1})
+    await asyncio.sleep(0.01)
+    engine.cancel(BUDDY)
+    assert not engine.pending(BUDDY)
+    probe.gate.set()
+    await asyncio.sleep(0.05)
+    assert results.received == []
+    engine.cancel(BUDDY)
+
+
+async def test_resubmission_replaces_a_running_probe(make_engine):
+    probe = FakeProbe((True, 'old'), (True, 'new'))
+    probe.gate.clear()
+    engine, results = make_engine(probe, max_concurrent_probes=1)
+    engine.start()
+    engine.submit(BUDDY, {'id': 1})
+    await asyncio.sleep(0.01)
+    engine.submit(BUDDY, {'id': 2})
+    probe.gate.set()
+    await asyncio.wait_for(results.done.wait(), 1)
+    await asyncio.sleep(0.01)
+    assert [spec['id'] for spec in probe.calls] == [1, 2]
+    assert results.received == [(BUDDY, True, 'new', None)]
+
+
+async def test_resubmitted_pet_is_probed_once(make_engine):
+    # Regression: a resubmission before the first queue entry was picked up
+    # queued a second entry for the same job, and two workers probed it
+    probe = FakeProbe()
+    engine, results = make_engine(probe, max_concurrent_probes=4)
+    engine.submit(BUDDY, {'id': 1})
+    engine.submit(BUDDY, {'id': 2})
+    engine.start()
+    await asyncio.wait_for(results.done.wait(), 1)
+    await asyncio.sleep(0.01)
+    assert probe.calls == [{'id': 2}]
+    assert len(results.received) == 1
+
+
+async def test_stale_retry_entry_is_skipped(make_engine):
+    probe = FakeProbe((False, 'down'), (True, 'up'))
+    engine, results = make_engine(probe, health_check_retry_delay=0.05)
+    engine.start()
+    engine.submit(BUDDY, {'id': 1})
+    await asyncio.sleep(0.01)
+    assert len(engine._retries) == 1
+    engine.cancel(BUDDY)
+    await asyncio.sleep(0.1)
+    assert len(probe.calls) == 1 and results.received == []
+
+
+async def test_failing_callback_does_not_stop_the_worker(make_engine):
+    engine, results = make_engine(FakeProbe(), max_concurrent_probes=1)
+    calls = []
+
+    async def on_result(key, healthy, message, context):
+        calls.append(key)
+        if key == BUDDY:
+            raise RuntimeError('boom')
+
+    engine.on_result = on_result
+    engine.start()
+    engine.submit(BUDDY, {'id': 1})
+    engine.submit(('default', 'rex'), {'id': 2})
+    await asyncio.sleep(0.05)
+    assert calls == [BUDDY, ('default', 'rex')]
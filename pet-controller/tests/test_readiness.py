@@ -0,0 +1,73 @@
+"""Tests for the readiness state (controller.readiness)."""
+import aiohttp
+import pytest
+
+from controller import readiness
+from controller.config import PETS, PETSTORES
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    readiness.reset()
+    yield
+    readiness.reset()
+
+
+def test_not_ready_until_caches_are_loaded():
+    assert readiness.check() == (False, "loading caches")
+
+
+def test_ready_once_every_listed_object_was_delivered():
+    readiness.expect(PETSTORES, [("default", "store")])
+    readiness.expect(PETS, [("default", "buddy"), ("default", "rex")])
+    readiness.loaded()
+    ready, message = readiness.check()
+    assert not ready and "2 pets" in message and "1 petstores" in message
+
+    readiness.seen(PETSTORES, ("default", "store"))
+    readiness.seen(PETS, ("default", "buddy"))
+    assert readiness.check() == (False, "waiting for initial sync: 1 pets")
+    readiness.seen(PETS, ("default", "rex"))
+    assert readiness.check() == (True, "ready")
+
+
+def test_nothing_listed_is_ready_after_loading():
+    readiness.loaded()
+    assert readiness.check()[0]
+
+
+def test_grace_ignores_deleted_objects_only_for_connected_watches(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(readiness.time, "monotonic", lambda: now[0])
+    readiness.expect(PETS, [("default", "buddy"), ("default", "gone")])
+    readiness.expect(PETSTORES, [("default", "store")])
+    readiness.loaded()
+    readiness.seen(PETS, ("default", "buddy"))
+
+    now[0] += readiness.INITIAL_SYNC_GRACE
+    # The PetStore watch has not delivered anything: not connected yet
+    assert readiness.check() == (False, "waiting for initial sync: 1 petstores")
+    readiness.seen(PETSTORES, ("default", "store"))
+    assert readiness.check() == (True, "ready")
+
+
+def test_stays_ready():
+    readiness.loaded()
+    assert readiness.check()[0]
+    readiness.expect(PETS, [("default", "late")])
+    assert readiness.check()[0]
+
+
+async def test_served_on_the_loop(unused_tcp_port):
+    await readiness.serve(f"http://127.0.0.1:{unused_tcp_port}/readyz")
+    try:
+        async with aiohttp.ClientSession() as session:
+            url = f"http://127.0.0.1:{unused_tcp_port}/readyz"
+            async with session.get(url) as response:
+                assert response.status == 503
+            readiness.loaded()
+            async with session.get(url) as response:
+                assert response.status == 200
+                assert await response.text() == "ready\n"
+    finally:
+        await readiness.stop()
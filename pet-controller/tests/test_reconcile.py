@@ -0,0 +1,140 @@
+"""Tests for periodic reconciliation (controller.reconcile)."""
+import asyncio
+
+import pytest
+
+from controller import main, reconcile, status
+from controller.config import Settings
+from controller.reconcile import PetState, TimingWheel, condition_digest
+from controller.stores import STORE_LABEL
+
+READY = {'type': 'Ready', 'status': 'True', 'lastTransitionTime': 'then',
+         'reason': 'HealthCheckPassed', 'message': 'Pet buddy (ID: 2) is healthy'}
+
+
+def state(phase='Active', conditions=(READY,), **spec):
+    spec = {'id': 2, 'name': 'buddy', **spec}
+    return PetState(spec, {STORE_LABEL: 'main', 'team': 'a'},
+                    {'phase': phase, 'conditions': list(conditions)}, {'generation': 3, 'uid': 'u'})
+
+
+def test_pet_state_keeps_what_reconciliation_reads():
+    pet = state(tag='dog')
+    assert pet.spec() == {'id': 2, 'name': 'buddy', 'tag': 'dog'}
+    assert pet.labels() == {STORE_LABEL: 'main'}
+    assert pet.meta() == {'generation': 3}
+    assert pet.status() == {'phase': 'Active', 'conditions': [
+        {'type': 'Ready', 'status': 'True', 'lastTransitionTime': 'then'}]}
+    assert pet.ready_digest == condition_digest(READY['reason'], READY['message'])
+
+
+def test_pet_state_of_a_new_pet():
+    pet = PetState({'id': 1, 'name': 'rex'}, None, None, {})
+    assert pet.spec() == {'id': 1, 'name': 'rex'}
+    assert pet.labels() == {} and pet.status() == {}
+    assert pet.ready_digest == condition_digest(None, None)
+
+
+def test_pet_state_size_does_not_depend_on_the_pet():
+    # Regression: wheel entries held copies of the whole spec, labels and status
+    pet = state(conditions=[{**READY, 'message': 'x' * 100_000}], notes='y' * 100_000)
+    assert not hasattr(pet, '__dict__')
+    assert len(pet.ready_digest) == 8 and 'message' not in pet.status()['conditions'][0]
+    assert 'notes' not in pet.spec()
+
+
+def test_condition_digest():
+    assert condition_digest('a', 'b') == condition_digest('a', 'b')
+    assert condition_digest('a', 'b') != condition_digest('a', 'c')
+    assert condition_digest('ab', '') != condition_digest('a', 'b')
+    assert len(condition_digest('a', 'b')) == 8
+
+
+@pytest.fixture
+def wheel():
+    return TimingWheel(Settings(reconcile_interval=10, batch_size=2), handler=None)
+
+
+def turn(wheel):
+    """The keys handed out over one revolution, in order."""
+    return [key for _ in range(wheel.size) for batch in wheel.due() for key, _ in batch]
+
+
+def test_every_pet_is_due_once_per_revolution(wheel):
+    keys = [('default', f'pet-{i}') for i in range(25)]
+    for key in keys:
+        wheel.track(key, f'uid-{key[1]}', None)
+    assert len(wheel) == 25
+    assert sorted(turn(wheel)) == sorted(keys)
+    assert sorted(turn(wheel)) == sorted(keys)
+
+
+def test_due_splits_a_tick_into_batches(wheel):
+    for i in range(5):
+        wheel._buckets[0].add(('default', f'pet-{i}'))
+        wheel._entries[('default', f'pet-{i}')] = reconcile._Entry(0, i)
+    assert [len(batch) for batch in wheel.due()] == [2, 2, 1]
+    assert wheel.due() == []
+
+
+def test_track_replaces_the_state(wheel):
+    wheel.track(('default', 'buddy'), 'uid', 'old')
+    wheel.track(('default', 'buddy'), 'uid', 'new')
+    states = [s for _ in range(wheel.size) for batch in wheel.due() for _, s in batch]
+    assert states == ['new'] and len(wheel) == 1
+
+
+def test_recreated_pet_moves_to_the_bucket_of_its_new_uid(wheel):
+    uids = [f'uid-{i}' for i in range(50)]
+    old, new = next((a, b) for a in uids for b in uids if wheel.slot_of(a) != wheel.slot_of(b))
+    wheel.track(('default', 'buddy'), old, None)
+    wheel.track(('default', 'buddy'), new, None)
+    assert turn(wheel) == [('default', 'buddy')]
+    assert ('default', 'buddy') in wheel._buckets[wheel.slot_of(new)]
+
+
+def test_forget_and_clear(wheel):
+    wheel.track(('default', 'buddy'), 'a', None)
+    wheel.track(('default', 'rex'), 'b', None)
+    wheel.forget(('default', 'buddy'))
+    wheel.forget(('default', 'unknown'))
+    assert turn(wheel) == [('default', 'rex')]
+    wheel.clear()
+    assert len(wheel) == 0 and turn(wheel) == []
+
+
+async def test_a_failing_batch_does_not_stop_the_wheel(monkeypatch):
+    monkeypatch.setattr(reconcile, 'TICK', 0.01)
+    batches = []
+
+    async def handler(batch):
+        batches.append(batch)
+        raise RuntimeError('boom')
+
+    wheel = TimingWheel(Settings(reconcile_interval=0.03), handler)
+    wheel.track(('default', 'buddy'), 'uid', 'state')
+    wheel.start()
+    await asyncio.sleep(0.1)
+    await wheel.stop()
+    assert len(batches) >= 2
+
+
+class FakeWriter:
+    def __init__(self):
+        self.writes = []
+
+    async def write(self, namespace, name, fields, plural='pets'):
+        self.writes.append((namespace, name, fields))
+
+
+async def test_probe_finished_skips_an_unchanged_result(monkeypatch):
+    writer = FakeWriter()
+    monkeypatch.setattr(status, 'writer', lambda: writer)
+    await main.probe_finished(('default', 'buddy'), True, READY['message'], state())
+    assert writer.writes == []
+    await main.probe_finished(('default', 'buddy'), True, 'other message', state())
+    await main.probe_finished(('default', 'buddy'), False, 'down', state())
+    [(_, _, passed), (_, _, failed)] = writer.writes
+    assert passed['phase'] == 'Active'
+    assert passed['conditions'][0]['lastTransitionTime'] == 'then'
+    assert failed['phase'] == 'Inactive' and failed['conditions'][0]['reason'] == 'HealthCheckFailed'
@@ -0,0 +1,132 @@
+"""Tests for the coalescing status writer (controller.status)."""
+import asyncio
+import threading
+
+import pytest
+from kubernetes.client.rest import ApiException
+from prometheus_client import REGISTRY
+
+from controller import api, limits, status
+from controller.config import PETSTORES, Settings
+from controller.status import StatusWriter
+
+
+class FakeApi:
+    """Records status patches; `gate` holds a patch in flight until it is set."""
+
+    def __init__(self):
+        self.patches = []
+        self.fail_with = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def patch_namespaced_custom_object_status(self, group, version, namespace, plural, name, body):
+        self.gate.wait(5)
+        if self.fail_with:
+            raise ApiException(status=self.fail_with.pop(0), reason="injected")
+        self.patches.append((plural, namespace, name, body['status']))
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    fake = FakeApi()
+    monkeypatch.setattr(api, "_custom_objects", fake)
+    limits.configure(Settings(rate_limit_qps=10000, rate_limit_burst=10000))
+    return fake
+
+
+def counter(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_ready_condition_keeps_transition_time_of_unchanged_status():
+    current = {'conditions': [{'type': 'Ready', 'status': 'True', 'lastTransitionTime': 'then'}]}
+    assert status.ready_condition(current, True, 'HealthCheckPassed', 'ok')['lastTransitionTime'] == 'then'
+    assert status.ready_condition(current, False, 'HealthCheckFailed', 'no')['lastTransitionTime'] != 'then'
+
+
+async def test_updates_within_the_debounce_are_one_patch(fake_api):
+    writer = StatusWriter(debounce=0.05)
+    coalesced = counter('pet_controller_status_updates_coalesced_total')
+    await writer.write('default', 'buddy', {'phase': 'Pending', 'observedGeneration': 1})
+    await writer.write('default', 'buddy', {'phase': 'Active'})
+    await writer.write('default', 'rex', {'phase': 'Pending'})
+    assert fake_api.patches == [] and len(writer) == 2
+    await asyncio.sleep(0.15)
+    assert sorted(fake_api.patches) == [
+        ('pets', 'default', 'buddy', {'phase': 'Active', 'observedGeneration': 1}),
+        ('pets', 'default', 'rex', {'phase': 'Pending'}),
+    ]
+    assert counter('pet_controller_status_updates_coalesced_total') == coalesced + 1
+
+
+async def test_zero_debounce_patches_every_write(fake_api):
+    writer = StatusWriter(debounce=0)
+    await writer.write('default', 'buddy', {'phase': 'Pending'})
+    await writer.write('default', 'buddy', {'phase': 'Active'})
+    assert [p[3] for p in fake_api.patches] == [{'phase': 'Pending'}, {'phase': 'Active'}]
+
+
+async def test_plural_is_part_of_the_key(fake_api):
+    writer = StatusWriter(debounce=0)
+    await writer.write('default', 'main', {'petCount': 1}, plural=PETSTORES)
+    assert fake_api.patches == [('petstores', 'default', 'main', {'petCount': 1})]
+
+
+async def test_discard_drops_the_pending_patch_and_counts_it(fake_api):
+    writer = StatusWriter(debounce=0.05)
+    discarded = counter('pet_controller_status_updates_discarded_total')
+    coalesced = counter('pet_controller_status_updates_coalesced_total')
+    await writer.write('default', 'buddy', {'phase': 'Pending'})
+    writer.discard('default', 'buddy')
+    writer.discard('default', 'never-written')
+    await asyncio.sleep(0.1)
+    assert fake_api.patches == [] and len(writer) == 0
+    # Regression: discards are counted on their own, not as coalesced updates
+    assert counter('pet_controller_status_updates_discarded_total') == discarded + 1
+    assert counter('pet_controller_status_updates_coalesced_total') == coalesced
+
+
+async def test_patches_of_one_object_are_sent_one_at_a_time_in_order(fake_api):
+    # Regression: a flush while a patch was in flight used to send a second
+    # patch concurrently, which could land first and be overwritten
+    writer = StatusWriter(debounce=0)
+    fake_api.gate.clear()
+    first = asyncio.ensure_future(writer.write('default', 'buddy', {'phase': 'Pending'}))
+    await asyncio.sleep(0.05)
+    second = asyncio.ensure_future(writer.write('default', 'buddy', {'phase': 'Active'}))
+    third = asyncio.ensure_future(writer.write('default', 'buddy', {'message': 'ok'}))
+    await asyncio.sleep(0.05)
+    assert fake_api.patches == []
+    fake_api.gate.set()
+    await asyncio.gather(first, second, third)
+    # The two writes that waited were merged into one patch sent after the first
+    assert [p[3] for p in fake_api.patches] == [{'phase': 'Pending'}, {'phase': 'Active', 'message': 'ok'}]
+
+
+async def test_failed_patch_is_retried_under_newer_values(fake_api, monkeypatch):
+    monkeypatch.setattr(status, "RETRY_DELAY", 0.05)
+    writer = StatusWriter(debounce=0)
+    fake_api.fail_with = [500]
+    await writer.write('default', 'buddy', {'phase': 'Pending', 'observedGeneration': 2})
+    assert fake_api.patches == []
+    writer._pending[('pets', 'default', 'buddy')]['phase'] = 'Active'  # written meanwhile
+    await asyncio.sleep(0.15)
+    assert [p[3] for p in fake_api.patches] == [{'phase': 'Active', 'observedGeneration': 2}]
+
+
+async def test_gone_object_is_not_retried(fake_api):
+    writer = StatusWriter(debounce=0)
+    fake_api.fail_with = [404]
+    gone = counter('pet_controller_status_patches_total', result='gone')
+    await writer.write('default', 'buddy', {'phase': 'Pending'})
+    assert len(writer) == 0 and not writer._timers
+    assert counter('pet_controller_status_patches_total', result='gone') == gone + 1
+
+
+async def test_flush_all_sends_everything_pending(fake_api):
+    writer = StatusWriter(debounce=60)
+    await writer.write('default', 'buddy', {'phase': 'Pending'})
+    await writer.write('default', 'rex', {'phase': 'Pending'})
+    await writer.flush_all()
+    assert len(fake_api.patches) == 2 and not writer._timers
@@ -0,0 +1,163 @@
+"""Tests for PetStore capacity and tag policy (controller.stores)."""
+import pytest
+
+from controller import api, index, main, readiness, reconcile, stores
+from controller.config import PETS, PETSTORES, Settings
+from controller.stores import (STORE_FULL, STORE_LABEL, STORE_NOT_FOUND, TAG_NOT_ALLOWED,
+                               StoreRegistry, TagPolicy)
+
+STORE = ('default', 'main')
+
+
+def petstore(name='main', generation=1, **config):
+    return {'metadata': {'namespace': 'default', 'name': name, 'generation': generation},
+            'spec': {'config': config}}
+
+
+@pytest.fixture
+def registry():
+    registry = StoreRegistry()
+    registry.observe_store(petstore(maxPets=2))
+    return registry
+
+
+def test_empty_policy_allows_everything():
+    policy = TagPolicy([])
+    assert policy.allows('anything') and policy.allows(None)
+
+
+def test_exact_tags():
+    policy = TagPolicy(['dog', 'cat'])
+    assert policy.allows('dog') and not policy.allows('Dog') and not policy.allows('doge')
+    assert policy.allows(None) and policy.allows('')
+
+
+def test_case_insensitive_tags():
+    policy = TagPolicy(['Dog'], casefold=True)
+    assert policy.allows('dOG') and not policy.allows('cat')
+
+
+def test_prefix_tags():
+    policy = TagPolicy(['dog', 'ca'], prefix=True)
+    assert policy.allows('dog-small') and policy.allows('cat') and policy.allows('dog')
+    assert not policy.allows('do') and not policy.allows('bird')
+
+
+def test_policy_from_config():
+    policy = TagPolicy.from_config({'allowedTags': ['Dog'],
+                                    'tagMatching': {'caseInsensitive': True, 'prefix': True}})
+    assert policy.allows('dogfish') and not policy.allows('cat')
+
+
+def test_store_of():
+    assert stores.store_of('default', {STORE_LABEL: 'main'}) == STORE
+    assert stores.store_of('default', {}) is None
+    assert stores.store_of('default', None) is None
+
+
+def test_admit_until_full(registry):
+    assert registry.admit(('default', 'a'), STORE, None) is None
+    assert registry.admit(('default', 'b'), STORE, None) is None
+    assert registry.admit(('default', 'c'), STORE, None) == STORE_FULL
+    assert registry.admit(('default', 'a'), STORE, 'dog') is None  # already counted
+    assert registry.admitted(('default', 'c')) is None
+    registry.release(('default', 'a'))
+    assert registry.admit(('default', 'c'), STORE, None) is None
+
+
+def test_unknown_store(registry):
+    assert registry.admit(('default', 'a'), ('default', 'other'), None) == STORE_NOT_FOUND
+
+
+def test_relabel_moves_the_pet(registry):
+    registry.observe_store(petstore('other'))
+    registry.admit(('default', 'a'), STORE, None)
+    assert registry.admit(('default', 'a'), ('default', 'other'), None) is None
+    assert registry.admitted(('default', 'a')) == ('default', 'other')
+    assert registry.get(STORE).pets == {}
+
+
+def test_disallowed_tag_is_released(registry):
+    registry.observe_store(petstore(generation=2, maxPets=2, allowedTags=['dog']))
+    registry.admit(('default', 'a'), STORE, 'dog')
+    assert registry.admit(('default', 'a'), STORE, 'cat') == TAG_NOT_ALLOWED
+    assert registry.admitted(('default', 'a')) is None
+
+
+def test_policy_change_releases_violating_pets(registry):
+    registry.admit(('default', 'a'), STORE, 'dog')
+    registry.admit(('default', 'b'), STORE, 'cat')
+    violations = registry.observe_store(petstore(generation=2, maxPets=2, allowedTags=['dog']))
+    assert violations == [(('default', 'b'), 'cat')]
+    assert registry.admitted(('default', 'b')) is None
+    assert list(registry.get(STORE).pets) == [('default', 'a')]
+
+
+def test_same_generation_is_not_recompiled(registry):
+    policy = registry.get(STORE).tags
+    assert registry.observe_store(petstore(maxPets=2, allowedTags=['dog'])) == []
+    assert registry.get(STORE).tags is policy
+
+
+def test_remove_store(registry):
+    registry.admit(('default', 'a'), STORE, None)
+    registry.remove_store(STORE)
+    assert registry.get(STORE) is None and registry.admitted(('default', 'a')) is None
+    registry.remove_store(STORE)
+
+
+def test_restore_skips_pets_the_store_rejected(registry):
+    rejected = [{'type': 'Ready', 'status': 'False', 'reason': STORE_FULL}]
+    registry.restore(('default', 'a'), STORE, None, rejected)
+    registry.restore(('default', 'b'), STORE, None, [])
+    assert registry.admitted(('default', 'a')) is None
+    assert registry.admitted(('default', 'b')) == STORE
+
+
+def test_restore_respects_capacity_and_tags(registry):
+    registry.observe_store(petstore(generation=2, maxPets=2, allowedTags=['dog']))
+    for name in ('a', 'b', 'c'):
+        registry.restore(('default', name), STORE, 'dog', [])
+    registry.restore(('default', 'd'), STORE, 'cat', [])
+    assert len(registry.get(STORE).pets) == 2
+    assert registry.admitted(('default', 'd')) is None
+
+
+def pet(name, pet_id, created, phase='Active', reason='HealthCheckPassed', store='main'):
+    return {
+        'metadata': {'namespace': 'default', 'name': name, 'uid': f'uid-{name}',
+                     'creationTimestamp': created, 'labels': {STORE_LABEL: store}},
+        'spec': {'id': pet_id, 'name': name},
+        'status': {'phase': phase, 'conditions': [{'type': 'Ready', 'reason': reason}]},
+    }
+
+
+async def test_startup_counts_only_pets_the_handlers_would_admit(monkeypatch):
+    # Regression: the store counters were rebuilt from every labelled Pet, so
+    # invalid Pets and duplicates of another Pet's ID took capacity
+    listed = {
+        PETSTORES: [petstore(maxPets=2)],
+        PETS: [
+            pet('copy', 1, '2026-01-02T00:00:00Z', phase='Error', reason='ValidationFailed'),
+            pet('invalid', -5, '2026-01-01T00:00:00Z', phase='Error', reason='ValidationFailed'),
+            pet('buddy', 1, '2026-01-01T00:00:00Z'),
+            pet('rex', 2, '2026-01-01T00:00:00Z'),
+            pet('late', 3, '2026-01-03T00:00:00Z'),
+        ],
+    }
+
+    async def list_all(plural, page_size):
+        for body in listed[plural]:
+            yield body
+
+    monkeypatch.setattr(api, 'list_all', list_all)
+    monkeypatch.setattr(stores, 'registry', StoreRegistry())
+    monkeypatch.setattr(index, 'pet_ids', index.PetIdIndex())
+    reconcile.configure(Settings(), lambda batch: None)
+
+    await main.load_caches()
+
+    assert sorted(stores.registry.get(STORE).pets) == [('default', 'buddy'), ('default', 'rex')]
+    assert stores.registry.admitted(('default', 'late')) is None
+    assert index.pet_ids.owner(1) == ('default', 'buddy')
+    readiness.reset()
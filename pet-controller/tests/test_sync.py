@@ -0,0 +1,187 @@
+"""Tests for the upstream sync (controller.sync)."""
+import pytest
+from kubernetes.client.rest import ApiException
+from prometheus_client import REGISTRY
+
+from controller import api, limits, status, sync
+from controller.config import Settings
+from controller.sync import CONFLICT, CREATED, IN_SYNC, MISSING, MISSING_UPSTREAM, UPDATED, LocalCatalog
+from controller.upstream import PetstoreClient, client_options
+
+STORE = ('default', 'main')
+
+
+class FakeApi:
+    """Records applied Pets; a non-forced apply to a name in `owned` with another id conflicts."""
+
+    def __init__(self):
+        self.applied = []
+        self.owned = {}
+
+    def patch_namespaced_custom_object(self, group, version, namespace, plural, name, body, **kwargs):
+        if self.owned.get(name, body['spec']['id']) != body['spec']['id'] and not kwargs['force']:
+            raise ApiException(status=409, reason="Conflict")
+        self.applied.append((name, body['spec'], kwargs['force']))
+
+
+class FakeWriter:
+    def __init__(self):
+        self.writes = []
+
+    async def write(self, namespace, name, fields, plural='pets'):
+        self.writes.append((name, fields))
+
+
+class FakeClient:
+    def __init__(self, *pages, truncated=False):
+        self._pages = pages
+        self.truncated = truncated
+
+    async def pages(self, start=None):
+        for pets in self._pages:
+            yield pets, None
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    fake, writer = FakeApi(), FakeWriter()
+    monkeypatch.setattr(api, '_custom_objects', fake)
+    monkeypatch.setattr(status, 'writer', lambda: writer)
+    monkeypatch.setattr(sync, 'catalog', LocalCatalog())
+    limits.configure(Settings(rate_limit_qps=10000, rate_limit_burst=10000))
+    return fake, writer
+
+
+def observe(name, pet_id, pet_name, tag=None, missing=False, store=STORE):
+    spec = {'id': pet_id, 'name': pet_name, **({'tag': tag} if tag else {})}
+    sync.catalog.observe(('default', name), store, spec, {'upstream': MISSING} if missing else {})
+
+
+def test_digest_ignores_other_fields():
+    assert sync.digest({'id': 1, 'name': 'rex'}) == sync.digest({'id': 1, 'name': 'rex', 'tag': '', 'x': 1})
+    assert sync.digest({'id': 1, 'name': 'rex'}) != sync.digest({'id': 1, 'name': 'rex', 'tag': 'dog'})
+
+
+def test_catalog_tracks_pets_by_store_and_id():
+    catalog = LocalCatalog()
+    catalog.observe(('default', 'a'), STORE, {'id': 1, 'name': 'rex'}, None)
+    catalog.observe(('default', 'b'), None, {'id': 2, 'name': 'tom'}, None)
+    catalog.observe(('default', 'c'), STORE, {'id': 'x', 'name': 'tom'}, None)
+    assert list(catalog.pets_of(STORE)) == [1]
+    catalog.observe(('default', 'a'), STORE, {'id': 3, 'name': 'rex'}, None)
+    assert list(catalog.pets_of(STORE)) == [3]
+    catalog.forget(('default', 'a'))
+    assert catalog.pets_of(STORE) == {}
+
+
+def test_catalog_forget_keeps_another_pet_with_the_id():
+    catalog = LocalCatalog()
+    catalog.observe(('default', 'a'), STORE, {'id': 1, 'name': 'rex'}, None)
+    catalog.observe(('default', 'b'), STORE, {'id': 1, 'name': 'rex'}, None)
+    catalog.forget(('default', 'a'))
+    assert catalog.pets_of(STORE)[1].name == 'b'
+
+
+async def test_only_differences_are_written(cluster):
+    fake, writer = cluster
+    observe('main-1', 1, 'buddy')
+    observe('main-2', 2, 'rex', tag='cat')
+    observe('main-3', 3, 'tom', missing=True)
+    observe('main-4', 4, 'felix')
+    client = FakeClient([{'id': 1, 'name': 'buddy'}, {'id': 2, 'name': 'rex', 'tag': 'dog'}],
+                        [{'id': 3, 'name': 'tom'}, {'id': 5, 'name': 'kitty'}, {'id': 5, 'name': 'dup'}])
+    drift = await sync.sync_store(client, 'default', 'main', 4)
+    assert drift == {CREATED: 1, UPDATED: 1, MISSING_UPSTREAM: 1, CONFLICT: 0}
+    assert sorted(fake.applied) == [('main-2', {'id': 2, 'name': 'rex', 'tag': 'dog'}, True),
+                                    ('main-5', {'id': 5, 'name': 'kitty'}, False)]
+    assert sorted(writer.writes) == [('main-3', {'upstream': IN_SYNC}), ('main-4', {'upstream': MISSING})]
+
+
+async def test_truncated_listing_marks_nothing_missing(cluster):
+    # Regression: with enablePagination false only the first page is read,
+    # and every Pet on the later pages was marked Missing
+    _, writer = cluster
+    observe('main-1', 1, 'buddy')
+    observe('main-2', 2, 'rex')
+    drift = await sync.sync_store(FakeClient([{'id': 1, 'name': 'buddy'}], truncated=True), 'default', 'main', 4)
+    assert drift[MISSING_UPSTREAM] == 0 and writer.writes == []
+
+
+async def test_create_does_not_take_over_another_pet(cluster):
+    # Regression: <store>-<id> was applied with force, taking over a Pet of
+    # that name with another spec.id
+    fake, _ = cluster
+    fake.owned = {'main-7': 99}
+    client = FakeClient([{'id': 7, 'name': 'rex'}, {'id': 8, 'name': 'tom'}])
+    drift = await sync.sync_store(client, 'default', 'main', 4)
+    assert drift[CONFLICT] == 1 and drift[CREATED] == 1
+    assert [name for name, *_ in fake.applied] == ['main-8']
+
+
+async def test_update_of_a_known_pet_is_forced(cluster):
+    fake, _ = cluster
+    fake.owned = {'buddy': 7}
+    observe('buddy', 7, 'Buddy')
+    drift = await sync.sync_store(FakeClient([{'id': 7, 'name': 'buddy'}]), 'default', 'main', 4)
+    assert drift[UPDATED] == 1 and fake.applied == [('buddy', {'id': 7, 'name': 'buddy'}, True)]
+
+
+def petstore(**config):
+    return {'metadata': {'namespace': 'default', 'name': 'main'},
+            'spec': {'endpoints': {'baseUrl': 'http://upstream/', 'version': 'v1'}, 'config': config}}
+
+
+def test_client_options():
+    assert client_options(petstore(defaultLimit=50, enablePagination=False)) == {
+        'root': 'http://upstream/v1', 'page_size': 50, 'paginate': False}
+    with pytest.raises(ValueError):
+        client_options({'metadata': {'namespace': 'default', 'name': 'main'}, 'spec': {}})
+
+
+class Stopped:
+    """A kopf daemon's stopped flag, raised after `cycles` waits."""
+
+    def __init__(self, cycles, between=None):
+        self.cycles = cycles
+        self.between = between
+
+    def __bool__(self):
+        return self.cycles <= 0
+
+    async def wait(self, timeout):
+        self.cycles -= 1
+        if self.between:
+            self.between()
+
+
+async def test_client_is_rebuilt_when_its_config_changes(monkeypatch):
+    # Regression: the client was only rebuilt when the API root changed, so
+    # edits to defaultLimit or enablePagination were ignored
+    clients = []
+
+    async def sync_store(client, namespace, store, concurrency):
+        clients.append(client)
+        return {}
+
+    monkeypatch.setattr(sync, 'sync_store', sync_store)
+    body = petstore(defaultLimit=20)
+    edits = iter([lambda: None, lambda: body['spec']['config'].update(defaultLimit=50),
+                  lambda: body['spec']['config'].update(enablePagination=False)])
+    await sync.run(body, Stopped(4, lambda: next(edits, lambda: None)()), Settings())
+    assert [(c.page_size, c.paginate) for c in clients] == [(20, True), (20, True), (50, True), (50, False)]
+    assert clients[0] is clients[1] and clients[1] is not clients[2]
+    assert all(c.client.is_closed for c in clients)
+
+
+async def test_failed_sync_is_counted_and_retried(monkeypatch):
+    calls = []
+
+    async def sync_store(client, namespace, store, concurrency):
+        calls.append(client)
+        raise RuntimeError('upstream down')
+
+    monkeypatch.setattr(sync, 'sync_store', sync_store)
+    failures = REGISTRY.get_sample_value('pet_controller_sync_failures_total') or 0
+    await sync.run(petstore(), Stopped(2), Settings())
+    assert len(calls) == 2 and isinstance(calls[0], PetstoreClient)
+    assert REGISTRY.get_sample_value('pet_controller_sync_failures_total') == failures + 2